@@ -0,0 +1,57 @@
+"""Plan factories (and plan prompt budgets), imported on first use.
+
+``agents.create_market_research_plan()`` imports only the module that
+defines the factory, so the API server starts without building or even
+importing every plan.
+"""
+
+import importlib
+
+_FACTORY_MODULES = {
+    "create_market_research_plan": "research_plans",
+    "create_content_gap_analysis_plan": "research_plans",
+    "create_content_planning_system": "content_plans",
+    "create_article_writing_system": "content_plans",
+    "create_fact_checking_system": "content_plans",
+    "create_podcast_production_system": "podcast_plans",
+    "create_podcast_audio_production": "podcast_plans",
+    "create_video_production_system": "video_plans",
+    "create_notion_publisher": "publishing_plans",
+    "create_master_content_production_system": "master_plans",
+    "create_master_phases": "master_plans",
+    "create_master_finalization_plan": "master_plans",
+    "master_finalization_inputs": "master_plans",
+    "PODCAST_PRODUCTION_BUDGET": "podcast_plans",
+    "MASTER_BUDGET": "master_plans",
+}
+
+# Plans served by the plan registry (app.core.plan_registry), by API name
+PLANS = {
+    "market-research": "create_market_research_plan",
+    "content-gap-analysis": "create_content_gap_analysis_plan",
+    "content-planning": "create_content_planning_system",
+    "article-writing": "create_article_writing_system",
+    "fact-checking": "create_fact_checking_system",
+    "podcast-production": "create_podcast_production_system",
+    "podcast-audio-production": "create_podcast_audio_production",
+    "video-production": "create_video_production_system",
+    "publishing": "create_notion_publisher",
+    # POST /api/master-pipeline runs create_master_phases, then this join plan
+    "master-finalization": "create_master_finalization_plan",
+}
+
+# Prompt budgets of the plans' LLM step inputs (app.core.prompt_budget), by API name
+PROMPT_BUDGETS = {
+    "podcast-production": "PODCAST_PRODUCTION_BUDGET",
+    "master-finalization": "MASTER_BUDGET",
+}
+
+
+def __getattr__(name):
+    module = _FACTORY_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
@@ -1,4 +1,5 @@
 from portia import PlanBuilderV2, StepOutput, Input
+from ..core.map_reduce import summarize_document
 from ..schema.content_schemas import ContentPlan, ContentPackage, FactCheckReport
 
 def create_content_planning_system():
@@ -309,6 +310,16 @@ def create_fact_checking_system():
             ]
         )
         
+        # Condense long source pages (map-reduce over chunks)
+        .function_step(
+            step_name="summarize_verification_sources",
+            function=summarize_document,
+            args={
+                "document": StepOutput("extract_verification_sources"),
+                "instruction": "Summarize the evidence in these sources: facts, figures, dates, quotes and their URLs."
+            }
+        )
+        
         # Step 5: Cross-Reference and Verify
         .llm_step(
             step_name="generate_verification_report",
@@ -318,7 +329,7 @@ def create_fact_checking_system():
             Original claims: {extract_claims}
             General verification: {verify_critical_claims}
             Authoritative sources: {find_authoritative_sources}
-            Source content: {extract_verification_sources}
+            Source content: {summarize_verification_sources}
             Verification level: {verification_level}
             
             For each claim provide:
@@ -335,7 +346,7 @@ def create_fact_checking_system():
                 StepOutput("extract_claims"),
                 StepOutput("verify_critical_claims"),
                 StepOutput("find_authoritative_sources"),
-                StepOutput("extract_verification_sources"),
+                StepOutput("summarize_verification_sources"),
                 Input("verification_level")
             ]
         )
@@ -0,0 +1,419 @@
+from functools import partial
+from portia import PlanBuilderV2, StepOutput, Input
+from ..schema.content_schemas import FinalContentOutput
+from ..core.phases import Phase, pick
+from ..core.plan_registry import get_plan
+from ..core.prompt_budget import InputCap, PromptBudget, SUMMARIZE
+
+DEFAULT_CONTENT_FORMATS = ["article", "social_media"]
+
+# Prompt budgets (tokens) of the LLM step inputs: the review steps get every phase's output
+MASTER_BUDGET = PromptBudget(steps={
+    "final_approval_gate": {"*": InputCap(2500, SUMMARIZE)},
+    "generate_final_report": {"*": InputCap(2500, SUMMARIZE)},
+})
+
+# Prompts of the review steps, shared by the monolithic plan and the finalization plan
+APPROVAL_GATE_TASK = """
+    Review all created content for final approval:
+
+    Project: {project_name}
+    Content created: {content_formats}
+    Article (if created): {article_creation_phase}
+    Fact-check results (if done): {fact_checking_phase}
+    Podcast (if created): {podcast_production_phase}
+    Video (if created): {video_production_phase}
+    Approval level: {approval_level}
+
+    Assess:
+    1. Overall content quality and consistency
+    2. Brand alignment across all formats
+    3. Fact-checking results and accuracy
+    4. Target audience appropriateness
+    5. Publishing readiness
+
+    If approval_level is 'high' or any quality issues detected, raise clarification for human review.
+    Otherwise, approve for publishing.
+"""
+
+FINAL_REPORT_TASK = """
+    Generate comprehensive project completion report:
+
+    Project: {project_name}
+    Topic: {primary_topic}
+    Research results: {market_research_phase}
+    Content created: {content_formats}
+    Publishing results: {publishing_phase}
+
+    Create final report with:
+    1. Executive summary of deliverables
+    2. Content performance predictions
+    3. Key metrics to track
+    4. Next content recommendations
+    5. Lessons learned and optimizations
+    6. Resource utilization summary
+"""
+
+
+def complete_project_filename(project_name):
+    """Where the final report of a project is saved."""
+    return f"completed_projects/{project_name}_complete.json"
+
+
+def create_master_content_production_system():
+    """Master orchestrator for complete content production pipeline.
+
+    Runs every phase as a sub-plan of one plan run, as in app.py. The API
+    runs the same phases concurrently instead (create_master_phases, then
+    create_master_finalization_plan), so this plan is not in the registry.
+    """
+    return (
+        PlanBuilderV2("Master AI Content Production System")
+        
+        # Define all inputs
+        .input(name="project_name", description="Name of the content production project")
+        .input(name="primary_topic", description="Main topic for content creation")
+        .input(name="target_audience", description="Target audience demographics and interests")
+        .input(name="content_formats", description="List of content formats to create", 
+               default_value=["article", "social_media"])
+        .input(name="publishing_platforms", description="Platforms to publish content on")
+        .input(name="brand_guidelines", description="Brand voice, style, and visual guidelines")
+        .input(name="project_deadline", description="Project completion deadline")
+        .input(name="approval_level", description="low/medium/high human oversight", default_value="medium")
+        
+        # Phase 1: Market Research & Analysis
+        .sub_plan(
+            plan=get_plan("market-research"),
+            plan_inputs={
+                "topic": Input("primary_topic"),
+                "target_audience": Input("target_audience"),
+                "research_depth": "comprehensive"
+            },
+            step_name="market_research_phase"
+        )
+        
+        # Phase 2: Content Strategy & Planning
+        .sub_plan(
+            plan=get_plan("content-planning"),
+            plan_inputs={
+                "research_summary": StepOutput("market_research_phase"),
+                "content_goals": f"Create engaging {Input('content_formats')} content about {Input('primary_topic')}",
+                "brand_guidelines": Input("brand_guidelines")
+            },
+            step_name="content_planning_phase"
+        )
+        
+        # Phase 3: Article Creation (if requested)
+        .if_(
+            condition="'article' in content_formats",
+            args={"content_formats": Input("content_formats")}
+        )
+        .sub_plan(
+            plan=get_plan("article-writing"),
+            plan_inputs={
+                "topic": Input("primary_topic"),
+                "target_keywords": StepOutput("market_research_phase.target_keywords"),
+                "audience_level": "intermediate",
+                "content_angle": StepOutput("content_planning_phase.recommended_angles[0]")
+            },
+            step_name="article_creation_phase"
+        )
+        .endif()
+        
+        # Phase 4: Fact-Checking & Quality Control
+        .if_(
+            condition="'article' in content_formats",
+            args={"content_formats": Input("content_formats")}
+        )
+        .sub_plan(
+            plan=get_plan("fact-checking"),
+            plan_inputs={
+                "content_to_verify": StepOutput("article_creation_phase.main_article"),
+                "verification_level": "thorough"
+            },
+            step_name="fact_checking_phase"
+        )
+        .endif()
+        
+        # Phase 5: Podcast Production (if requested)
+        .if_(
+            condition="'podcast' in content_formats",
+            args={"content_formats": Input("content_formats")}
+        )
+        .sub_plan(
+            plan=get_plan("podcast-production"),
+            plan_inputs={
+                "episode_topic": Input("primary_topic"),
+                "source_content": StepOutput("article_creation_phase.main_article"),
+                "target_duration": 25,
+                "episode_number": 1
+            },
+            step_name="podcast_production_phase"
+        )
+        .endif()
+        
+        # Phase 6: Video Production (if requested)
+        .if_(
+            condition="'video' in content_formats",
+            args={"content_formats": Input("content_formats")}
+        )
+        .sub_plan(
+            plan=get_plan("video-production"),
+            plan_inputs={
+                "video_topic": Input("primary_topic"),
+                "target_platform": "youtube",
+                "video_style": "educational",
+                "brand_guidelines": Input("brand_guidelines")
+            },
+            step_name="video_production_phase"
+        )
+        .endif()
+        
+        # Phase 7: Human Approval Gate
+        .llm_step(
+            task=APPROVAL_GATE_TASK,
+            inputs=[
+                Input("project_name"),
+                Input("content_formats"),
+                StepOutput("article_creation_phase"),
+                StepOutput("fact_checking_phase"),
+                StepOutput("podcast_production_phase"),
+                StepOutput("video_production_phase"),
+                Input("approval_level")
+            ],
+            step_name="final_approval_gate"
+        )
+        
+        # Phase 8: Multi-Platform Publishing
+        .sub_plan(
+            plan=get_plan("publishing"),
+            plan_inputs={
+                "content_package": {
+                    "article": StepOutput("article_creation_phase"),
+                    "podcast": StepOutput("podcast_production_phase"),
+                    "video": StepOutput("video_production_phase")
+                },
+                "publishing_schedule": Input("project_deadline"),
+                "content_id": Input("project_name")
+            },
+            step_name="publishing_phase"
+        )
+        
+        # Phase 9: Generate Final Report
+        .llm_step(
+            task=FINAL_REPORT_TASK,
+            inputs=[
+                Input("project_name"),
+                Input("primary_topic"),
+                StepOutput("market_research_phase"),
+                Input("content_formats"),
+                StepOutput("publishing_phase")
+            ],
+            step_name="generate_final_report"
+        )
+        
+        # Step 10: Save Complete Project
+        .function_step(
+            step_name="complete_project_filename",
+            function=complete_project_filename,
+            args={"project_name": Input("project_name")}
+        )
+        .invoke_tool_step(
+            step_name="save_complete_project",
+            tool="file_writer_tool",
+            args={
+                "filename": StepOutput("complete_project_filename"),
+                "content": StepOutput("generate_final_report")
+            }
+        )
+        
+        .final_output(
+            output_schema=FinalContentOutput,
+            summarize=True
+        )
+        .build()
+    )
+
+
+def _requests(*content_formats):
+    def enabled(inputs):
+        requested = inputs.get("content_formats") or DEFAULT_CONTENT_FORMATS
+        return any(content_format in requested for content_format in content_formats)
+    return enabled
+
+
+def create_master_phases():
+    """Phases of the master pipeline, run as parallel branches by PortiaClient.run_phases.
+
+    Mirrors phases 1-6 of create_master_content_production_system: video
+    production only needs the pipeline inputs, so it runs alongside research
+    and writing, and fact checking and podcast production both start as soon
+    as the article exists. The article is also written when only a podcast
+    is requested, since it is the episode's source content.
+    """
+    return [
+        Phase(
+            name="market_research_phase",
+            plan=partial(get_plan, "market-research"),
+            inputs=lambda inputs, outputs: {
+                "topic": inputs["primary_topic"],
+                "target_audience": inputs["target_audience"],
+                "research_depth": "comprehensive"
+            },
+        ),
+        Phase(
+            name="content_planning_phase",
+            plan=partial(get_plan, "content-planning"),
+            inputs=lambda inputs, outputs: {
+                "research_summary": outputs["market_research_phase"],
+                "content_goals": f"Create engaging {inputs.get('content_formats') or DEFAULT_CONTENT_FORMATS} content about {inputs['primary_topic']}",
+                "brand_guidelines": inputs.get("brand_guidelines")
+            },
+            depends_on=("market_research_phase",),
+        ),
+        Phase(
+            name="article_creation_phase",
+            plan=partial(get_plan, "article-writing"),
+            inputs=lambda inputs, outputs: {
+                "topic": inputs["primary_topic"],
+                "target_keywords": pick(outputs.get("market_research_phase"), "target_keywords"),
+                "audience_level": "intermediate",
+                "content_angle": pick(outputs.get("content_planning_phase"), "recommended_angles[0]")
+            },
+            depends_on=("market_research_phase", "content_planning_phase"),
+            enabled=_requests("article", "podcast"),
+        ),
+        Phase(
+            name="fact_checking_phase",
+            plan=partial(get_plan, "fact-checking"),
+            inputs=lambda inputs, outputs: {
+                "content_to_verify": pick(outputs.get("article_creation_phase"), "main_article"),
+                "verification_level": "thorough"
+            },
+            depends_on=("article_creation_phase",),
+            enabled=_requests("article"),
+        ),
+        Phase(
+            name="podcast_production_phase",
+            plan=partial(get_plan, "podcast-production"),
+            inputs=lambda inputs, outputs: {
+                "episode_topic": inputs["primary_topic"],
+                "source_content": pick(outputs.get("article_creation_phase"), "main_article"),
+                "target_duration": 25,
+                "episode_number": 1
+            },
+            depends_on=("article_creation_phase",),
+            enabled=_requests("podcast"),
+        ),
+        Phase(
+            name="video_production_phase",
+            plan=partial(get_plan, "video-production"),
+            inputs=lambda inputs, outputs: {
+                "video_topic": inputs["primary_topic"],
+                "target_platform": "youtube",
+                "video_style": "educational",
+                "brand_guidelines": inputs.get("brand_guidelines")
+            },
+            enabled=_requests("video"),
+        ),
+    ]
+
+
+def master_finalization_inputs(inputs, outputs):
+    """plan_run_inputs for create_master_finalization_plan from the joined phase outputs."""
+    return {
+        "project_name": inputs["project_name"],
+        "primary_topic": inputs["primary_topic"],
+        "content_formats": inputs.get("content_formats") or DEFAULT_CONTENT_FORMATS,
+        "project_deadline": inputs.get("project_deadline"),
+        "approval_level": inputs.get("approval_level") or "medium",
+        **{name: outputs.get(name) for name in (
+            "market_research_phase",
+            "article_creation_phase",
+            "fact_checking_phase",
+            "podcast_production_phase",
+            "video_production_phase",
+        )},
+    }
+
+
+def create_master_finalization_plan():
+    """Join point of the master pipeline: approval gate, publishing and final report (phases 7-10)."""
+    return (
+        PlanBuilderV2("Master AI Content Production System - Finalization")
+
+        .input(name="project_name", description="Name of the content production project")
+        .input(name="primary_topic", description="Main topic for content creation")
+        .input(name="content_formats", description="List of content formats created")
+        .input(name="project_deadline", description="Project completion deadline")
+        .input(name="approval_level", description="low/medium/high human oversight", default_value="medium")
+        .input(name="market_research_phase", description="Output of the market research phase")
+        .input(name="article_creation_phase", description="Output of the article phase, if run", default_value=None)
+        .input(name="fact_checking_phase", description="Output of the fact-checking phase, if run", default_value=None)
+        .input(name="podcast_production_phase", description="Output of the podcast phase, if run", default_value=None)
+        .input(name="video_production_phase", description="Output of the video phase, if run", default_value=None)
+
+        # Phase 7: Human Approval Gate
+        .llm_step(
+            task=APPROVAL_GATE_TASK,
+            inputs=[
+                Input("project_name"),
+                Input("content_formats"),
+                Input("article_creation_phase"),
+                Input("fact_checking_phase"),
+                Input("podcast_production_phase"),
+                Input("video_production_phase"),
+                Input("approval_level")
+            ],
+            step_name="final_approval_gate"
+        )
+
+        # Phase 8: Multi-Platform Publishing
+        .sub_plan(
+            plan=get_plan("publishing"),
+            plan_inputs={
+                "content_package": {
+                    "article": Input("article_creation_phase"),
+                    "podcast": Input("podcast_production_phase"),
+                    "video": Input("video_production_phase")
+                },
+                "publishing_schedule": Input("project_deadline"),
+                "content_id": Input("project_name")
+            },
+            step_name="publishing_phase"
+        )
+
+        # Phase 9: Generate Final Report
+        .llm_step(
+            task=FINAL_REPORT_TASK,
+            inputs=[
+                Input("project_name"),
+                Input("primary_topic"),
+                Input("market_research_phase"),
+                Input("content_formats"),
+                StepOutput("publishing_phase")
+            ],
+            step_name="generate_final_report"
+        )
+
+        # Step 10: Save Complete Project
+        .function_step(
+            step_name="complete_project_filename",
+            function=complete_project_filename,
+            args={"project_name": Input("project_name")}
+        )
+        .invoke_tool_step(
+            step_name="save_complete_project",
+            tool="file_writer_tool",
+            args={
+                "filename": StepOutput("complete_project_filename"),
+                "content": StepOutput("generate_final_report")
+            }
+        )
+
+        .final_output(
+            output_schema=FinalContentOutput,
+            summarize=True
+        )
+        .build()
+    )
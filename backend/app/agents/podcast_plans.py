@@ -1,6 +1,20 @@
 from portia import PlanBuilderV2, StepOutput, Input
+from ..core.prompt_budget import InputCap, PromptBudget, SUMMARIZE
 from ..schema.content_schemas import PodcastPackage
 
+# Prompt budgets (tokens) of the LLM step inputs, see app.core.prompt_budget
+PODCAST_PRODUCTION_BUDGET = PromptBudget(steps={
+    "create_podcast_script": {
+        "source_content": InputCap(4000, SUMMARIZE),
+        "research_podcast_content": InputCap(2000),
+        "analyze_similar_podcasts": InputCap(1500),
+    },
+    # The script is passed to three steps; none of them needs it word for word
+    "generate_show_notes": {"create_podcast_script": InputCap(3000, SUMMARIZE)},
+    "create_chapter_markers": {"create_podcast_script": InputCap(4000, SUMMARIZE)},
+    "create_audio_instructions": {"create_podcast_script": InputCap(3000, SUMMARIZE)},
+})
+
 def create_podcast_production_system():
     """Complete podcast production pipeline."""
     return (
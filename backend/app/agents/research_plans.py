@@ -1,6 +1,41 @@
 from portia import PlanBuilderV2, StepOutput, Input
+from ..core.compaction import compact_sources, compaction_settings
+from ..core.map_reduce import get_map_reduce
+from ..core.run_state import current_run
 from ..schema.content_schemas import ResearchSummary, WebRagResult
 
+SOURCE_SUMMARY = "Summarize this research source: topics, angles, formats, claims and data."
+
+
+def compact_research_sources(topic, trends, crawl, extract, competitors, reports, videos):
+    """Dedupe, rank and budget the research tool outputs before synthesis.
+
+    Long pages are summarized by map-reduce only once they have been ranked
+    into the budget.
+    """
+    summarizer = get_map_reduce()
+    condense = None
+    if summarizer is not None:
+        def condense(texts, max_tokens):
+            return summarizer.condense_many(texts, max_tokens, SOURCE_SUMMARY)
+    compacted = compact_sources(
+        {
+            "analyze_google_trends": trends,
+            "crawl_competitor_sites": crawl,
+            "extract_competitor_content": extract,
+            "search_competitor_content": competitors,
+            "find_industry_reports": reports,
+            "analyze_youtube_content": videos,
+        },
+        topic=str(topic or ""),
+        condense=condense,
+        **compaction_settings(),
+    )
+    state = current_run()
+    if state is not None:
+        state.emit("sources_compacted", **compacted["stats"])
+    return compacted
+
 
 def create_market_research_plan():
     """Creates comprehensive market research plan using PlanBuilderV2."""
@@ -92,19 +127,33 @@ def create_market_research_plan():
             }
         )
         
+        # Compact sources: canonical URLs, dedupe, rank by topic, token budget;
+        # long pages that are kept are then condensed by map-reduce
+        .function_step(
+            step_name="compact_research_sources",
+            function=compact_research_sources,
+            args={
+                "topic": Input("topic"),
+                "trends": StepOutput("analyze_google_trends"),
+                "crawl": StepOutput("crawl_competitor_sites"),
+                "extract": StepOutput("extract_competitor_content"),
+                "competitors": StepOutput("search_competitor_content"),
+                "reports": StepOutput("find_industry_reports"),
+                "videos": StepOutput("analyze_youtube_content"),
+            }
+        )
+
         # Step 7: Synthesize Research Findings
         .llm_step(
             step_name="synthesize_research",
             task=f"""
             Analyze all research data and create comprehensive market research summary for {Input('topic')}:
             
-            Data sources:
-            - Google trends: {{analyze_google_trends}}
-            - Competitor crawl: {{crawl_competitor_sites}}
-            - Competitor analysis: {{extract_competitor_content}}
-            - Competitor content: {{search_competitor_content}}
-            - Industry reports: {{find_industry_reports}}
-            - Video content trends: {{analyze_youtube_content}}
+            Data sources (deduplicated and ranked by relevance; each source lists the
+            research steps that found it: analyze_google_trends, crawl_competitor_sites,
+            extract_competitor_content, search_competitor_content, find_industry_reports,
+            analyze_youtube_content):
+            {{compact_research_sources}}
             - Target audience: {Input('target_audience')}
             
             Generate insights on:
@@ -118,12 +167,7 @@ def create_market_research_plan():
             8. Emerging trends to watch
             """,
             inputs=[
-                StepOutput("analyze_google_trends"),
-                StepOutput("crawl_competitor_sites"),
-                StepOutput("extract_competitor_content"),
-                StepOutput("search_competitor_content"),
-                StepOutput("find_industry_reports"),
-                StepOutput("analyze_youtube_content"),
+                StepOutput("compact_research_sources"),
                 Input("topic"),
                 Input("target_audience")
             ]
@@ -0,0 +1,90 @@
+"""Sample inputs for every plan, by plan registry name.
+
+These are the "AI in Healthcare" scenarios of the plan tests in
+``app/tests``. Offline runs (PORTIA_SIMULATE=1), cassette recordings and
+the benchmark harness use them as plan run inputs and as API request
+payloads. ``master-pipeline`` is the API payload of the phased pipeline.
+"""
+
+TOPIC = "AI in Healthcare"
+AUDIENCE = "Healthcare professionals, hospital administrators, medical researchers"
+
+ARTICLE = (
+    "# AI-Powered Medical Diagnosis: Transforming Healthcare in 2025\n\n"
+    "Artificial intelligence is revolutionizing medical diagnosis, offering unprecedented accuracy in early "
+    "disease detection. Recent studies show AI diagnostic tools achieving 95% accuracy rates, significantly "
+    "outperforming traditional diagnostic methods.\n\n"
+    "## Key Benefits\n\n"
+    "- **Early Detection**: AI can identify diseases in their earliest stages\n"
+    "- **Improved Accuracy**: 95% accuracy vs 80% traditional methods\n"
+    "- **Cost Reduction**: Lower healthcare costs through prevention\n"
+)
+
+SCENARIOS = {
+    "market-research": {
+        "topic": "AI_in_Healthcare",
+        "target_audience": AUDIENCE,
+        "competitor_domains": ["healthitnews.com", "medicalfuturist.com"],
+        "research_depth": "comprehensive",
+    },
+    "content-gap-analysis": {
+        "research_data": "AI diagnostics, clinical documentation and patient triage are the fastest growing topics.",
+        "existing_content_urls": [],
+    },
+    "content-planning": {
+        "research_summary": "AI healthcare market research: diagnostics, documentation and triage lead adoption.",
+        "content_goals": "Establish thought leadership in AI healthcare, drive engagement from healthcare professionals",
+        "brand_guidelines": "Professional yet approachable tone, evidence-based content",
+        "publishing_frequency": "3x per week",
+    },
+    "article-writing": {
+        "topic": "AI-Powered Medical Diagnosis: Transforming Healthcare in 2025",
+        "target_keywords": ["AI medical diagnosis", "artificial intelligence healthcare", "AI diagnostics"],
+        "word_count_target": 1500,
+        "audience_level": "intermediate",
+        "content_angle": "Practical implementation guide for healthcare professionals",
+    },
+    "fact-checking": {
+        "content_to_verify": (
+            "AI in healthcare is projected to reach $613.81 billion by 2034, growing at a CAGR of 37%. "
+            "The FDA has approved over 1250 AI-based medical devices as of 2024."
+        ),
+        "verification_level": "thorough",
+    },
+    "podcast-production": {
+        "episode_topic": "AI in Healthcare: The Future of Medical Diagnosis",
+        "source_content": "AI is revolutionizing healthcare by improving diagnostic accuracy and reducing medical errors...",
+        "target_duration": 25,
+        "host_style": "conversational",
+        "episode_number": "001",
+    },
+    "podcast-audio-production": {
+        "podcast_script": "Welcome to episode one. Today we look at how AI is changing medical diagnosis...",
+        "output_path": "podcast_episodes/episode_001_audio.mp3",
+    },
+    "video-production": {
+        "video_topic": TOPIC,
+        "video_style": "educational",
+        "brand_guidelines": AUDIENCE,
+        "target_platform": "youtube",
+    },
+    "publishing": {
+        "content_package": {
+            "main_article": ARTICLE,
+            "seo_analysis": "Optimized for keywords: AI medical diagnosis, healthcare AI, medical technology",
+            "content_types": ["blog", "notion_site"],
+        },
+        "publishing_schedule": "2025-08-24T10:00:00Z",
+        "content_id": "ai_medical_diagnosis_2025",
+    },
+    "master-pipeline": {
+        "project_name": "ai_healthcare_launch",
+        "primary_topic": TOPIC,
+        "target_audience": AUDIENCE,
+        "content_formats": ["article", "podcast", "video"],
+        "publishing_platforms": ["notion", "youtube"],
+        "brand_guidelines": "Professional yet approachable tone, evidence-based content",
+        "project_deadline": "2025-09-30",
+        "approval_level": "low",
+    },
+}
@@ -107,7 +107,7 @@ def create_video_production_system():
             inputs=[StepOutput("create_video_script"), StepOutput("parse_shot_list")]
         )
 
-        # Step 6: Generate Video (using video_generation_tool)
+        # Step 6: Generate Video (returns a VideoJob, see custom_tools/video_job_tool.py)
         .invoke_tool_step(
             step_name="generate_video",
             tool="portia:mcp:mcp.invideo.io:generate_video_from_script",
@@ -122,13 +122,14 @@ def create_video_production_system():
 
         # Step 7: Package Video Production Materials
         .function_step(
-            function=lambda script, shots, thumbs, metadata, editing, topic, platform, video_url: {
+            function=lambda script, shots, thumbs, metadata, editing, topic, platform, video_job: {
                 "video_script": script,
                 "shot_list": shots,
                 "thumbnail_concepts": thumbs,
                 "video_metadata": metadata,
                 "editing_instructions": editing,
-                "video_url": video_url,
+                "video_url": video_job.url,
+                "video_job": video_job,
                 "production_details": {
                     "topic": topic,
                     "platform": platform,
@@ -145,7 +146,7 @@ def create_video_production_system():
                 "editing": StepOutput("create_editing_instructions"),
                 "topic": Input("video_topic"),
                 "platform": Input("target_platform"),
-                "video_url": StepOutput("generate_video")
+                "video_job": StepOutput("generate_video")
             },
             
         )
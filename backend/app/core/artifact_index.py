@@ -0,0 +1,289 @@
+"""SQLite metadata index over generated artifacts.
+
+The index holds one row per output file (path, kind, topic, size, mtime,
+content hash and producing run id). Tools update it as they write files and a
+reconciler keeps it in step with the filesystem, so browsing history is a
+keyset-paginated query instead of a directory slurp.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Output folders written by the plans in app/agents
+ARTIFACT_FOLDERS = [
+    "research_reports",
+    "content_plans",
+    "content_drafts",
+    "fact_check_reports",
+    "podcast_episodes",
+    "video_production",
+    "publishing_reports",
+    "completed_projects",
+]
+
+FIELDS = ("path", "name", "kind", "topic", "size", "mtime", "sha256", "run_id", "indexed_at")
+
+# Filename decorations added by the plans around the topic they were run for
+_TOPIC_AFFIXES = re.compile(
+    r"(^(verification_report|notion_publication_report|publication_report)_)"
+    r"|(_(market_research|summary|package|complete|audio)$)"
+)
+
+
+def derive_topic(name: str) -> Optional[str]:
+    """Best-effort topic from an artifact filename, e.g. 'AI in Healthcare_summary.txt'."""
+    stem = Path(name).stem
+    topic = _TOPIC_AFFIXES.sub("", stem).strip(" _")
+    return topic or None
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row["mtime"], row["path"]]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        mtime, path = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(mtime), str(path)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class ArtifactIndex:
+    """SQLite-backed index of artifact metadata."""
+
+    def __init__(self, db_path: str = "artifact_index/index.db"):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    path TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    kind TEXT,
+                    topic TEXT,
+                    size INTEGER,
+                    mtime REAL,
+                    sha256 TEXT,
+                    run_id TEXT,
+                    indexed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_recent ON artifacts (mtime DESC, path DESC)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts (kind, mtime DESC, path DESC)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_topic ON artifacts (topic)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts (run_id)")
+
+    def upsert_file(self, path, run_id: Optional[str] = None, topic: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Index (or re-index) a file. A known run id is kept if none is given."""
+        path = Path(path)
+        if not path.is_file():
+            return None
+        try:
+            relative = path.resolve().relative_to(Path.cwd())
+        except ValueError:
+            relative = path
+        stat = path.stat()
+        row = {
+            "path": relative.as_posix(),
+            "name": path.name,
+            "kind": relative.parts[0] if len(relative.parts) > 1 else None,
+            "topic": topic or derive_topic(path.name),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_sha256(path),
+            "run_id": run_id,
+            "indexed_at": time.time(),
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO artifacts (path, name, kind, topic, size, mtime, sha256, run_id, indexed_at)
+                VALUES (:path, :name, :kind, :topic, :size, :mtime, :sha256, :run_id, :indexed_at)
+                ON CONFLICT(path) DO UPDATE SET
+                    name = excluded.name, kind = excluded.kind, topic = excluded.topic,
+                    size = excluded.size, mtime = excluded.mtime, sha256 = excluded.sha256,
+                    run_id = COALESCE(excluded.run_id, artifacts.run_id),
+                    indexed_at = excluded.indexed_at
+                """,
+                row,
+            )
+        return self.get(row["path"])
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM artifacts WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def query(
+        self,
+        kind: Optional[str] = None,
+        topic: Optional[str] = None,
+        run_id: Optional[str] = None,
+        name_suffix: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Newest-first page of artifacts with keyset pagination and field projection."""
+        fields = list(fields or FIELDS)
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        # The cursor columns are always selected, then dropped if not requested
+        columns = list(dict.fromkeys(fields + ["mtime", "path"]))
+        clauses, params = [], []
+        for column, value in (("kind", kind), ("topic", topic), ("run_id", run_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if name_suffix:
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            params.append("%" + re.sub(r"([\\%_])", r"\\\1", name_suffix))
+        if cursor:
+            mtime, path = decode_cursor(cursor)
+            clauses.append("(mtime < ? OR (mtime = ? AND path < ?))")
+            params.extend([mtime, mtime, path])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join(columns)} FROM artifacts {where} ORDER BY mtime DESC, path DESC LIMIT ?"
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, (*params, limit + 1)).fetchall()]
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        items = [{name: row[name] for name in fields} for row in rows[:limit]]
+        return {"items": items, "next_cursor": next_cursor}
+
+    def latest(self, kind: str, name_suffix: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        items = self.query(kind=kind, name_suffix=name_suffix, limit=1)["items"]
+        return items[0] if items else None
+
+    def reconcile(self, roots: Iterable[str] = ARTIFACT_FOLDERS) -> Dict[str, int]:
+        """Bring the index in line with the files currently under `roots`."""
+        stats = {"scanned": 0, "updated": 0, "removed": 0}
+        seen = set()
+        for root in roots:
+            known = self._known_under(root)
+            for path in self._walk(root):
+                stats["scanned"] += 1
+                relative = path.as_posix()
+                seen.add(relative)
+                stat = path.stat()
+                entry = known.get(relative)
+                if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                    continue
+                self.upsert_file(path)
+                stats["updated"] += 1
+            missing = [p for p in known if p not in seen]
+            if missing:
+                with self._lock, self._conn:
+                    self._conn.executemany("DELETE FROM artifacts WHERE path = ?", [(p,) for p in missing])
+                stats["removed"] += len(missing)
+        return stats
+
+    def _known_under(self, root: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                # Range scan over the primary key: every path starting with "<root>/"
+                "SELECT path, size, mtime FROM artifacts WHERE path >= ? AND path < ?",
+                (f"{root}/", f"{root}0"),
+            ).fetchall()
+        return {row["path"]: dict(row) for row in rows}
+
+    @staticmethod
+    def _walk(root: str):
+        if not os.path.isdir(root):
+            return
+        stack = [root]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield Path(entry.path)
+
+
+_default_index: Optional[ArtifactIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_artifact_index() -> ArtifactIndex:
+    """Process-wide index configured from PORTIA_ARTIFACT_INDEX_DB."""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = ArtifactIndex(os.getenv("PORTIA_ARTIFACT_INDEX_DB", "artifact_index/index.db"))
+        return _default_index
+
+
+def start_reconciler(
+    index: ArtifactIndex,
+    interval: float,
+    roots: Iterable[str] = ARTIFACT_FOLDERS,
+    lock_path: Optional[str] = None,
+) -> Optional[threading.Thread]:
+    """Reconcile immediately, then every `interval` seconds, on a daemon thread.
+
+    With lock_path, only the first process to take the lock file reconciles
+    (one reconciler per server, not per worker); the others return None.
+    """
+    roots = list(roots)
+    if lock_path is not None and not _hold_lock(lock_path):
+        return None
+
+    def loop():
+        while True:
+            try:
+                index.reconcile(roots)
+            except Exception:
+                logger.exception("Artifact index reconciliation failed")
+            if interval <= 0:
+                return
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="artifact-reconciler", daemon=True)
+    thread.start()
+    return thread
+
+
+_held_locks = []
+
+
+def _hold_lock(path: str) -> bool:
+    """Take an exclusive lock on path for the life of the process, without waiting."""
+    import fcntl
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _held_locks.append(handle)
+    return True
@@ -0,0 +1,109 @@
+"""Run-scoped artifact manifests.
+
+File-producing tools record every file they write against the plan run that
+wrote it. When the run finishes the list is persisted as a small JSON manifest,
+so API responses can return references to exactly the files a run produced
+and clients fetch content lazily instead of re-reading whole output folders.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.artifact_index import get_artifact_index
+from app.core.run_state import RunState, current_run, get_run
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_entry(path, tool_id: Optional[str] = None, step: Optional[str] = None) -> Dict[str, Any]:
+    """Describe a file written by a tool."""
+    path = Path(path)
+    try:
+        relative = path.resolve().relative_to(Path.cwd())
+    except ValueError:
+        relative = path
+    return {
+        "name": path.name,
+        "path": relative.as_posix(),
+        "kind": relative.parts[0] if len(relative.parts) > 1 else None,
+        "size": path.stat().st_size if path.exists() else None,
+        "tool_id": tool_id,
+        "step": step,
+        "recorded_at": time.time(),
+    }
+
+
+def record_artifact(run_id, path, tool_id: Optional[str] = None, step: Optional[str] = None) -> None:
+    """Record a file in the artifact index and against the run that wrote it."""
+    state = get_run(run_id) or current_run()
+    try:
+        get_artifact_index().upsert_file(path, run_id=str(run_id) if run_id else (state and state.run_id))
+    except Exception:
+        # Indexing is best effort; the reconciler will pick the file up later
+        logger.exception("Failed to index artifact %s", path)
+    if state is None:
+        return
+    entry = artifact_entry(path, tool_id=tool_id, step=step)
+    # A step that rewrites the same file keeps a single, up-to-date entry
+    state.artifacts[:] = [a for a in state.artifacts if a["path"] != entry["path"]]
+    state.artifacts.append(entry)
+
+
+def artifact_ref(run_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Lightweight reference to an artifact; content is fetched from `url` on demand."""
+    return {
+        "name": entry["name"],
+        "path": entry["path"],
+        "kind": entry["kind"],
+        "size": entry["size"],
+        "url": f"/api/runs/{run_id}/artifacts/{entry['path']}",
+    }
+
+
+def run_artifact_refs(state: Optional[RunState], kind: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """References to the artifacts a run produced, keyed by filename."""
+    if state is None or state.run_id is None:
+        return {}
+    return {
+        entry["name"]: artifact_ref(state.run_id, entry)
+        for entry in state.artifacts
+        if kind is None or entry["kind"] == kind
+    }
+
+
+class ManifestStore:
+    """Persists one JSON manifest per plan run."""
+
+    def __init__(self, root: str = "run_manifests"):
+        self.root = Path(root)
+
+    def _path(self, run_id: str) -> Path:
+        return self.root / f"{Path(str(run_id)).name}.json"
+
+    def save(self, run_id: str, artifacts: List[Dict[str, Any]], **metadata) -> Dict[str, Any]:
+        manifest = {"run_id": run_id, "created_at": time.time(), **metadata, "artifacts": artifacts}
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path(run_id).with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, default=str, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self._path(run_id))
+        return manifest
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(run_id)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def find_artifact(self, run_id: str, path: str) -> Optional[Dict[str, Any]]:
+        """Return the manifest entry for `path` (or a bare filename) if the run produced it."""
+        manifest = self.load(run_id)
+        if manifest is None:
+            return None
+        for entry in manifest["artifacts"]:
+            if path in (entry["path"], entry["name"]):
+                return entry
+        return None
@@ -0,0 +1,412 @@
+"""GenerativeModel wrappers for the completion cache, run checkpoints, prompt budgets, metrics, tracing and cassettes."""
+
+import asyncio
+import time
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from portia.model import GenerativeModel, Message
+
+from app.core.cassettes import CassetteStore
+from app.core.checkpoints import CheckpointStore
+from app.core.compaction import estimate_tokens
+from app.core.llm_cache import CompletionCache
+from app.core.metrics import Metrics
+from app.core.prompt_budget import PromptBudgeter
+from app.core.run_state import current_run
+from app.core.tracing import CLIENT, Tracer
+
+
+def _messages(messages):
+    return [message.model_dump(mode="json") for message in messages]
+
+
+def _encode(response):
+    return response.model_dump(mode="json")
+
+
+class CachedGenerativeModel(GenerativeModel):
+    """Delegates to another model, answering repeated prompts from the cache."""
+
+    def __init__(self, inner: GenerativeModel, cache: CompletionCache):
+        super().__init__(model_name=inner.model_name)
+        self.provider = inner.provider
+        self.inner = inner
+        self.cache = cache
+
+    def get_response(self, messages: list[Message]) -> Message:
+        return self.cache.fetch(
+            str(self.inner), _messages(messages), None,
+            compute=lambda: self.inner.get_response(messages),
+            encode=_encode,
+            decode=Message.model_validate,
+        )
+
+    def get_structured_response(self, messages: list[Message], schema):
+        return self.cache.fetch(
+            str(self.inner), _messages(messages), schema.model_json_schema(),
+            compute=lambda: self.inner.get_structured_response(messages, schema),
+            encode=_encode,
+            decode=schema.model_validate,
+        )
+
+    async def aget_response(self, messages: list[Message]) -> Message:
+        if self.cache.bypassed():
+            return await self.inner.aget_response(messages)
+        key_messages = _messages(messages)
+        cached = self.cache.get(str(self.inner), key_messages)
+        if cached is not None:
+            return Message.model_validate(cached)
+        response = await self.inner.aget_response(messages)
+        self.cache.put(str(self.inner), key_messages, None, _encode(response))
+        return response
+
+    async def aget_structured_response(self, messages: list[Message], schema):
+        if self.cache.bypassed():
+            return await self.inner.aget_structured_response(messages, schema)
+        key_messages, schema_json = _messages(messages), schema.model_json_schema()
+        cached = self.cache.get(str(self.inner), key_messages, schema_json)
+        if cached is not None:
+            return schema.model_validate(cached)
+        response = await self.inner.aget_structured_response(messages, schema)
+        self.cache.put(str(self.inner), key_messages, schema_json, _encode(response))
+        return response
+
+    def to_langchain(self):
+        return CachedChatModel(inner=self.inner.to_langchain(), cache=self.cache, model=str(self.inner))
+
+    def __str__(self) -> str:
+        return str(self.inner)
+
+
+class CachedChatModel(BaseChatModel):
+    """LangChain side of CachedGenerativeModel, for the engine's tool-calling agents."""
+
+    inner: Any
+    cache: Any
+    model: str
+    # Schemas of the bound tools, part of the cache key
+    tools: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "portia-cached"
+
+    def bind_tools(self, tools, **kwargs):
+        bound = {"tools": [convert_to_openai_tool(tool) for tool in tools], **{k: str(v) for k, v in kwargs.items()}}
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs), "tools": bound})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.cache.fetch(
+            self.model, [message.model_dump(mode="json") for message in messages], self.tools,
+            compute=lambda: self.inner.invoke(messages, stop=stop, **kwargs),
+            encode=_encode,
+            decode=AIMessage.model_validate,
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class CheckpointedGenerativeModel(GenerativeModel):
+    """Delegates to another model, journaling completions for resumed runs."""
+
+    def __init__(self, inner: GenerativeModel, store: CheckpointStore):
+        super().__init__(model_name=inner.model_name)
+        self.provider = inner.provider
+        self.inner = inner
+        self.store = store
+
+    def get_response(self, messages: list[Message]) -> Message:
+        return self.store.call(
+            current_run(), "llm",
+            compute=lambda: self.inner.get_response(messages),
+            encode=_encode,
+            decode=Message.model_validate,
+        )
+
+    def get_structured_response(self, messages: list[Message], schema):
+        return self.store.call(
+            current_run(), "llm",
+            compute=lambda: self.inner.get_structured_response(messages, schema),
+            encode=_encode,
+            decode=schema.model_validate,
+        )
+
+    async def aget_response(self, messages: list[Message]) -> Message:
+        slot = self.store.begin_call(current_run(), "llm")
+        if slot is not None and slot.replayed:
+            return Message.model_validate(slot.value)
+        response = await self.inner.aget_response(messages)
+        self.store.end_call(slot, _encode(response))
+        return response
+
+    async def aget_structured_response(self, messages: list[Message], schema):
+        slot = self.store.begin_call(current_run(), "llm")
+        if slot is not None and slot.replayed:
+            return schema.model_validate(slot.value)
+        response = await self.inner.aget_structured_response(messages, schema)
+        self.store.end_call(slot, _encode(response))
+        return response
+
+    def to_langchain(self):
+        return CheckpointedChatModel(inner=self.inner.to_langchain(), store=self.store)
+
+    def __str__(self) -> str:
+        return str(self.inner)
+
+
+class CheckpointedChatModel(BaseChatModel):
+    """LangChain side of CheckpointedGenerativeModel, for the engine's tool-calling agents."""
+
+    inner: Any
+    store: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "portia-checkpointed"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.store.call(
+            current_run(), "llm",
+            compute=lambda: self.inner.invoke(messages, stop=stop, **kwargs),
+            encode=_encode,
+            decode=AIMessage.model_validate,
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _budget_messages(budgeter: PromptBudgeter, messages):
+    """Portia or LangChain messages with the step inputs rendered into them capped."""
+    state = current_run()
+    contents = [message.content if isinstance(message.content, str) else "" for message in messages]
+    budgeted, report = budgeter.apply(
+        contents,
+        state.prompt_inputs if state is not None else {},
+        budget=state.prompt_budget if state is not None else None,
+        plan=getattr(state.plan, "label", None) if state is not None else None,
+        step=state.current_step if state is not None else None,
+    )
+    if state is not None:
+        state.emit("prompt_budget", **report)
+    return [
+        message if new == old else message.model_copy(update={"content": new})
+        for message, old, new in zip(messages, contents, budgeted)
+    ]
+
+
+class BudgetedGenerativeModel(GenerativeModel):
+    """Delegates to another model after capping the step inputs rendered into the prompt."""
+
+    def __init__(self, inner: GenerativeModel, budgeter: PromptBudgeter):
+        super().__init__(model_name=inner.model_name)
+        self.provider = inner.provider
+        self.inner = inner
+        self.budgeter = budgeter
+
+    def _budget(self, messages: list[Message]) -> list[Message]:
+        return _budget_messages(self.budgeter, messages)
+
+    def get_response(self, messages: list[Message]) -> Message:
+        return self.inner.get_response(self._budget(messages))
+
+    def get_structured_response(self, messages: list[Message], schema):
+        return self.inner.get_structured_response(self._budget(messages), schema)
+
+    async def aget_response(self, messages: list[Message]) -> Message:
+        return await self.inner.aget_response(self._budget(messages))
+
+    async def aget_structured_response(self, messages: list[Message], schema):
+        return await self.inner.aget_structured_response(self._budget(messages), schema)
+
+    def to_langchain(self):
+        return BudgetedChatModel(inner=self.inner.to_langchain(), budgeter=self.budgeter)
+
+    def __str__(self) -> str:
+        return str(self.inner)
+
+
+class BudgetedChatModel(BaseChatModel):
+    """LangChain side of BudgetedGenerativeModel, for the engine's tool-calling agents."""
+
+    inner: Any
+    budgeter: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "portia-budgeted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.inner.invoke(_budget_messages(self.budgeter, messages), stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class MeteredGenerativeModel(GenerativeModel):
+    """Delegates to another model, recording metrics and a trace span per call."""
+
+    def __init__(self, inner: GenerativeModel, metrics: Optional[Metrics] = None, tracer: Optional[Tracer] = None):
+        super().__init__(model_name=inner.model_name)
+        self.provider = inner.provider
+        self.inner = inner
+        self.metrics = metrics
+        self.tracer = tracer
+
+    def _begin(self, messages):
+        state = current_run()
+        step = state.current_step if state is not None else None
+        tokens_in = sum(estimate_tokens(str(message.content)) for message in messages)
+        span = None
+        if self.tracer is not None:
+            attempt = 1
+            if state is not None:
+                attempt = state.attempts[(step, "llm")] = state.attempts.get((step, "llm"), 0) + 1
+            span = self.tracer.start(
+                "llm_call", CLIENT, model=str(self.inner), step=step, prompt_tokens=tokens_in, attempt=attempt
+            )
+        return state, step, tokens_in, span, time.perf_counter()
+
+    def _finish(self, call, response=None, error=None):
+        state, step, tokens_in, span, started = call
+        tokens_out = 0
+        if response is not None:
+            content = response.content if isinstance(response, (Message, BaseMessage)) else response.model_dump_json()
+            tokens_out = estimate_tokens(str(content or ""))
+        if self.metrics is not None:
+            if error is not None:
+                self.metrics.error(getattr(state.plan, "label", None) if state is not None else None, step, "llm")
+            else:
+                self.metrics.observe_llm(str(self.inner), step, time.perf_counter() - started, tokens_in, tokens_out)
+        if span is not None:
+            span[0].set(completion_tokens=tokens_out if error is None else None)
+            self.tracer.end(*span, error=error)
+
+    def _call(self, messages, compute):
+        call = self._begin(messages)
+        try:
+            response = compute()
+        except Exception as e:
+            self._finish(call, error=e)
+            raise
+        self._finish(call, response)
+        return response
+
+    async def _acall(self, messages, compute):
+        call = self._begin(messages)
+        try:
+            response = await compute()
+        except Exception as e:
+            self._finish(call, error=e)
+            raise
+        self._finish(call, response)
+        return response
+
+    def get_response(self, messages: list[Message]) -> Message:
+        return self._call(messages, lambda: self.inner.get_response(messages))
+
+    def get_structured_response(self, messages: list[Message], schema):
+        return self._call(messages, lambda: self.inner.get_structured_response(messages, schema))
+
+    async def aget_response(self, messages: list[Message]) -> Message:
+        return await self._acall(messages, lambda: self.inner.aget_response(messages))
+
+    async def aget_structured_response(self, messages: list[Message], schema):
+        return await self._acall(messages, lambda: self.inner.aget_structured_response(messages, schema))
+
+    def to_langchain(self):
+        return MeteredChatModel(inner=self.inner.to_langchain(), metered=self)
+
+    def __str__(self) -> str:
+        return str(self.inner)
+
+
+class MeteredChatModel(BaseChatModel):
+    """LangChain side of MeteredGenerativeModel, for the engine's tool-calling agents."""
+
+    inner: Any
+    # The MeteredGenerativeModel whose metrics, tracer and model label the calls use
+    metered: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "portia-metered"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.metered._call(messages, lambda: self.inner.invoke(messages, stop=stop, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class CassetteChatModel(BaseChatModel):
+    """LangChain side of CassetteGenerativeModel, for the engine's tool-calling agents."""
+
+    inner: Any
+    store: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "portia-cassette"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.store.call(
+            current_run(), "llm", "chat", [message.model_dump(mode="json") for message in messages],
+            compute=lambda: self.inner.invoke(messages, stop=stop, **kwargs),
+            encode=_encode,
+            decode=AIMessage.model_validate,
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class CassetteGenerativeModel(GenerativeModel):
+    """Delegates to another model, recording exchanges into the run's cassette or replaying them.
+
+    Exchanges are named by their response schema ("text" for plain completions)
+    rather than the model, so a cassette recorded against the configured model
+    replays on the simulated one. Async calls run the synchronous path in a
+    worker thread, so recording and replay behave the same either way.
+    """
+
+    def __init__(self, inner: GenerativeModel, store: CassetteStore):
+        super().__init__(model_name=inner.model_name)
+        self.provider = inner.provider
+        self.inner = inner
+        self.store = store
+
+    def get_response(self, messages: list[Message]) -> Message:
+        return self.store.call(
+            current_run(), "llm", "text", _messages(messages),
+            compute=lambda: self.inner.get_response(messages),
+            encode=_encode,
+            decode=Message.model_validate,
+        )
+
+    def get_structured_response(self, messages: list[Message], schema):
+        return self.store.call(
+            current_run(), "llm", schema.__name__, _messages(messages),
+            compute=lambda: self.inner.get_structured_response(messages, schema),
+            encode=_encode,
+            decode=schema.model_validate,
+        )
+
+    async def aget_response(self, messages: list[Message]) -> Message:
+        return await asyncio.to_thread(self.get_response, messages)
+
+    async def aget_structured_response(self, messages: list[Message], schema):
+        return await asyncio.to_thread(self.get_structured_response, messages, schema)
+
+    def to_langchain(self):
+        return CassetteChatModel(inner=self.inner.to_langchain(), store=self.store)
+
+    def __str__(self) -> str:
+        return str(self.inner)
@@ -0,0 +1,221 @@
+"""Cassettes: recorded tool and LLM calls of plan runs, replayed without the services.
+
+With PORTIA_CASSETTE_MODE=record, every remote tool call and LLM exchange of a
+plan run is written to ``<plan>-<inputs hash>.jsonl.gz`` in
+PORTIA_CASSETTE_DIR. It records the request key, the step that made the call,
+how long it took and the response or error. With PORTIA_CASSETTE_MODE=replay,
+the same plan and inputs are answered from that file. This gives a
+reproducible baseline for everything around the calls (orchestration,
+serialization, local file I/O).
+
+Replayed calls sleep for their recorded duration times
+PORTIA_CASSETTE_LATENCY ("original" = 1, "zero" = 0, or any factor). A call
+is matched by its request key first. Prompts that embed run ids or
+timestamps never match that way, so the next unplayed call of the same tool
+or model in the same step is used instead. Calls that match nothing go to the
+wrapped tool or model; in replay mode that is the offline simulator (see
+app/core/simulation.py). With PORTIA_CASSETTE_STRICT=1 they raise CassetteMiss.
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.run_state import RunState
+from app.core.serialization import to_jsonable
+from app.core.tool_cache import cache_key
+
+VERSION = 1
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMiss(LookupError):
+    """Raised in strict replay when a call has no recorded counterpart."""
+
+
+class ReplayedError(RuntimeError):
+    """A call that failed while recording, failing again on replay."""
+
+
+@dataclass
+class Interaction:
+    kind: str
+    name: str
+    key: str
+    step: Optional[str]
+    elapsed_ms: float
+    response: Any = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Cassette:
+    path: Path
+    header: Dict[str, Any] = field(default_factory=dict)
+    interactions: List[Interaction] = field(default_factory=list)
+    replayed: int = 0
+    misses: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._used = set()
+
+    def record(self, interaction: Interaction) -> None:
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def match(self, kind: str, name: str, key: str, step: Optional[str]) -> Optional[Interaction]:
+        """Claim the first unplayed call with this key, else the next one by the same tool or model in this step."""
+        with self._lock:
+            fallback = None
+            for index, interaction in enumerate(self.interactions):
+                if index in self._used or interaction.kind != kind or interaction.name != name:
+                    continue
+                if interaction.key == key:
+                    fallback = index
+                    break
+                if fallback is None and interaction.step == step:
+                    fallback = index
+            if fallback is None:
+                self.misses += 1
+                return None
+            self._used.add(fallback)
+            self.replayed += 1
+            return self.interactions[fallback]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"version": VERSION, **self.header}, separators=(",", ":")) + "\n")
+            for interaction in self.interactions:
+                f.write(json.dumps(asdict(interaction), separators=(",", ":"), default=str) + "\n")
+        os.replace(tmp, self.path)
+
+    @classmethod
+    def load(cls, path) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.pop("version", None) != VERSION:
+                raise ValueError(f"{path} was recorded by an incompatible version")
+            interactions = [Interaction(**json.loads(line)) for line in f if line.strip()]
+        return cls(Path(path), header, interactions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "interactions": len(self.interactions),
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "recorded_ms": round(sum(interaction.elapsed_ms for interaction in self.interactions), 1),
+        }
+
+
+def _slug(label: Optional[str]) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (label or "plan").lower()).strip("-") or "plan"
+
+
+class CassetteStore:
+    """Opens the cassette of each plan run and records or replays the calls made through it."""
+
+    def __init__(
+        self,
+        directory: str = "cassettes",
+        mode: str = RECORD,
+        latency_scale: float = 1.0,
+        strict: bool = False,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._sleep = sleep
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def path(self, plan_label: Optional[str], inputs: Any) -> Path:
+        digest = cache_key("cassette", {"plan": plan_label, "inputs": to_jsonable(inputs)})[:12]
+        return self.directory / f"{_slug(plan_label)}-{digest}.jsonl.gz"
+
+    def open(self, plan_label: Optional[str], inputs: Any) -> Optional[Cassette]:
+        """A new cassette to record into, or the recorded one to replay (None if there is none)."""
+        path = self.path(plan_label, inputs)
+        if self.mode == RECORD:
+            header = {"plan": plan_label, "inputs": to_jsonable(inputs), "recorded_at": time.time()}
+            return Cassette(path, header)
+        if path.exists():
+            return Cassette.load(path)
+        if self.strict:
+            raise CassetteMiss(f"No cassette for plan {plan_label!r} with these inputs at {path}")
+        return None
+
+    def close(self, cassette: Optional[Cassette]) -> None:
+        if cassette is not None and self.mode == RECORD:
+            cassette.save()
+
+    def call(
+        self,
+        state: Optional[RunState],
+        kind: str,
+        name: str,
+        request: Any,
+        compute: Callable[[], Any],
+        encode: Callable[[Any], Any] = to_jsonable,
+        decode: Callable[[Any], Any] = lambda value: value,
+    ) -> Any:
+        """Record compute()'s result in the run's cassette, or replay the recorded one."""
+        cassette = state.cassette if state is not None else None
+        if cassette is None:
+            return compute()
+        key = cache_key(f"cassette:{kind}", {"name": name, "request": to_jsonable(request)})
+        if self.mode == REPLAY:
+            interaction = cassette.match(kind, name, key, state.current_step)
+            if interaction is None:
+                if self.strict:
+                    raise CassetteMiss(f"No recorded {kind} call to {name} in step {state.current_step!r}")
+                return compute()
+            if self.latency_scale > 0 and interaction.elapsed_ms > 0:
+                self._sleep(interaction.elapsed_ms / 1000 * self.latency_scale)
+            if interaction.error is not None:
+                raise ReplayedError(interaction.error)
+            return decode(interaction.response)
+        started = time.perf_counter()
+        try:
+            value = compute()
+        except Exception as e:
+            elapsed = (time.perf_counter() - started) * 1000
+            cassette.record(Interaction(kind, name, key, state.current_step, round(elapsed, 3), error=f"{type(e).__name__}: {e}"))
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        cassette.record(Interaction(kind, name, key, state.current_step, round(elapsed, 3), response=encode(value)))
+        return value
+
+
+def _latency_scale(value: str) -> float:
+    named = {"original": 1.0, "zero": 0.0}
+    return named[value.lower()] if value.lower() in named else float(value)
+
+
+def create_cassette_store() -> Optional[CassetteStore]:
+    """Build the cassette store configured from the environment; None unless PORTIA_CASSETTE_MODE is set."""
+    mode = os.getenv("PORTIA_CASSETTE_MODE", "").lower()
+    if not mode:
+        return None
+    return CassetteStore(
+        directory=os.getenv("PORTIA_CASSETTE_DIR", "cassettes"),
+        mode=mode,
+        latency_scale=_latency_scale(os.getenv("PORTIA_CASSETTE_LATENCY", "original")),
+        strict=os.getenv("PORTIA_CASSETTE_STRICT", "0").lower() in ("1", "true", "yes", "on"),
+    )
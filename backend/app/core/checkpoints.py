@@ -0,0 +1,362 @@
+"""Checkpoints of plan runs, for resuming failed pipelines.
+
+Every completed step output is persisted per plan run, together with a
+journal of the tool and LLM calls each step made. Resuming a run executes its
+plan (or its whole API pipeline) again with the same inputs while the journal
+answers every call that already completed, so finished steps replay in
+milliseconds and real work restarts at the first step that did not complete.
+
+Calls are identified by (step name, call kind, ordinal within the step)
+rather than by their content, so replay is unaffected by prompt details that
+change between attempts.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.run_state import RunState
+from app.core.serialization import to_jsonable
+from app.core.simulation import simulated_path
+
+# Slot key for calls made outside any step (e.g. final output summarization)
+RUN_SCOPE = "__run__"
+
+
+def _dumps(value: Any) -> Optional[str]:
+    try:
+        return json.dumps(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CallSlot:
+    run_id: str
+    step: str
+    kind: str
+    ordinal: int
+    replayed: bool = False
+    value: Any = None
+
+
+class CallJournal:
+    """Recorded calls and completed steps of an earlier plan run.
+
+    Journals assembled from several runs for incremental re-execution have no run_id.
+    """
+
+    def __init__(self, run_id: Optional[str], calls: Dict[Tuple[str, str, int], Any], steps: Dict[int, str]):
+        self.run_id = run_id
+        self.calls = calls
+        self.steps = steps
+
+    def get(self, step: str, kind: str, ordinal: int) -> Tuple[bool, Any]:
+        key = (step, kind, ordinal)
+        return (True, self.calls[key]) if key in self.calls else (False, None)
+
+    def completed(self, step_index: int) -> bool:
+        return step_index in self.steps
+
+
+class CheckpointStore:
+    """SQLite-backed step outputs and call journals, keyed by plan run id."""
+
+    def __init__(self, db_path: str = "checkpoints/checkpoints.db"):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS pipelines (
+                    root_id TEXT PRIMARY KEY,
+                    pipeline TEXT NOT NULL,
+                    inputs TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    root_id TEXT NOT NULL,
+                    plan TEXT,
+                    ordinal INTEGER NOT NULL,
+                    inputs TEXT,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    lineage TEXT
+                );
+                CREATE INDEX IF NOT EXISTS runs_root ON runs (root_id, plan, ordinal);
+                CREATE TABLE IF NOT EXISTS steps (
+                    run_id TEXT NOT NULL,
+                    step_index INTEGER NOT NULL,
+                    step_name TEXT,
+                    output TEXT,
+                    completed_at REAL NOT NULL,
+                    fingerprint TEXT,
+                    PRIMARY KEY (run_id, step_index)
+                );
+                CREATE TABLE IF NOT EXISTS calls (
+                    run_id TEXT NOT NULL,
+                    step TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    ordinal INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    recorded_at REAL,
+                    PRIMARY KEY (run_id, step, kind, ordinal)
+                );
+                """
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(steps)")}
+            if "fingerprint" not in columns:
+                self._conn.execute("ALTER TABLE steps ADD COLUMN fingerprint TEXT")
+            if "lineage" not in {row["name"] for row in self._conn.execute("PRAGMA table_info(runs)")}:
+                self._conn.execute("ALTER TABLE runs ADD COLUMN lineage TEXT")
+            if "recorded_at" not in {row["name"] for row in self._conn.execute("PRAGMA table_info(calls)")}:
+                self._conn.execute("ALTER TABLE calls ADD COLUMN recorded_at REAL")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS steps_fingerprint ON steps (fingerprint)")
+
+    # --- Runs ---
+
+    def start_pipeline(self, root_id: str, pipeline: str, inputs: Any) -> None:
+        """Remember which API pipeline a group of plan runs belongs to."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pipelines (root_id, pipeline, inputs, created_at) VALUES (?, ?, ?, ?)",
+                (root_id, pipeline, json.dumps(inputs, default=str), time.time()),
+            )
+
+    def get_pipeline(self, root_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pipelines WHERE root_id = ?", (root_id,)).fetchone()
+        if row is None:
+            return None
+        return {"root_id": row["root_id"], "pipeline": row["pipeline"], "inputs": json.loads(row["inputs"] or "null")}
+
+    def start_run(
+        self, run_id: str, root_id: str, plan: Optional[str], inputs: Any, lineage: Optional[str] = None
+    ) -> int:
+        """Record a new plan run; returns its ordinal among same-plan runs of the root."""
+        now = time.time()
+        with self._lock, self._conn:
+            (ordinal,) = self._conn.execute(
+                "SELECT COUNT(*) FROM runs WHERE root_id = ? AND plan IS ?", (root_id, plan)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs "
+                "(run_id, root_id, plan, ordinal, inputs, status, created_at, updated_at, lineage) "
+                "VALUES (?, ?, ?, ?, ?, 'running', ?, ?, ?)",
+                (run_id, root_id, plan, ordinal, json.dumps(inputs, default=str), now, now, lineage),
+            )
+        return ordinal
+
+    def finish_run(self, run_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                (status, error, time.time(), run_id),
+            )
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            steps = self._conn.execute(
+                "SELECT step_index, step_name FROM steps WHERE run_id = ? ORDER BY step_index", (run_id,)
+            ).fetchall()
+        if row is None:
+            return None
+        run = dict(row)
+        run["inputs"] = json.loads(run["inputs"] or "null")
+        run["completed_steps"] = [{"index": s["step_index"], "name": s["step_name"]} for s in steps]
+        return run
+
+    def latest_run(
+        self, plan: Optional[str], exclude: Optional[str] = None, lineage: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Most recent earlier run of the same plan in the same lineage (its predecessor)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, inputs FROM runs WHERE plan IS ? AND run_id IS NOT ? AND lineage IS ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (plan, exclude, lineage),
+            ).fetchone()
+        return {"run_id": row["run_id"], "inputs": json.loads(row["inputs"] or "null")} if row else None
+
+    def find_run(self, root_id: str, plan: Optional[str], ordinal: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE root_id = ? AND plan IS ? AND ordinal = ?", (root_id, plan, ordinal)
+            ).fetchone()
+        return row["run_id"] if row else None
+
+    # --- Steps and calls ---
+
+    def save_step(
+        self, run_id: str, step_index: int, step_name: Optional[str], output: Any, fingerprint: Optional[str] = None
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO steps (run_id, step_index, step_name, output, completed_at, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, step_index, step_name, json.dumps(to_jsonable(output)), time.time(), fingerprint),
+            )
+
+    def find_steps(
+        self,
+        plan: Optional[str],
+        fingerprints: Dict[str, str],
+        exclude: Optional[str] = None,
+        lineage: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """Steps (name -> run id) with matching fingerprints, all from one earlier run of the plan in the lineage.
+
+        That run is the one that completed the most matching steps (the latest on ties).
+        """
+        if not fingerprints:
+            return {}
+        marks = ",".join("?" * len(fingerprints))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.run_id, s.step_name, s.fingerprint, s.completed_at FROM steps s JOIN runs r ON r.run_id = s.run_id "
+                f"WHERE r.plan IS ? AND r.run_id IS NOT ? AND r.lineage IS ? AND s.fingerprint IN ({marks})",
+                (plan, exclude, lineage, *fingerprints.values()),
+            ).fetchall()
+        runs: Dict[str, Tuple[set, float]] = {}
+        for row in rows:
+            if fingerprints.get(row["step_name"]) != row["fingerprint"]:
+                continue
+            steps, latest = runs.get(row["run_id"], (set(), 0.0))
+            steps.add(row["step_name"])
+            runs[row["run_id"]] = (steps, max(latest, row["completed_at"]))
+        if not runs:
+            return {}
+        run_id, (steps, _) = max(runs.items(), key=lambda item: (len(item[1][0]), item[1][1]))
+        return {name: run_id for name in fingerprints if name in steps}
+
+    def step_outputs(self, run_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT step_index, step_name, output FROM steps WHERE run_id = ? ORDER BY step_index", (run_id,)
+            ).fetchall()
+        return [{"index": r["step_index"], "name": r["step_name"], "output": json.loads(r["output"])} for r in rows]
+
+    def record_call(self, run_id: str, step: str, kind: str, ordinal: int, result: Any) -> bool:
+        """Journal a call result; results that are not plain JSON are not journaled."""
+        encoded = _dumps(result)
+        if encoded is None:
+            return False
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO calls (run_id, step, kind, ordinal, result, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, step, kind, ordinal, encoded, time.time()),
+            )
+        return True
+
+    def journal(self, run_id: str) -> CallJournal:
+        with self._lock:
+            calls = self._conn.execute(
+                "SELECT step, kind, ordinal, result FROM calls WHERE run_id = ?", (run_id,)
+            ).fetchall()
+            steps = self._conn.execute("SELECT step_index, step_name FROM steps WHERE run_id = ?", (run_id,)).fetchall()
+        return CallJournal(
+            run_id,
+            {(r["step"], r["kind"], r["ordinal"]): json.loads(r["result"]) for r in calls},
+            {r["step_index"]: r["step_name"] for r in steps},
+        )
+
+    def reuse_journal(self, matches: Dict[str, str]) -> CallJournal:
+        """Journal combining, for each step name, the calls that step made in the matched run."""
+        calls, steps = {}, {}
+        with self._lock:
+            for step, run_id in matches.items():
+                for r in self._conn.execute(
+                    "SELECT kind, ordinal, result FROM calls WHERE run_id = ? AND step = ?", (run_id, step)
+                ):
+                    calls[(step, r["kind"], r["ordinal"])] = json.loads(r["result"])
+                for r in self._conn.execute(
+                    "SELECT step_index FROM steps WHERE run_id = ? AND step_name = ?", (run_id, step)
+                ):
+                    steps[r["step_index"]] = step
+        return CallJournal(None, calls, steps)
+
+    def expired_steps(self, matches: Dict[str, str], ttls: Dict[str, Tuple[float, float]]) -> Set[str]:
+        """Matched steps whose journaled result of a tool in ttls is older than that tool's TTL."""
+        now = time.time()
+        expired = set()
+        with self._lock:
+            for step, run_id in matches.items():
+                for r in self._conn.execute(
+                    "SELECT kind, recorded_at FROM calls WHERE run_id = ? AND step = ? AND kind LIKE 'tool:%'",
+                    (run_id, step),
+                ):
+                    ttl = ttls.get(r["kind"][len("tool:"):])
+                    if ttl is not None and (r["recorded_at"] is None or now - r["recorded_at"] > ttl[0]):
+                        expired.add(step)
+        return expired
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Drop checkpoints of runs not updated within max_age_seconds."""
+        cutoff = time.time() - max_age_seconds
+        with self._lock, self._conn:
+            stale = [r["run_id"] for r in self._conn.execute("SELECT run_id FROM runs WHERE updated_at < ?", (cutoff,))]
+            for table in ("steps", "calls", "runs"):
+                self._conn.executemany(f"DELETE FROM {table} WHERE run_id = ?", [(run_id,) for run_id in stale])
+            self._conn.execute(
+                "DELETE FROM pipelines WHERE created_at < ? AND root_id NOT IN (SELECT root_id FROM runs)", (cutoff,)
+            )
+        return len(stale)
+
+    # --- Journaled calls ---
+
+    def begin_call(self, state: Optional[RunState], kind: str, rerun: bool = False) -> Optional[CallSlot]:
+        """Claim the next call slot of the state's current step, with its replayed value if any.
+
+        With rerun, a result reused from an earlier run (incremental re-execution)
+        is not replayed, so calls with side effects happen again. Resumed runs
+        still replay them: their effects belong to the same request.
+        """
+        if state is None or state.run_id is None:
+            return None
+        step, ordinal = state.next_call(kind)
+        slot = CallSlot(run_id=state.run_id, step=step or RUN_SCOPE, kind=kind, ordinal=ordinal)
+        if state.replay is not None and not (rerun and state.replay.run_id is None):
+            slot.replayed, slot.value = state.replay.get(slot.step, kind, ordinal)
+        return slot
+
+    def end_call(self, slot: Optional[CallSlot], result: Any) -> None:
+        if slot is not None and not slot.replayed:
+            self.record_call(slot.run_id, slot.step, slot.kind, slot.ordinal, result)
+
+    def call(
+        self,
+        state: Optional[RunState],
+        kind: str,
+        compute: Callable[[], Any],
+        encode: Callable[[Any], Any] = to_jsonable,
+        decode: Callable[[Any], Any] = lambda value: value,
+        rerun: bool = False,
+    ) -> Any:
+        """Answer a call from the replay journal, or make it and journal the result."""
+        slot = self.begin_call(state, kind, rerun)
+        if slot is not None and slot.replayed:
+            return decode(slot.value)
+        result = compute()
+        self.end_call(slot, encode(result))
+        return result
+
+
+def create_checkpoint_store() -> Optional[CheckpointStore]:
+    """Checkpoint store configured from the environment (None when PORTIA_CHECKPOINTS=0)."""
+    if os.getenv("PORTIA_CHECKPOINTS", "1").lower() in ("0", "false", "no"):
+        return None
+    store = CheckpointStore(simulated_path(os.getenv("PORTIA_CHECKPOINT_DB", "checkpoints/checkpoints.db")))
+    store.prune(float(os.getenv("PORTIA_CHECKPOINT_RETENTION_DAYS", "7")) * 24 * 3600)
+    return store
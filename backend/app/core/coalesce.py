@@ -0,0 +1,202 @@
+"""Single-flight execution: concurrent identical calls share one run.
+
+Used for tool cache misses and for identical in-flight API requests (same
+endpoint plus canonicalized body), so a client retrying after a gateway
+timeout, or two editors launching the same topic at once, attach to the run
+already in progress instead of starting a duplicate. ``SharedFlight`` extends
+this to requests handled by different server processes.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key wait for it."""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True when the result came from another caller's run."""
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = Future()
+        if not leader:
+            return flight.result(), True
+        try:
+            result = fn()
+            flight.set_result(result)
+            return result, False
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def pending(self, key: str) -> Optional[Future]:
+        """The in-flight call for key, if any."""
+        with self._lock:
+            return self._calls.get(key)
+
+
+def process_alive(pid: Optional[int]) -> bool:
+    """Whether a process with this pid is running on this host (the owner of a key or job)."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedFlight:
+    """SingleFlight across the server processes sharing a SQLite file.
+
+    Calls are coalesced within the process by a SingleFlight, and across
+    processes through a table of in-flight keys: the process that claims a key
+    runs the call and stores its result, and the others poll for it. A key held
+    by a process that has exited is claimed again. Results must be JSON.
+    """
+
+    def __init__(self, db_path: str = "jobs/flights.db", poll_interval: float = 0.5, retention_seconds: float = 60):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        # How long finished results stay readable by processes still polling for them
+        self.retention_seconds = retention_seconds
+        self._local = SingleFlight()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS flights (
+                    key TEXT PRIMARY KEY,
+                    flight_id TEXT NOT NULL,
+                    owner INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True when the result came from another caller's run."""
+        (result, shared_remotely), shared = self._local.do(key, lambda: self._run(key, fn))
+        return result, shared or shared_remotely
+
+    def join(self, key: str) -> Tuple[bool, Any]:
+        """(True, result) of the call in flight for key in any process, waiting for it; (False, None) if there is none."""
+        local = self._local.pending(key)
+        if local is not None:
+            return True, local.result()[0]
+        row = self._row(key)
+        if row is None or row["status"] != RUNNING or not process_alive(row["owner"]):
+            return False, None
+        try:
+            return True, self._follow(key, row["flight_id"])
+        except _Abandoned:
+            return False, None
+
+    def _run(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        while True:
+            flight_id, row = self._claim(key)
+            if row is None:
+                break
+            try:
+                return self._follow(key, row["flight_id"]), True
+            except _Abandoned:
+                continue
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, flight_id, FAILED, f"{type(e).__name__}: {e}")
+            raise
+        self._finish(key, flight_id, DONE, json.dumps(result, default=str))
+        return result, False
+
+    def _claim(self, key: str) -> Tuple[Optional[str], Optional[sqlite3.Row]]:
+        """(flight id, None) after claiming key, or (None, row) of the live flight holding it."""
+        flight_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM flights WHERE status != ? AND updated_at < ?", (RUNNING, now - self.retention_seconds)
+                )
+                row = self._conn.execute("SELECT * FROM flights WHERE key = ?", (key,)).fetchone()
+                if row is not None and row["status"] == RUNNING and process_alive(row["owner"]):
+                    self._conn.execute("COMMIT")
+                    return None, row
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO flights (key, flight_id, owner, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, flight_id, os.getpid(), RUNNING, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return flight_id, None
+
+    def _follow(self, key: str, flight_id: str) -> Any:
+        """Wait for another process's flight and return its result (raising its error)."""
+        while True:
+            row = self._row(key)
+            if row is None or row["flight_id"] != flight_id:
+                raise _Abandoned(key)
+            if row["status"] == DONE:
+                return json.loads(row["result"])
+            if row["status"] == FAILED:
+                raise FlightFailed(row["result"])
+            if not process_alive(row["owner"]):
+                raise _Abandoned(key)
+            time.sleep(self.poll_interval)
+
+    def _finish(self, key: str, flight_id: str, status: str, result: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE flights SET status = ?, result = ?, updated_at = ? WHERE key = ? AND flight_id = ?",
+                (status, result, time.time(), key, flight_id),
+            )
+
+    def _row(self, key: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute("SELECT * FROM flights WHERE key = ?", (key,)).fetchone()
+
+
+class FlightFailed(Exception):
+    """The call another process ran for a coalesced request failed."""
+
+
+class _Abandoned(Exception):
+    """The process running a flight exited, or the flight was replaced; claim the key again."""
+
+
+def create_request_flights() -> SharedFlight:
+    """Coalescing of identical in-flight API requests across the server's processes."""
+    return SharedFlight(
+        os.getenv("PORTIA_FLIGHT_DB", "jobs/flights.db"),
+        poll_interval=float(os.getenv("PORTIA_FLIGHT_POLL_INTERVAL", "0.5")),
+    )
@@ -0,0 +1,257 @@
+"""Compaction of research tool outputs before they reach an LLM prompt.
+
+Search, crawl and extract steps often return the same pages several times
+(the same URL from two searches, a crawled page that was also extracted) and
+near-identical snippets syndicated across sites. ``compact_sources`` turns
+the raw outputs of several steps into one ranked, deduplicated list of
+sources that fits a token budget:
+
+1. every result carrying a URL becomes a source; URLs are canonicalized
+   (scheme and host case, ``www.``, fragments, tracking parameters, query
+   order, trailing slashes), and sources with the same URL are merged;
+2. sources whose text is a near-duplicate of a better-ranked one are dropped
+   (Jaccard similarity of word shingles);
+3. sources are ranked by BM25 relevance to the topic;
+4. sources are added in rank order, each trimmed to a per-source cap, until
+   the budget is spent;
+5. with a ``condense`` function (the map-reduce summarizer), the selected
+   sources that were trimmed are summarized to their cap instead, so only
+   pages that survive ranking are ever sent to the model.
+
+Tokens are estimated at four characters each; no tokenizer is needed.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TEXT_FIELDS = ("raw_content", "content", "snippet", "text", "description")
+TRACKING_PARAMS = {"gclid", "fbclid", "mc_cid", "mc_eid", "ref", "ref_src", "igshid", "yclid", "_hsenc", "_hsmi"}
+WORD = re.compile(r"[a-z0-9]+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "with", "what", "how", "why", "vs",
+}
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so that the same page reached through different links compares equal."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+@dataclass
+class Source:
+    url: Optional[str]
+    title: str
+    text: str
+    steps: List[str] = field(default_factory=list)
+    score: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"url": self.url, "title": self.title, "text": self.text, "steps": self.steps}
+
+
+def extract_sources(step: str, output: Any) -> List[Source]:
+    """Every result with a URL found in a tool output (Tavily search/crawl/extract shapes, JSON strings)."""
+    sources: List[Source] = []
+
+    def walk(value: Any, depth: int = 0) -> None:
+        if depth > 6:
+            return
+        if isinstance(value, str):
+            stripped = value.strip()
+            if stripped[:1] in ("{", "["):
+                try:
+                    walk(json.loads(stripped), depth + 1)
+                    return
+                except ValueError:
+                    pass
+            return
+        if hasattr(value, "model_dump"):
+            value = value.model_dump(mode="json")
+        if isinstance(value, dict):
+            url = value.get("url")
+            text = next((value[key] for key in TEXT_FIELDS if isinstance(value.get(key), str) and value[key].strip()), "")
+            if isinstance(url, str) and url.strip() and (text or value.get("title")):
+                sources.append(Source(url=url, title=str(value.get("title") or ""), text=text.strip(), steps=[step]))
+                return
+            for item in value.values():
+                walk(item, depth + 1)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                walk(item, depth + 1)
+
+    walk(output)
+    if not sources and isinstance(output, str) and output.strip():
+        # Unstructured output (e.g. an LLM summary): keep it as one source
+        sources.append(Source(url=None, title="", text=output.strip(), steps=[step]))
+    return sources
+
+
+def _words(text: str) -> List[str]:
+    return WORD.findall(text.lower())
+
+
+def _shingles(text: str, size: int = 3, limit: int = 2000) -> Set[int]:
+    words = _words(text)[:limit]
+    if len(words) < size:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def _bm25(sources: List[Source], query: Iterable[str], k1: float = 1.2, b: float = 0.75) -> None:
+    terms = [term for term in dict.fromkeys(query) if term not in STOPWORDS]
+    docs = [Counter(_words(f"{s.title} {s.title} {s.text}")) for s in sources]
+    if not docs or not terms:
+        return
+    avg_len = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+    for source, doc in zip(sources, docs):
+        length = sum(doc.values())
+        score = 0.0
+        for term in terms:
+            df = sum(1 for d in docs if term in d)
+            if not doc[term]:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * doc[term] * (k1 + 1) / (doc[term] + k1 * (1 - b + b * length / avg_len))
+        # Sources found by several steps are corroborated
+        source.score = score * (1 + 0.1 * (len(source.steps) - 1))
+
+
+def _trim(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentences = SENTENCE_END.split(cut)
+    if len(sentences) > 1:
+        cut = cut[: len(cut) - len(sentences[-1])].rstrip()
+    return cut + " …"
+
+
+def compact_sources(
+    outputs: Dict[str, Any],
+    topic: str,
+    token_budget: int = 6000,
+    max_source_tokens: int = 600,
+    similarity: float = 0.8,
+    condense: Optional[Callable[[List[str], List[int]], List[str]]] = None,
+) -> Dict[str, Any]:
+    """Deduplicated, topic-ranked sources from step outputs, within token_budget.
+
+    Selected sources longer than their share of the budget are cut at a
+    sentence boundary, or summarized by ``condense(texts, max_tokens)`` when
+    one is given. Returns {"sources": [...], "stats": {...}}.
+    """
+    raw: List[Source] = []
+    for step, output in outputs.items():
+        raw.extend(extract_sources(step, output))
+    tokens_in = sum(estimate_tokens(s.title) + estimate_tokens(s.text) for s in raw)
+
+    by_url: Dict[str, Source] = {}
+    merged: List[Source] = []
+    for source in raw:
+        key = canonical_url(source.url) if source.url else None
+        existing = by_url.get(key) if key else None
+        if existing is None:
+            source.url = key or source.url
+            merged.append(source)
+            if key:
+                by_url[key] = source
+            continue
+        existing.steps.extend(step for step in source.steps if step not in existing.steps)
+        if len(source.text) > len(existing.text):
+            existing.text = source.text
+        existing.title = existing.title or source.title
+
+    _bm25(merged, _words(topic or ""))
+    merged.sort(key=lambda s: s.score, reverse=True)
+
+    kept: List[Source] = []
+    kept_shingles: List[Set[int]] = []
+    near_duplicates = 0
+    for source in merged:
+        shingles = _shingles(source.text or source.title)
+        if shingles and any(
+            len(shingles & other) / len(shingles | other) >= similarity for other in kept_shingles if other
+        ):
+            near_duplicates += 1
+            continue
+        kept.append(source)
+        kept_shingles.append(shingles)
+
+    selected: List[Source] = []
+    # Selected sources longer than their share of the budget, with that share
+    shortened: List[tuple] = []
+    used = 0
+    for source in kept:
+        remaining = token_budget - used
+        if remaining <= 0:
+            break
+        allowance = min(max_source_tokens, remaining)
+        trimmed = _trim(source.text, allowance)
+        cost = estimate_tokens(source.title) + estimate_tokens(trimmed)
+        if cost > remaining and selected:
+            continue
+        if trimmed != source.text:
+            shortened.append((source, source.text, allowance))
+        source.text = trimmed
+        selected.append(source)
+        used += cost
+
+    if condense is not None and shortened:
+        # Summarize only what made the cut, instead of every page the tools returned
+        summaries = condense([text for _, text, _ in shortened], [allowance for _, _, allowance in shortened])
+        for (source, _, allowance), summary in zip(shortened, summaries):
+            source.text = _trim(str(summary).strip(), allowance)
+        used = sum(estimate_tokens(s.title) + estimate_tokens(s.text) for s in selected)
+
+    return {
+        "sources": [source.to_dict() for source in selected],
+        "stats": {
+            "results_in": len(raw),
+            "unique_urls": len(merged),
+            "near_duplicates": near_duplicates,
+            "sources_out": len(selected),
+            "condensed": len(shortened) if condense is not None else 0,
+            "tokens_in": tokens_in,
+            "tokens_out": used,
+        },
+    }
+
+
+def compaction_settings() -> Dict[str, Any]:
+    """compact_sources keyword arguments from the environment."""
+    return {
+        "token_budget": int(os.getenv("PORTIA_RESEARCH_TOKEN_BUDGET", "6000")),
+        "max_source_tokens": int(os.getenv("PORTIA_SOURCE_MAX_TOKENS", "600")),
+        "similarity": float(os.getenv("PORTIA_NEAR_DUPLICATE_SIMILARITY", "0.8")),
+    }
@@ -0,0 +1,133 @@
+"""Persistent, size-bounded key/value cache on local disk.
+
+Values are JSON-encoded, compressed and stored as content-addressed blobs
+(named by the SHA-256 of their bytes, so identical values are stored once).
+A SQLite table maps cache keys to blobs and tracks access times, and the
+least recently used entries are evicted once the cache exceeds `max_bytes`.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    created_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class DiskCache:
+    """LRU-evicted JSON value cache backed by blob files and a SQLite index."""
+
+    def __init__(self, root: str, max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)")
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        digest, created_at = row
+        try:
+            value = json.loads(zlib.decompress(self._blob_path(digest).read_bytes()))
+        except (OSError, zlib.error, ValueError):
+            # Blob lost or corrupted: treat as a miss and drop the entry
+            self.delete(key)
+            return None
+        return CacheEntry(value=value, created_at=created_at)
+
+    def set(self, key: str, value: Any) -> None:
+        data = zlib.compress(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(f"{digest}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, blob)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, digest, len(data), now, now),
+                )
+            if old and old[0] != digest:
+                self._drop_blob_if_unused(old[0])
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            with self._conn:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._drop_blob_if_unused(row[0])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes}
+
+    def _evict(self) -> None:
+        # Caller holds self._lock
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, digest, size FROM entries ORDER BY accessed_at").fetchall()
+        for key, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            with self._conn:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._drop_blob_if_unused(digest)
+            total -= size
+
+    def _drop_blob_if_unused(self, digest: str) -> None:
+        # Caller holds self._lock
+        in_use = self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if not in_use:
+            try:
+                self._blob_path(digest).unlink()
+            except FileNotFoundError:
+                pass
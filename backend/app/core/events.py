@@ -0,0 +1,92 @@
+"""In-memory progress event logs for plan runs.
+
+Execution hooks append step-started / step-finished events to the log of the
+job that owns the run; streaming endpoints replay the log from any offset and
+then block for new events, so late subscribers still see the full history.
+A broker can also hand every event to a persistent store, so that server
+processes other than the one running the job can stream it too (see
+``jobs.StoredEventLog``).
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class EventLog:
+    """Append-only event sequence for a single job."""
+
+    def __init__(self, job_id: str, persist: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.job_id = job_id
+        self.persist = persist
+        self.closed_at: Optional[float] = None
+        self._events: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+
+    @property
+    def closed(self) -> bool:
+        return self.closed_at is not None
+
+    def publish(self, event_type: str, **data) -> Dict[str, Any]:
+        with self._cond:
+            event = {"id": len(self._events) + 1, "event": event_type, "time": time.time(), **data}
+            self._events.append(event)
+            if self.persist is not None:
+                self.persist(self.job_id, event)
+            self._cond.notify_all()
+        return event
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed_at = time.time()
+            self._cond.notify_all()
+
+    def iter_events(self, after: int = 0, heartbeat: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield events with id > after until the log is closed.
+
+        Yields None every `heartbeat` seconds without new events so callers can
+        keep idle connections alive.
+        """
+        position = after
+        while True:
+            with self._cond:
+                if position >= len(self._events) and not self.closed:
+                    self._cond.wait(timeout=heartbeat)
+                pending = self._events[position:]
+                closed = self.closed
+            if pending:
+                position += len(pending)
+                yield from pending
+            elif closed:
+                return
+            else:
+                yield None
+
+
+class EventBroker:
+    """Registry of event logs by job id, pruning closed logs after a retention window."""
+
+    def __init__(self, retention_seconds: float = 3600, persist: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.retention_seconds = retention_seconds
+        # Called with (job id, event) for every event published, e.g. JobStore.append_event
+        self.persist = persist
+        self._logs: Dict[str, EventLog] = {}
+        self._lock = threading.Lock()
+
+    def open(self, job_id: str) -> EventLog:
+        with self._lock:
+            self._prune()
+            log = self._logs.get(job_id)
+            if log is None:
+                log = self._logs[job_id] = EventLog(job_id, self.persist)
+            return log
+
+    def get(self, job_id: str) -> Optional[EventLog]:
+        with self._lock:
+            return self._logs.get(job_id)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, log in self._logs.items() if log.closed and log.closed_at < cutoff]
+        for job_id in expired:
+            del self._logs[job_id]
@@ -0,0 +1,106 @@
+"""Idempotency keys for the plan endpoints.
+
+A client that sends an ``Idempotency-Key`` header gets the stored response of
+the first request made with that key for as long as it is retained, instead
+of a second plan run. Keys are bound to the request fingerprint, so reusing a
+key for a different request is rejected. Requests that fail are released so
+they can be retried under the same key, and so is a key whose request was
+being served by a server process that has since exited.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.coalesce import process_alive
+from app.core.tool_cache import cache_key
+
+RUNNING = "running"
+COMPLETED = "completed"
+
+
+def request_fingerprint(endpoint: str, body: Any, **options) -> str:
+    """Canonical key of an API request: endpoint, normalized body and run options."""
+    return cache_key("request", {"endpoint": endpoint, "body": body, "options": options})
+
+
+class IdempotencyStore:
+    """SQLite table of idempotency keys and the responses recorded for them."""
+
+    def __init__(self, db_path: str = "jobs/idempotency.db", retention_seconds: float = 24 * 3600):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    status_code INTEGER,
+                    response TEXT,
+                    job_id TEXT,
+                    created_at REAL NOT NULL,
+                    owner INTEGER
+                )
+                """
+            )
+            if "owner" not in {row["name"] for row in self._conn.execute("PRAGMA table_info(idempotency_keys)")}:
+                self._conn.execute("ALTER TABLE idempotency_keys ADD COLUMN owner INTEGER")
+
+    def begin(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claim key for a new request; returns the existing record if the key is already in use.
+
+        A key still running in a process that has exited is claimed again.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            # Other server processes claim keys in the same database
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "DELETE FROM idempotency_keys WHERE created_at < ?", (now - self.retention_seconds,)
+            )
+            row = self._conn.execute("SELECT * FROM idempotency_keys WHERE key = ?", (key,)).fetchone()
+            if row is not None and not (row["status"] == RUNNING and not process_alive(row["owner"])):
+                return self._record(row)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, status, created_at, owner) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, RUNNING, now, os.getpid()),
+            )
+        return None
+
+    def complete(self, key: str, status_code: int, response: Any = None, job_id: Optional[str] = None) -> None:
+        """Record the response to replay for key (async requests record their job id)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE idempotency_keys SET status = ?, status_code = ?, response = ?, job_id = ? WHERE key = ?",
+                (COMPLETED, status_code, json.dumps(response, default=str), job_id, key),
+            )
+
+    def release(self, key: str) -> None:
+        """Forget a key whose request failed, so it can be retried."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+    @staticmethod
+    def _record(row) -> Dict[str, Any]:
+        record = dict(row)
+        record["response"] = json.loads(record["response"]) if record["response"] else None
+        return record
+
+
+def create_idempotency_store() -> IdempotencyStore:
+    """Build the store configured from the environment."""
+    return IdempotencyStore(
+        os.getenv("PORTIA_IDEMPOTENCY_DB", "jobs/idempotency.db"),
+        retention_seconds=float(os.getenv("PORTIA_IDEMPOTENCY_TTL", str(24 * 3600))),
+    )
@@ -0,0 +1,91 @@
+"""Incremental re-execution: recompute only the steps whose inputs changed.
+
+Each step of a plan gets a fingerprint over its definition, the values of the
+plan inputs it references and the fingerprints of the steps it depends on.
+When a plan is submitted again under the same caller-supplied lineage id,
+every step whose fingerprint matches a step completed by an earlier run of
+the same plan in that lineage replays that run's journaled calls (see
+``checkpoints``). All reused steps come from one earlier run, the
+one that completed the most of them, so a reused step never mixes with
+upstream outputs of another run. Changing one input therefore only recomputes
+the steps downstream of it, and ``diff_report`` explains which steps were
+recomputed and why.
+
+Only LLM calls and read-only tools (search/extract/crawl) are replayed for
+reused steps; tools with side effects (file writers, TTS, Notion, InVideo)
+run again, so their files and publications really happen. A step whose
+read-only tool results are older than the tool's cache TTL is recomputed,
+together with every step downstream of it.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.scheduler import StepGraph
+from app.core.serialization import stable_repr
+
+# Fields that name or place a step rather than define what it computes
+IDENTITY_FIELDS = {"step_name", "conditional_block"}
+
+
+def _canonical(value: Any) -> Any:
+    return json.loads(json.dumps(value, sort_keys=True, default=stable_repr))
+
+
+def step_fingerprints(plan, inputs: Dict[str, Any], graph: Optional[StepGraph] = None) -> Dict[str, str]:
+    """Fingerprint of every step, keyed by step name, for the given input values."""
+    graph = graph or StepGraph.from_plan(plan)
+    fingerprints: Dict[str, str] = {}
+    for node, step in zip(graph.nodes, plan.steps):
+        payload = {
+            "step": node.name,
+            "kind": node.kind,
+            "definition": {k: v for k, v in vars(step).items() if k not in IDENTITY_FIELDS},
+            "inputs": {name: inputs.get(name) for name in sorted(node.inputs)},
+            "upstream": {name: fingerprints[name] for name in sorted(node.depends_on)},
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=stable_repr)
+        fingerprints[node.name] = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    return fingerprints
+
+
+def fresh_matches(graph: StepGraph, matches: Dict[str, str], expired: Set[str]) -> Dict[str, str]:
+    """Matches without the expired steps and every step downstream of one."""
+    dropped = set(expired)
+    for node in graph.nodes:
+        if node.depends_on & dropped:
+            dropped.add(node.name)
+    return {name: run_id for name, run_id in matches.items() if name not in dropped}
+
+
+def diff_report(
+    graph: StepGraph,
+    reused: Dict[str, str],
+    inputs: Dict[str, Any],
+    previous_inputs: Optional[Dict[str, Any]] = None,
+    expired: Optional[Set[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Per step: reused (and from which run) or recomputed, with the inputs/upstream steps that changed."""
+    recomputed = set()
+    report = []
+    for node in graph.nodes:
+        if node.name in reused:
+            report.append({"step": node.name, "status": "reused", "from_run": reused[node.name]})
+            continue
+        recomputed.add(node.name)
+        entry = {"step": node.name, "status": "recomputed"}
+        if expired and node.name in expired:
+            entry["expired"] = True
+        if previous_inputs is not None:
+            changed = [
+                name for name in sorted(node.inputs)
+                if _canonical(previous_inputs.get(name)) != _canonical(inputs.get(name))
+            ]
+            if changed:
+                entry["changed_inputs"] = changed
+        upstream = sorted(node.depends_on & recomputed)
+        if upstream:
+            entry["recomputed_upstream"] = upstream
+        report.append(entry)
+    return report
@@ -0,0 +1,426 @@
+"""Background job subsystem for long-running plan executions.
+
+Plan runs take minutes, so the API submits them to a bounded worker pool and
+returns a job id immediately. Job status, results and progress events are
+persisted in a local SQLite database so they survive restarts and can be
+polled or streamed by clients through any server process.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.coalesce import process_alive
+from app.core.events import EventBroker
+from app.core.run_state import RunCancelled, RunState, bind_run
+from app.core.tracing import in_context
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobStore:
+    """SQLite-backed persistence for job metadata and results."""
+
+    def __init__(self, db_path: str = "jobs/jobs.db"):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    inputs TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    dedupe_key TEXT,
+                    owner INTEGER
+                )
+                """
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("dedupe_key", "TEXT"), ("owner", "INTEGER")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, id)
+                )
+                """
+            )
+
+    def create(self, kind: str, inputs: Any, dedupe_key: Optional[str] = None) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._insert(job_id, kind, inputs, dedupe_key)
+        return self.get(job_id)
+
+    def claim(self, dedupe_key: str, kind: str, inputs: Any) -> Tuple[Dict[str, Any], bool]:
+        """The unfinished job submitted under dedupe_key by any live process, or a new one.
+
+        Returns (job, created). Unfinished jobs whose process has exited are marked failed.
+        """
+        job_id = None
+        with self._lock, self._conn:
+            # Other server processes claim keys in the same database
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT id, owner FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at DESC",
+                (dedupe_key, QUEUED, RUNNING),
+            ).fetchall()
+            for row in rows:
+                if job_id is None and process_alive(row["owner"]):
+                    job_id = row["id"]
+                elif not process_alive(row["owner"]):
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, "Interrupted: its server process exited", time.time(), row["id"]),
+                    )
+            created = job_id is None
+            if created:
+                job_id = uuid.uuid4().hex
+                self._insert(job_id, kind, inputs, dedupe_key)
+        return self.get(job_id), created
+
+    def _insert(self, job_id: str, kind: str, inputs: Any, dedupe_key: Optional[str]) -> None:
+        self._conn.execute(
+            "INSERT INTO jobs (id, kind, status, inputs, created_at, dedupe_key, owner) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(inputs, default=str), time.time(), dedupe_key, os.getpid()),
+        )
+
+    def update(self, job_id: str, **fields) -> None:
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, include_result) if row else None
+
+    def list(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """The subset of job_ids whose cancellation has been requested."""
+        if not job_ids:
+            return []
+        marks = ",".join("?" * len(job_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({marks})", tuple(job_ids)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def alive(self, job_id: str) -> bool:
+        """Whether the process that submitted the job is still running."""
+        with self._lock:
+            row = self._conn.execute("SELECT owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and process_alive(row["owner"])
+
+    def append_event(self, job_id: str, event: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_events (job_id, id, event, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, event["id"], json.dumps(event, default=str), event.get("time", time.time())),
+            )
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event FROM job_events WHERE job_id = ? AND id > ? ORDER BY id", (job_id, after)
+            ).fetchall()
+        return [json.loads(row["event"]) for row in rows]
+
+    def prune_events(self, max_age_seconds: float) -> int:
+        """Drop progress events older than max_age_seconds."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM job_events WHERE created_at < ?", (time.time() - max_age_seconds,))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def recover_interrupted(self) -> int:
+        """Mark jobs left queued or running by a previous process as failed."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+                (FAILED, "Interrupted by server restart", time.time(), QUEUED, RUNNING),
+            )
+        return cursor.rowcount
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, include_result: bool = False) -> Dict[str, Any]:
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "error": row["error"],
+            "cancel_requested": bool(row["cancel_requested"]),
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if include_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+
+class StoredEventLog:
+    """Progress events of a job read back from the JobStore, for jobs run by another server process.
+
+    Has the iteration interface of EventLog; polls the store for new events.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, poll_interval: float = 0.5):
+        self.store = store
+        self.job_id = job_id
+        self.poll_interval = poll_interval
+
+    def iter_events(self, after: int = 0, heartbeat: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield events with id > after until the job has finished (None as keep-alive, like EventLog)."""
+        position, idle, finished = after, 0.0, False
+        while True:
+            events = self.store.events(self.job_id, position)
+            if events:
+                position, idle = events[-1]["id"], 0.0
+                yield from events
+                if events[-1]["event"] == "job_finished":
+                    return
+                continue
+            job = self.store.get(self.job_id)
+            # A finished job's last events are written right after its status; give them one more poll
+            if job is None or finished or not self.store.alive(self.job_id):
+                return
+            finished = job["status"] in FINISHED_STATUSES
+            time.sleep(self.poll_interval)
+            idle += self.poll_interval
+            if idle >= heartbeat:
+                idle = 0.0
+                yield None
+
+
+class JobManager:
+    """Runs submitted jobs on a bounded thread pool and tracks them in a JobStore."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        max_workers: int = 4,
+        events: Optional[EventBroker] = None,
+        recover: bool = True,
+        cancel_poll_interval: float = 0,
+        metrics=None,
+        tracer=None,
+    ):
+        self.store = store
+        # Optional app.core.metrics.Metrics: records how long jobs wait for a worker
+        self.metrics = metrics
+        # Optional app.core.tracing.Tracer: each job runs in a span of the request that submitted it
+        self.tracer = tracer
+        # Events are also written to the store, so any server process can stream them
+        self.events = events or EventBroker(persist=store.append_event)
+        self.store.prune_events(self.events.retention_seconds)
+        # Multi-worker servers recover once in the master, not in every worker
+        if recover:
+            self.store.recover_interrupted()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="portia-job")
+        self._futures = {}
+        self._states: Dict[str, RunState] = {}
+        self._lock = threading.Lock()
+        # With several server processes, a cancel request may be handled by a
+        # process other than the one running the job; pick those up from the store.
+        if cancel_poll_interval > 0:
+            threading.Thread(
+                target=self._watch_cancellations, args=(cancel_poll_interval,), name="job-cancel-watch", daemon=True
+            ).start()
+
+    def submit(self, kind: str, inputs: Any, fn: Callable[[Any], Any], **run_options) -> Dict[str, Any]:
+        """Queue fn(inputs) for execution and return the new job record.
+
+        run_options are set on the job's RunState (e.g. llm_cache_bypass=True).
+        """
+        job = self.store.create(kind, inputs)
+        self._start(job, fn, inputs, **run_options)
+        return job
+
+    def submit_once(self, key: str, kind: str, inputs: Any, fn: Callable[[Any], Any], **run_options) -> Tuple[Dict[str, Any], bool]:
+        """Like submit, but attach to the unfinished job already submitted under key by any server process.
+
+        Returns (job, coalesced).
+        """
+        job, created = self.store.claim(key, kind, inputs)
+        if created:
+            self._start(job, fn, inputs, **run_options)
+        return job, not created
+
+    def _start(self, job: Dict[str, Any], fn: Callable[[Any], Any], inputs: Any, **run_options) -> None:
+        job_id, kind = job["job_id"], job["kind"]
+        state = RunState(job_id=job_id, events=self.events.open(job_id), **run_options)
+        state.emit("job_queued", kind=kind)
+        with self._lock:
+            self._states[job_id] = state
+            future = self._executor.submit(in_context(self._execute, job_id, state, fn, inputs, kind, time.perf_counter()))
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id, include_result=include_result)
+
+    def list(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.store.list(limit=limit, status=status)
+
+    def event_log(self, job_id: str):
+        """Progress event log of a job: in memory when this process runs it, else read from the store."""
+        log = self.events.get(job_id)
+        if log is None and self.store.get(job_id) is not None:
+            return StoredEventLog(self.store, job_id)
+        return log
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until the job finishes (or timeout) and return it with its result."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+        return self.get(job_id, include_result=True)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job, or request cooperative cancellation of a running one."""
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        with self._lock:
+            future = self._futures.get(job_id)
+            state = self._states.get(job_id)
+        if state is not None:
+            state.cancel_event.set()
+        if future is not None and future.cancel():
+            self.store.update(job_id, status=CANCELLED, cancel_requested=1, finished_at=time.time())
+            if state is not None:
+                self._finish_events(state, CANCELLED)
+        else:
+            self.store.update(job_id, cancel_requested=1)
+        return self.store.get(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _watch_cancellations(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                states = dict(self._states)
+            try:
+                requested = self.store.cancel_requested(list(states))
+            except sqlite3.Error:
+                continue
+            for job_id in requested:
+                states[job_id].cancel_event.set()
+
+    def _execute(
+        self, job_id: str, state: RunState, fn: Callable[[Any], Any], inputs: Any, kind: str = "", queued_at: float = 0.0
+    ):
+        queue_seconds = time.perf_counter() - queued_at if queued_at else 0.0
+        if self.metrics is not None and queued_at:
+            self.metrics.observe_job_queue(kind, queue_seconds)
+        if state.cancel_event.is_set():
+            self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+            self._finish_events(state, CANCELLED)
+            return None
+        self.store.update(job_id, status=RUNNING, started_at=time.time())
+        state.emit("job_started")
+        span = (
+            self.tracer.span("job", job_id=job_id, job_kind=kind, queue_ms=round(queue_seconds * 1000, 1))
+            if self.tracer is not None
+            else nullcontext()
+        )
+        try:
+            with bind_run(state), span:
+                result = fn(inputs)
+        except RunCancelled as e:
+            self.store.update(job_id, status=CANCELLED, error=str(e), finished_at=time.time())
+            self._finish_events(state, CANCELLED, error=str(e))
+            return None
+        except Exception as e:
+            self.store.update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+            self._finish_events(state, FAILED, error=str(e))
+            return None
+        if state.cancel_event.is_set():
+            self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+            self._finish_events(state, CANCELLED)
+            return None
+        self.store.update(job_id, status=SUCCEEDED, result=result, finished_at=time.time())
+        self._finish_events(state, SUCCEEDED, result=result)
+        return result
+
+    @staticmethod
+    def _finish_events(state: RunState, status: str, **data) -> None:
+        state.emit("job_finished", status=status, **data)
+        if state.events is not None:
+            state.events.close()
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._states.pop(job_id, None)
+            self._futures.pop(job_id, None)
+
+
+def create_job_manager(recover: bool = True, cancel_poll_interval: float = 0, metrics=None, tracer=None) -> JobManager:
+    """Build the JobManager configured from the environment."""
+    store = JobStore(os.getenv("PORTIA_JOB_DB", "jobs/jobs.db"))
+    return JobManager(
+        store,
+        max_workers=int(os.getenv("PORTIA_JOB_WORKERS", "4")),
+        recover=recover,
+        cancel_poll_interval=cancel_poll_interval,
+        metrics=metrics,
+        tracer=tracer,
+    )
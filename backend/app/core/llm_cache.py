@@ -0,0 +1,86 @@
+"""Exact-match completion cache for LLM calls.
+
+Completions are keyed deterministically on the model, the fully rendered
+prompt messages and the structured-output schema, so re-running a plan with
+identical inputs replays earlier completions instead of paying for them again.
+The cache is opt-in (PORTIA_LLM_CACHE=1) and can be bypassed per run.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.disk_cache import DiskCache
+from app.core.run_state import current_run
+from app.core.simulation import simulated_path
+from app.core.tool_cache import cache_key
+
+
+class CompletionCache:
+    """Counts and serves exact-match completions from a DiskCache."""
+
+    def __init__(self, store: DiskCache):
+        self.store = store
+        self.counters = {"hits": 0, "misses": 0, "bypassed": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, Any]], schema: Optional[Dict[str, Any]] = None) -> str:
+        return cache_key("llm", {"model": model, "messages": messages, "schema": schema})
+
+    def bypassed(self) -> bool:
+        """True if the current run asked to skip the cache."""
+        state = current_run()
+        if state is not None and state.llm_cache_bypass:
+            self._count("bypassed")
+            return True
+        return False
+
+    def get(self, model: str, messages: List[Dict[str, Any]], schema: Optional[Dict[str, Any]] = None) -> Any:
+        """Encoded cached completion, or None on a miss."""
+        entry = self.store.get(self.key(model, messages, schema))
+        self._count("hits" if entry is not None else "misses")
+        return entry.value if entry is not None else None
+
+    def put(self, model: str, messages: List[Dict[str, Any]], schema: Optional[Dict[str, Any]], value: Any) -> None:
+        self.store.set(self.key(model, messages, schema), value)
+
+    def fetch(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        schema: Optional[Dict[str, Any]],
+        compute: Callable[[], Any],
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any],
+    ) -> Any:
+        """Return the cached completion for this prompt, or compute and store it."""
+        if self.bypassed():
+            return compute()
+        cached = self.get(model, messages, schema)
+        if cached is not None:
+            return decode(cached)
+        response = compute()
+        self.put(model, messages, schema, encode(response))
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {**counters, "hit_rate": counters["hits"] / lookups if lookups else None, **self.store.stats()}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+
+def create_completion_cache() -> Optional[CompletionCache]:
+    """Build the completion cache if enabled with PORTIA_LLM_CACHE=1."""
+    if os.getenv("PORTIA_LLM_CACHE", "0").lower() not in ("1", "true", "yes"):
+        return None
+    store = DiskCache(
+        simulated_path(os.getenv("PORTIA_LLM_CACHE_DIR", "cache/llm")),
+        max_bytes=int(os.getenv("PORTIA_LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    )
+    return CompletionCache(store)
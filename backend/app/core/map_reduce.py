@@ -0,0 +1,273 @@
+"""Map-reduce summarization of tool outputs too long for one prompt.
+
+Extract and crawl steps can return documents far larger than a context
+window. ``summarize_document`` is a plan function step
+(``.function_step(function=summarize_document, args={"document": StepOutput(...),
+"instruction": "..."})``). It hands the next step a condensed version of a
+long output:
+
+- each long document is split into overlapping chunks on paragraph and
+  sentence boundaries;
+- the chunks of every document are summarized concurrently on a bounded
+  thread pool (map);
+- chunk summaries are merged ``fan_in`` at a time, level after level, until
+  one summary per document remains (reduce).
+
+Results shaped like search/crawl/extract output (a list of results with a
+URL) keep that shape, with each long page's content replaced by its summary,
+so downstream steps read them exactly as before. Short documents pass
+through untouched. Every map and reduce completion is cached on disk under
+the model, the instruction and the text it summarizes. Re-running a plan, or
+resuming it, only summarizes chunks whose text changed.
+
+PortiaClient installs the process-wide summarizer with ``configure_map_reduce``.
+Without one (or with PORTIA_MAP_REDUCE=0) documents pass through unchanged.
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.compaction import CHARS_PER_TOKEN, estimate_tokens, extract_sources
+from app.core.disk_cache import DiskCache
+from app.core.run_state import current_run
+from app.core.simulation import simulated_path
+from app.core.tool_cache import cache_key
+from app.core.tracing import in_context
+
+PARAGRAPH = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+MAP_PROMPT = """{instruction}
+
+This is part {part} of {parts} of a longer document. Summarize this part only. Keep every concrete fact,
+figure, name, date and URL that matters for the task; drop boilerplate, navigation and repetition.
+
+{text}"""
+
+REDUCE_PROMPT = """{instruction}
+
+Below are summaries of consecutive parts of one document. Merge them into a single summary that keeps
+every concrete fact, figure, name, date and URL that matters for the task, without repeating itself.
+
+{text}"""
+
+DEFAULT_INSTRUCTION = "Summarize the source content for later analysis."
+
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    """Paragraphs, then sentences, then hard slices, each at most max_chars long."""
+    pieces: List[str] = []
+    for paragraph in PARAGRAPH.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                pieces.append(sentence)
+    return pieces
+
+
+def chunk_text(text: str, chunk_tokens: int = 3000, overlap_tokens: int = 150) -> List[str]:
+    """Split text into chunks of about chunk_tokens, each starting with the end of the previous one."""
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    overlap_chars = min(overlap_tokens * CHARS_PER_TOKEN, max_chars // 4)
+    chunks: List[str] = []
+    current = ""
+    for piece in _pieces(text, max_chars - overlap_chars):
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            tail = current[-overlap_chars:] if overlap_chars else ""
+            # Start the overlap on a word boundary
+            current = tail[tail.find(" ") + 1:] if " " in tail else tail
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class MapReduceSummarizer:
+    """Summarizes long texts with concurrent, cached chunk completions."""
+
+    def __init__(
+        self,
+        summarize: Callable[[str], str],
+        model_key: str = "",
+        cache: Optional[DiskCache] = None,
+        max_workers: int = 4,
+        chunk_tokens: int = 3000,
+        overlap_tokens: int = 150,
+        fan_in: int = 6,
+    ):
+        self.summarize = summarize
+        self.model_key = model_key
+        self.cache = cache
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.fan_in = max(2, fan_in)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="map-reduce")
+        self.counters = {"completions": 0, "cache_hits": 0}
+        self._lock = threading.Lock()
+
+    def fits(self, text: str) -> bool:
+        return estimate_tokens(text) <= self.chunk_tokens
+
+    def _complete(self, prompt: str) -> str:
+        key = cache_key("map_reduce", {"model": self.model_key, "prompt": prompt})
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                self._count("cache_hits")
+                return entry.value
+        summary = str(self.summarize(prompt)).strip()
+        self._count("completions")
+        if self.cache is not None:
+            self.cache.set(key, summary)
+        return summary
+
+    def summarize_many(self, texts: List[str], instruction: str = DEFAULT_INSTRUCTION) -> List[str]:
+        """One summary per text; texts that fit in a chunk are returned as they are."""
+        instruction = instruction or DEFAULT_INSTRUCTION
+        results = list(texts)
+        # Map: every chunk of every long text, on the shared pool
+        parts: Dict[int, List[str]] = {}
+        jobs = []
+        for index, text in enumerate(texts):
+            if self.fits(text):
+                continue
+            chunks = chunk_text(text, self.chunk_tokens, self.overlap_tokens)
+            prompts = [
+                MAP_PROMPT.format(instruction=instruction, part=n + 1, parts=len(chunks), text=chunk)
+                for n, chunk in enumerate(chunks)
+            ]
+            jobs.append((index, [self._pool.submit(in_context(self._complete, prompt)) for prompt in prompts]))
+        for index, futures in jobs:
+            parts[index] = [future.result() for future in futures]
+        # Reduce: merge fan_in summaries at a time until one is left per text
+        while parts:
+            state = current_run()
+            if state is not None:
+                state.check_cancelled()
+            jobs = []
+            for index, summaries in parts.items():
+                groups = [summaries[i:i + self.fan_in] for i in range(0, len(summaries), self.fan_in)]
+                prompts = [
+                    REDUCE_PROMPT.format(instruction=instruction, text="\n\n---\n\n".join(group)) for group in groups
+                ]
+                jobs.append((index, [self._pool.submit(in_context(self._complete, prompt)) for prompt in prompts]))
+            parts = {}
+            for index, futures in jobs:
+                merged = [future.result() for future in futures]
+                if len(merged) == 1:
+                    results[index] = merged[0]
+                else:
+                    parts[index] = merged
+        return results
+
+    def summarize_document(self, document: Any, instruction: str = DEFAULT_INSTRUCTION) -> Any:
+        """document with its long parts replaced by their summaries (see module docstring)."""
+        sources = extract_sources("document", document)
+        if sources and all(source.url for source in sources):
+            if all(self.fits(source.text) for source in sources):
+                return document
+            summaries = self.summarize_many([source.text for source in sources], instruction)
+            return {
+                "results": [
+                    {"url": source.url, "title": source.title, "content": summary}
+                    for source, summary in zip(sources, summaries)
+                ]
+            }
+        text = document if isinstance(document, str) else json.dumps(document, default=str, ensure_ascii=False)
+        if self.fits(text):
+            return document
+        return self.summarize_many([text], instruction)[0]
+
+    def condense(self, text: str, max_tokens: int, instruction: str = DEFAULT_INSTRUCTION) -> str:
+        """Summary of text in about max_tokens (map-reduced first if it spans several chunks)."""
+        return self.condense_many([text], [max_tokens], instruction)[0]
+
+    def condense_many(self, texts: List[str], max_tokens: List[int], instruction: str = DEFAULT_INSTRUCTION) -> List[str]:
+        """condense for several texts at once, their chunks sharing the pool."""
+        instruction = instruction or DEFAULT_INSTRUCTION
+        long = [i for i, text in enumerate(texts) if estimate_tokens(text) > max_tokens[i]]
+        results = list(texts)
+        for index, summary in zip(long, self.summarize_many([texts[i] for i in long], instruction)):
+            results[index] = summary
+        rewrites = []
+        for index in long:
+            if estimate_tokens(results[index]) > max_tokens[index]:
+                words = max(1, max_tokens[index] * 3 // 4)
+                prompt = f"{instruction}\n\nRewrite the following in at most {words} words.\n\n{results[index]}"
+                rewrites.append((index, self._pool.submit(in_context(self._complete, prompt))))
+        for index, future in rewrites:
+            results[index] = future.result()
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+
+_summarizer: Optional[MapReduceSummarizer] = None
+
+
+def configure_map_reduce(
+    summarize: Callable[[str], str], model_key: str = "", cached: bool = True
+) -> Optional[MapReduceSummarizer]:
+    """Install the process-wide summarizer used by summarize_document, configured from the environment."""
+    global _summarizer
+    if os.getenv("PORTIA_MAP_REDUCE", "1").lower() in ("0", "false", "no", "off"):
+        _summarizer = None
+        return None
+    cache = None
+    if cached and os.getenv("PORTIA_MAP_REDUCE_CACHE", "1").lower() not in ("0", "false", "no", "off"):
+        cache = DiskCache(
+            simulated_path(os.getenv("PORTIA_MAP_REDUCE_CACHE_DIR", "cache/map_reduce")),
+            max_bytes=int(os.getenv("PORTIA_MAP_REDUCE_CACHE_MAX_MB", "128")) * 1024 * 1024,
+        )
+    _summarizer = MapReduceSummarizer(
+        summarize,
+        model_key=model_key,
+        cache=cache,
+        max_workers=int(os.getenv("PORTIA_MAP_REDUCE_WORKERS", "4")),
+        chunk_tokens=int(os.getenv("PORTIA_MAP_REDUCE_CHUNK_TOKENS", "3000")),
+        overlap_tokens=int(os.getenv("PORTIA_MAP_REDUCE_OVERLAP_TOKENS", "150")),
+        fan_in=int(os.getenv("PORTIA_MAP_REDUCE_FAN_IN", "6")),
+    )
+    return _summarizer
+
+
+def get_map_reduce() -> Optional[MapReduceSummarizer]:
+    return _summarizer
+
+
+def summarize_document(document, instruction=DEFAULT_INSTRUCTION):
+    """Plan function step: document condensed by map-reduce, or unchanged if it is short."""
+    summarizer = get_map_reduce()
+    if summarizer is None:
+        return document
+    before = summarizer.stats()
+    summarized = summarizer.summarize_document(document, instruction)
+    state = current_run()
+    if state is not None and summarized is not document:
+        after = summarizer.stats()
+        state.emit(
+            "document_summarized",
+            step=state.current_step,
+            completions=after["completions"] - before["completions"],
+            cache_hits=after["cache_hits"] - before["cache_hits"],
+        )
+    return summarized
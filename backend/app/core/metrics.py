@@ -0,0 +1,116 @@
+"""Prometheus metrics of plan runs, steps, tool calls and LLM calls.
+
+PortiaClient's execution hooks time every step and tool call, a model
+wrapper times LLM calls and counts their tokens, and the job manager
+records how long jobs waited for a worker. Everything is exposed on
+``GET /metrics`` in the Prometheus text format.
+
+Metrics are on by default when ``prometheus_client`` is installed and can
+be turned off with PORTIA_METRICS=0. When off, ``create_metrics`` returns
+None and the hooks skip all bookkeeping. Under a multi-process server, set
+PROMETHEUS_MULTIPROC_DIR so that a scrape aggregates every worker.
+
+LLM tokens are estimated from the prompt and response text (about four
+characters per token). Cost is tracked when PORTIA_LLM_INPUT_COST_PER_1K /
+PORTIA_LLM_OUTPUT_COST_PER_1K give the price per thousand tokens.
+"""
+
+import os
+from typing import Optional, Tuple
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram
+except ImportError:  # metrics are optional
+    prometheus_client = None
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+QUEUE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+TOKEN_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+
+class Metrics:
+    """Histograms and counters of one process, in their own registry."""
+
+    def __init__(self, input_cost_per_1k: float = 0.0, output_cost_per_1k: float = 0.0):
+        self.registry = CollectorRegistry()
+        self.input_cost_per_1k = input_cost_per_1k
+        self.output_cost_per_1k = output_cost_per_1k
+        self.plan_duration = Histogram(
+            "portia_plan_run_duration_seconds", "Duration of plan runs",
+            ["plan", "status"], buckets=DURATION_BUCKETS, registry=self.registry,
+        )
+        self.step_duration = Histogram(
+            "portia_step_duration_seconds", "Duration of plan steps",
+            ["plan", "step", "kind", "tool"], buckets=DURATION_BUCKETS, registry=self.registry,
+        )
+        self.job_queue = Histogram(
+            "portia_job_queue_seconds", "Time background jobs waited for a worker",
+            ["kind"], buckets=QUEUE_BUCKETS, registry=self.registry,
+        )
+        self.tool_duration = Histogram(
+            "portia_tool_call_duration_seconds", "Duration of tool calls",
+            ["tool", "step"], buckets=DURATION_BUCKETS, registry=self.registry,
+        )
+        self.llm_duration = Histogram(
+            "portia_llm_call_duration_seconds", "Duration of LLM calls",
+            ["model", "step"], buckets=DURATION_BUCKETS, registry=self.registry,
+        )
+        self.llm_tokens = Histogram(
+            "portia_llm_tokens", "Estimated tokens per LLM call",
+            ["model", "step", "direction"], buckets=TOKEN_BUCKETS, registry=self.registry,
+        )
+        self.llm_cost = Counter(
+            "portia_llm_cost_usd", "Estimated LLM spend in USD",
+            ["model", "step"], registry=self.registry,
+        )
+        self.errors = Counter(
+            "portia_errors", "Failed plan runs, steps and LLM calls",
+            ["plan", "step", "source"], registry=self.registry,
+        )
+
+    def observe_plan(self, plan: Optional[str], status: str, seconds: float) -> None:
+        self.plan_duration.labels(plan or "", status).observe(seconds)
+
+    def observe_step(self, plan: Optional[str], step: Optional[str], kind: str, tool: Optional[str], seconds: float) -> None:
+        self.step_duration.labels(plan or "", step or "", kind, tool or "").observe(seconds)
+
+    def observe_job_queue(self, kind: str, seconds: float) -> None:
+        self.job_queue.labels(kind).observe(seconds)
+
+    def observe_tool(self, tool: str, step: Optional[str], seconds: float) -> None:
+        self.tool_duration.labels(tool, step or "").observe(seconds)
+
+    def observe_llm(self, model: str, step: Optional[str], seconds: float, tokens_in: int, tokens_out: int) -> None:
+        step = step or ""
+        self.llm_duration.labels(model, step).observe(seconds)
+        self.llm_tokens.labels(model, step, "in").observe(tokens_in)
+        self.llm_tokens.labels(model, step, "out").observe(tokens_out)
+        cost = (tokens_in * self.input_cost_per_1k + tokens_out * self.output_cost_per_1k) / 1000
+        if cost:
+            self.llm_cost.labels(model, step).inc(cost)
+
+    def error(self, plan: Optional[str], step: Optional[str], source: str) -> None:
+        self.errors.labels(plan or "", step or "", source).inc()
+
+    def exposition(self) -> Tuple[bytes, str]:
+        """(body, content type) of a scrape; aggregates all workers in multi-process mode."""
+        registry = self.registry
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def create_metrics() -> Optional[Metrics]:
+    """Build the process's metrics, or None when disabled or prometheus_client is missing."""
+    if prometheus_client is None:
+        return None
+    if os.getenv("PORTIA_METRICS", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return Metrics(
+        input_cost_per_1k=float(os.getenv("PORTIA_LLM_INPUT_COST_PER_1K", "0")),
+        output_cost_per_1k=float(os.getenv("PORTIA_LLM_OUTPUT_COST_PER_1K", "0")),
+    )
@@ -0,0 +1,151 @@
+"""Concurrent execution of pipeline phases with explicit dependencies.
+
+A pipeline made of several sub-plans is described as a list of ``Phase``
+objects. Each phase runs as its own plan run as soon as the phases it depends
+on have finished, so independent branches (video production only needs the
+pipeline inputs) overlap instead of queueing behind each other. Phases that
+are disabled for a request are skipped; an enabled phase may not depend on a
+disabled one, since it would run without the output it needs.
+"""
+
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.run_state import RunState, bind_run, current_run
+from app.core.tracing import in_context
+
+PATH_PART = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+
+def pick(value: Any, path: str) -> Any:
+    """Follow a path like ``recommended_angles[0]`` into a phase output (None if missing)."""
+    for name, index in PATH_PART.findall(path):
+        if value is None:
+            return None
+        if index:
+            try:
+                value = value[int(index)]
+            except (IndexError, KeyError, TypeError):
+                return None
+        elif isinstance(value, dict):
+            value = value.get(name)
+        else:
+            value = getattr(value, name, None)
+    return value
+
+
+@dataclass
+class Phase:
+    name: str
+    plan: Callable[[], Any]
+    # (pipeline inputs, outputs of finished phases) -> plan_run_inputs
+    inputs: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+    depends_on: Tuple[str, ...] = ()
+    enabled: Callable[[Dict[str, Any]], bool] = lambda inputs: True
+
+
+@dataclass
+class PhaseReport:
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    wall_time: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-phase timing, plus the total against the sequential cost."""
+        durations = [t["duration"] for t in self.timings.values() if t.get("duration") is not None]
+        return {
+            "phases": self.timings,
+            "wall_time": round(self.wall_time, 3),
+            "sum_of_phases": round(sum(durations), 3),
+        }
+
+
+def run_phases(
+    phases: List[Phase],
+    inputs: Dict[str, Any],
+    execute: Callable[[Any, Dict[str, Any]], Any],
+    max_parallel: int = 4,
+) -> PhaseReport:
+    """Run phases concurrently in dependency order; execute(plan, plan_run_inputs) -> output."""
+    parent = current_run()
+    known = {phase.name for phase in phases}
+    enabled = {phase.name for phase in phases if phase.enabled(inputs)}
+    report = PhaseReport()
+    for phase in phases:
+        unknown = set(phase.depends_on) - known
+        if unknown:
+            raise ValueError(f"Phase {phase.name} depends on unknown phases: {sorted(unknown)}")
+        if phase.name not in enabled:
+            report.timings[phase.name] = {"status": "skipped"}
+        elif set(phase.depends_on) - enabled:
+            raise ValueError(
+                f"Phase {phase.name} depends on disabled phases: {sorted(set(phase.depends_on) - enabled)}"
+            )
+
+    started = time.perf_counter()
+    pending = [phase for phase in phases if phase.name in enabled]
+    running = {}
+    error: Optional[BaseException] = None
+
+    def run_phase(phase: Phase, outputs: Dict[str, Any]):
+        state = parent.fork() if parent is not None else RunState()
+        phase_started = time.perf_counter()
+        output, failure = None, None
+        with bind_run(state):
+            try:
+                output = execute(phase.plan(), phase.inputs(inputs, outputs))
+            except BaseException as e:
+                failure = e
+        timing = {
+            "started_at": round(phase_started - started, 3),
+            "duration": round(time.perf_counter() - phase_started, 3),
+            "run_id": state.run_id,
+        }
+        return output, timing, state, failure
+
+    with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="phase") as pool:
+        while pending or running:
+            if error is None:
+                for phase in list(pending):
+                    if all(dep in report.outputs for dep in phase.depends_on):
+                        pending.remove(phase)
+                        if parent is not None:
+                            parent.emit("phase_started", phase=phase.name)
+                        running[pool.submit(in_context(run_phase, phase, dict(report.outputs)))] = phase
+            else:
+                pending.clear()
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                phase = running.pop(future)
+                output, timing, state, failure = future.result()
+                if failure is not None:
+                    error = error or failure
+                    report.timings[phase.name] = {"status": "failed", "error": str(failure), **timing}
+                    if parent is not None:
+                        parent.emit("phase_failed", phase=phase.name, error=str(failure), **_event_timing(timing))
+                    continue
+                report.outputs[phase.name] = output
+                report.timings[phase.name] = {"status": "succeeded", **timing}
+                if parent is not None:
+                    _merge_artifacts(parent, state)
+                    parent.emit("phase_finished", phase=phase.name, **_event_timing(timing))
+
+    report.wall_time = time.perf_counter() - started
+    if error is not None:
+        raise error
+    return report
+
+
+def _event_timing(timing: Dict[str, Any]) -> Dict[str, Any]:
+    # run_id of an event is the parent run's; the phase's own run goes under phase_run_id
+    return {"started_at": timing["started_at"], "duration": timing["duration"], "phase_run_id": timing["run_id"]}
+
+
+def _merge_artifacts(parent: RunState, child: RunState) -> None:
+    seen = {entry["path"] for entry in parent.artifacts}
+    parent.artifacts.extend(entry for entry in child.artifacts if entry["path"] not in seen)
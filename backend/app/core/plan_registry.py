@@ -0,0 +1,188 @@
+"""Prebuilt, content-hashed plans shared by every run.
+
+Building a PlanBuilderV2 chain validates every step, and a plan with
+sub-plans builds them again. The registry builds each plan once (on
+first use, or all at once before the server forks its workers) and hands
+the same plan object to every run. Plans handed out are shared: treat them
+as read-only.
+
+Each plan gets a content hash over its label, inputs and step definitions,
+ignoring the random id a new build gets. The hash stays stable across
+processes and restarts and changes whenever the plan's code does, so it can
+serve as a stable plan identity.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.scheduler import StepGraph
+from app.core.serialization import stable_repr
+
+# Fields that differ between two builds of the same plan
+VOLATILE_FIELDS = {"id"}
+
+
+def _canonical(value: Any, seen: Optional[set] = None) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, uuid.UUID):
+        return None
+    if callable(value) and hasattr(value, "__code__") or isinstance(value, type):
+        return stable_repr(value)
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return "<cycle>"
+    seen.add(id(value))
+    try:
+        if isinstance(value, dict):
+            return {str(k): _canonical(v, seen) for k, v in value.items() if k not in VOLATILE_FIELDS}
+        if isinstance(value, (list, tuple)):
+            return [_canonical(v, seen) for v in value]
+        if isinstance(value, (set, frozenset)):
+            return sorted((_canonical(v, seen) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+        fields = getattr(value, "__dict__", None)
+        if fields is not None:
+            return {
+                "__type__": f"{type(value).__module__}.{type(value).__qualname__}",
+                **{k: _canonical(v, seen) for k, v in fields.items() if k not in VOLATILE_FIELDS and not k.startswith("__")},
+            }
+        return stable_repr(value)
+    finally:
+        seen.discard(id(value))
+
+
+def plan_hash(plan) -> str:
+    """Content hash of a plan's definition, stable across builds and processes."""
+    payload = {
+        "label": getattr(plan, "label", None),
+        "inputs": _canonical(list(getattr(plan, "plan_inputs", None) or [])),
+        "steps": _canonical(list(getattr(plan, "steps", None) or [])),
+        "final_output_schema": _canonical(getattr(plan, "final_output_schema", None)),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=stable_repr)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class RegisteredPlan:
+    name: str
+    plan: Any
+    plan_hash: str
+    graph: StepGraph
+    build_seconds: float
+    # Prompt budget of the plan's LLM step inputs (app.core.prompt_budget), if declared
+    budget: Any = None
+
+    @property
+    def label(self) -> Optional[str]:
+        return getattr(self.plan, "label", None)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "label": self.label,
+            "hash": self.plan_hash,
+            "steps": self.graph.names,
+            "inputs": [i.name for i in getattr(self.plan, "plan_inputs", None) or []],
+            "build_ms": round(self.build_seconds * 1000, 1),
+        }
+
+
+class PlanRegistry:
+    """Named plan factories, each built once and shared."""
+
+    def __init__(self, factories: Dict[str, Callable[[], Any]], budgets: Optional[Dict[str, Callable[[], Any]]] = None):
+        self._factories = dict(factories)
+        self._budgets = dict(budgets or {})
+        self._plans: Dict[str, RegisteredPlan] = {}
+        self._by_object: Dict[int, RegisteredPlan] = {}
+        # Reentrant: building a plan fetches its sub-plans from the registry
+        self._lock = threading.RLock()
+
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def entry(self, name: str) -> RegisteredPlan:
+        entry = self._plans.get(name)
+        if entry is not None:
+            return entry
+        if name not in self._factories:
+            raise KeyError(f"Unknown plan: {name}")
+        with self._lock:
+            if name not in self._plans:
+                started = time.perf_counter()
+                plan = self._factories[name]()
+                entry = RegisteredPlan(
+                    name=name,
+                    plan=plan,
+                    plan_hash=plan_hash(plan),
+                    graph=StepGraph.from_plan(plan),
+                    build_seconds=time.perf_counter() - started,
+                    budget=self._budgets[name]() if name in self._budgets else None,
+                )
+                self._plans[name] = entry
+                self._by_object[id(plan)] = entry
+        return self._plans[name]
+
+    def get(self, name: str):
+        """The shared plan registered under name, built on first use."""
+        return self.entry(name).plan
+
+    def lookup(self, plan) -> Optional[RegisteredPlan]:
+        """The registry entry of a plan object handed out by this registry, if any."""
+        return self._by_object.get(id(plan))
+
+    def by_label(self, label: str) -> RegisteredPlan:
+        for entry in self.build_all():
+            if entry.label == label:
+                return entry
+        raise KeyError(f"No registered plan is labelled {label!r}")
+
+    def by_hash(self, plan_hash: str) -> RegisteredPlan:
+        for entry in self.build_all():
+            if entry.plan_hash == plan_hash:
+                return entry
+        raise KeyError(f"No registered plan has hash {plan_hash}")
+
+    def build_all(self) -> List[RegisteredPlan]:
+        """Build every plan now (e.g. before forking server workers)."""
+        return [self.entry(name) for name in self._factories]
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [entry.describe() for entry in self.build_all()]
+
+
+_default_registry: Optional[PlanRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_plan_registry() -> PlanRegistry:
+    """Process-wide registry of the plans in app.agents."""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            from app import agents
+
+            _default_registry = PlanRegistry(
+                {name: _factory(agents, factory) for name, factory in agents.PLANS.items()},
+                budgets={name: _attribute(agents, budget) for name, budget in agents.PROMPT_BUDGETS.items()},
+            )
+        return _default_registry
+
+
+def _factory(agents, factory_name: str) -> Callable[[], Any]:
+    return lambda: getattr(agents, factory_name)()
+
+
+def _attribute(agents, name: str) -> Callable[[], Any]:
+    return lambda: getattr(agents, name)
+
+
+def get_plan(name: str):
+    """Shorthand for get_plan_registry().get(name)."""
+    return get_plan_registry().get(name)
@@ -1,3 +1,6 @@
+import os
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
 from portia import (
     Portia,
@@ -10,35 +13,508 @@ from portia import (
     Input,
     StepOutput
 )
+from portia.execution_hooks import BeforeStepExecutionOutcome, ExecutionHooks
+from portia.end_user import EndUser
 from portia.open_source_tools.registry import open_source_tool_registry
+from portia.model import Message
+from portia.tool import ToolRunContext
 from typing import List, Optional
 from portia.plan import PlanBuilder
-from app.custom_tools.registry import custom_tool_registry
+from app.core.artifacts import ManifestStore, record_artifact
+from app.core.cached_model import (
+    BudgetedGenerativeModel,
+    CachedGenerativeModel,
+    CassetteGenerativeModel,
+    CheckpointedGenerativeModel,
+    MeteredGenerativeModel,
+)
+from app.core.cassettes import create_cassette_store
+from app.core.checkpoints import create_checkpoint_store
+from app.core.incremental import diff_report, fresh_matches, step_fingerprints
+from app.core.llm_cache import create_completion_cache
+from app.core.map_reduce import configure_map_reduce
+from app.core.metrics import create_metrics
+from app.core.phases import run_phases
+from app.core.plan_registry import get_plan_registry
+from app.core.profiling import create_profiler
+from app.core.prompt_budget import create_prompt_budgeter
+from app.core.run_state import RunState, bind_run, current_run, get_run, register_run
+from app.core.scheduler import StepGraph, create_step_scheduler
+from app.core.serialization import output_value, to_jsonable
+from app.core.simulation import get_simulator
+from app.core.tool_cache import DEFAULT_TOOL_TTLS, create_tool_result_cache
+from app.core.tool_snapshot import create_tool_snapshot
+from app.core.tracing import CLIENT, create_tracer, current_span, payload_size
+from app.core.video_jobs import create_video_job_store
+from app.custom_tools.cached_tool import with_tool_cache
+from app.custom_tools.cassette_tool import with_cassettes
+from app.custom_tools.checkpointed_tool import with_checkpoints
+from app.custom_tools.lazy_registry import LazyToolRegistry
+from app.custom_tools.lookahead_tool import with_lookahead
+from app.custom_tools.video_job_tool import with_video_jobs
 
 load_dotenv()
 
+# Open-source tools that write files; maps tool id to the arg holding the path.
+FILE_WRITING_TOOLS = {"file_writer_tool": "filename"}
+
+
+@lru_cache(maxsize=None)
+def base_tool_registry():
+    """Open-source, Portia cloud and custom tools, shared by every client in the process.
+
+    Each source is only built when one of its tools is first needed (see
+    LazyToolRegistry), so a plan using local tools never waits on Portia
+    cloud tool discovery. The production server calls ``load_all()`` before
+    forking its workers, so they share the built tools copy-on-write.
+    With PORTIA_SIMULATE=1, and for cassette replays, the remote tools are
+    simulated offline instead.
+    """
+    simulator = get_simulator()
+    if simulator is not None:
+        from app.custom_tools.simulated_tools import simulated_tool_registry
+
+        return simulated_tool_registry(simulator)
+    return LazyToolRegistry(
+        [
+            ("open_source", lambda: open_source_tool_registry),
+            ("custom", _custom_tools),
+            ("portia", lambda: PortiaToolRegistry(default_config())),
+        ],
+        snapshot=create_tool_snapshot(),
+    )
+
+
+def _custom_tools():
+    from app.custom_tools.registry import custom_tool_registry
+
+    return custom_tool_registry
+
+
+def _summarize_with(model):
+    return lambda prompt: model.get_response([Message(role="user", content=prompt)]).content
+
+
 class PortiaClient:
     def __init__(self):
+        # Step, tool and LLM call timings for /metrics (None when disabled)
+        self.metrics = create_metrics()
+        # Spans of plan runs, steps and tool/LLM calls (None unless PORTIA_TRACE_EXPORTER is set)
+        self.tracer = create_tracer()
+        # On-demand CPU/allocation profiles of requests and plan runs (None unless PORTIA_PROFILING=1)
+        self.profiler = create_profiler()
+        self.manifests = ManifestStore(os.getenv("PORTIA_MANIFEST_DIR", "run_manifests"))
+        # Remote tool calls and LLM exchanges are recorded into or replayed from cassettes (PORTIA_CASSETTE_MODE)
+        self.cassettes = create_cassette_store()
+        # search/extract/crawl results are served from a persistent cache when fresh. Not while
+        # recording or replaying cassettes: a cache hit would never reach the cassette.
+        self.tool_cache = create_tool_result_cache() if self.cassettes is None else None
+        cached_registry = with_tool_cache(with_cassettes(base_tool_registry(), self.cassettes), self.tool_cache)
+        # Independent search/extract/crawl steps run ahead of the engine, in parallel
+        self.scheduler = create_step_scheduler(cached_registry, self.tracer)
+        # Step outputs and the tool/LLM calls behind them are checkpointed for resume()
+        self.checkpoints = create_checkpoint_store()
+        # Video generation calls return a typed VideoJob, indexed by run id
+        self.video_jobs = create_video_job_store()
+        # Checkpoint replays come first, so a replayed step never waits for a look-ahead run
+        self.tool_registry = with_video_jobs(
+            with_checkpoints(with_lookahead(cached_registry, self.scheduler), self.checkpoints), self.video_jobs
+        )
+        # Plans are built once per process and shared by every run
+        self.plans = get_plan_registry()
+        # Opt-in (PORTIA_LLM_CACHE=1): identical prompts are answered from disk
+        self.llm_cache = create_completion_cache() if self.cassettes is None else None
+        # Offline runs (PORTIA_SIMULATE=1, cassette replays) answer LLM and remote tool calls from the simulator
+        self.simulator = get_simulator()
+        if self.simulator is not None:
+            from app.core.simulated_model import SimulatedGenerativeModel
+
+            config, base_model = None, SimulatedGenerativeModel(self.simulator)
+        else:
+            config = Config.from_default(default_log_level=LogLevel.DEBUG)
+            base_model = config.get_default_model()
+        model = base_model
+        if self.cassettes is not None:
+            model = CassetteGenerativeModel(model, self.cassettes)
+        if self.metrics is not None or self.tracer is not None:
+            model = MeteredGenerativeModel(model, self.metrics, self.tracer)
+        # Long tool outputs are condensed by map-reduce steps (their chunk summaries have their own cache)
+        self.map_reduce = configure_map_reduce(
+            _summarize_with(model), model_key=str(model), cached=self.cassettes is None
+        )
+        if self.llm_cache:
+            model = CachedGenerativeModel(model, self.llm_cache)
+        # Step inputs rendered into prompts are capped per plan (above the completion cache, so it keys on
+        # the capped prompt, and below checkpoints, so replayed calls are never budgeted or summarized)
+        self.prompt_budgeter = create_prompt_budgeter(self.map_reduce.condense if self.map_reduce else None)
+        if self.prompt_budgeter:
+            model = BudgetedGenerativeModel(model, self.prompt_budgeter)
+        if self.checkpoints:
+            model = CheckpointedGenerativeModel(model, self.checkpoints)
+        if config is None or model is not base_model:
+            config = Config.from_default(default_log_level=LogLevel.DEBUG, default_model=model)
         # Initialize Portia with all tools and debug logging
         self.portia = Portia(
-            Config.from_default(default_log_level=LogLevel.DEBUG),
-            tools=(open_source_tool_registry+PortiaToolRegistry(default_config())+custom_tool_registry)
+            config,
+            tools=self.tool_registry,
+            execution_hooks=ExecutionHooks(
+                before_plan_run=self._before_plan_run,
+                before_step_execution=self._before_step_execution,
+                after_step_execution=self._after_step_execution,
+                after_plan_run=self._after_plan_run,
+                before_tool_call=self._before_tool_call,
+                after_tool_call=self._after_tool_call,
+            )
         )
 
     def list_tool_ids(self):
-        """Return all available tool IDs."""
-        return [tool.id for tool in self.complete_tool_registry]
+        """Return all available tool IDs (from the metadata snapshot on warm boots)."""
+        return [tool["id"] for tool in base_tool_registry().tool_metadata()]
+
+    def cache_stats(self):
+        """Hit/miss counters and sizes of the client's caches."""
+        return {
+            "tools": self.tool_cache.stats() if self.tool_cache else None,
+            "llm": self.llm_cache.stats() if self.llm_cache else None,
+            "map_reduce": self.map_reduce.stats() if self.map_reduce else None,
+        }
+
+    def prompt_stats(self):
+        """Prompt sizes (tokens) per plan and LLM step since startup."""
+        return self.prompt_budgeter.stats() if self.prompt_budgeter else []
+
 
-    
     def run_plan(self, plan):
-        """Run a plan synchronously and return the result."""
-        plan_run = self.portia.run_plan(plan)
-        return plan_run.model_dump_json(indent=2)
+        """Run a plan synchronously and return the plan run as JSON-compatible data."""
+        return self.execute(plan).model_dump(mode="json")
+
     def run_plan2(self, plan, plan_run_inputs: dict):
         """
-        Run a plan with plan_run_inputs and return the result.
+        Run a plan with plan_run_inputs and return the plan run as JSON-compatible data.
         plan_run_inputs should be a dict mapping input names to values.
         """
-        plan_run = self.portia.run_plan(plan, plan_run_inputs=plan_run_inputs)
-        return plan_run.model_dump_json(indent=2)
+        return self.execute(plan, plan_run_inputs).model_dump(mode="json")
+
+    def execute(self, plan, plan_run_inputs: Optional[dict] = None):
+        """Run a plan with plan_run_inputs and return the PlanRun."""
+        with bind_run(current_run() or RunState()) as state:
+            state.plan = plan
+            outer = self._open_cassette(state, plan, plan_run_inputs)
+            try:
+                if self.profiler is None:
+                    return self._execute(state, plan, plan_run_inputs)
+                with self.profiler.plan_run(getattr(plan, "label", None) or "plan", requested=state.profile) as session:
+                    plan_run = self._execute(state, plan, plan_run_inputs)
+                if session is not None and session.summary is not None:
+                    state.emit("profile_saved", profile=session.name, files=session.summary["files"])
+                return plan_run
+            finally:
+                self._close_cassette(state, outer)
+
+    def _execute(self, state, plan, plan_run_inputs):
+        """Run plan in state's run, recording its checkpoint, metrics, spans and manifest."""
+        started = time.perf_counter()
+        span = self.tracer.start("plan_run", plan=getattr(plan, "label", None)) if self.tracer is not None else None
+        try:
+            plan_run = self.portia.run_plan(plan, plan_run_inputs=plan_run_inputs)
+        except BaseException as e:
+            self._finish_checkpoint(state, "failed", str(e))
+            if span is not None:
+                self._end_spans(state, e)
+                self.tracer.end(*span, error=e)
+            if self.metrics is not None:
+                self.metrics.error(getattr(plan, "label", None), state.current_step, "step" if state.current_step else "plan")
+                self.metrics.observe_plan(getattr(plan, "label", None), "error", time.perf_counter() - started)
+            raise
+        self._finish_checkpoint(state, str(plan_run.state))
+        if self.metrics is not None:
+            status = str(getattr(plan_run.state, "value", plan_run.state)).lower()
+            if status == "failed":
+                self.metrics.error(getattr(plan, "label", None), state.current_step, "step" if state.current_step else "plan")
+            self.metrics.observe_plan(getattr(plan, "label", None), status, time.perf_counter() - started)
+        if span is not None:
+            self._end_spans(state)
+            span[0].set(run_id=str(plan_run.id), status=str(getattr(plan_run.state, "value", plan_run.state)).lower())
+            self.tracer.end(*span)
+        self._save_manifest(state, plan)
+        state.check_cancelled()
+        return plan_run
+
+    def resume(self, run_id: str, plan=None):
+        """
+        Resume a checkpointed plan run from its first incomplete step.
+        The plan is run again with the recorded inputs; tool and LLM calls of
+        steps that completed before are answered from the checkpoint journal.
+        """
+        if self.checkpoints is None:
+            raise RuntimeError("Checkpoints are disabled (PORTIA_CHECKPOINTS=0)")
+        record = self.checkpoints.get_run(run_id)
+        if record is None:
+            raise KeyError(f"No checkpoint for run {run_id}")
+        plan = plan or self.plans.by_label(record["plan"]).plan
+        with bind_run(current_run() or RunState()) as state:
+            state.replay = self.checkpoints.journal(run_id)
+            return self.run_plan2(plan, record["inputs"])
+
+    def run_phases(self, phases, inputs: dict, max_parallel: Optional[int] = None):
+        """Run dependent sub-plan phases concurrently; returns a PhaseReport of outputs and timings."""
+        def execute(plan, plan_run_inputs):
+            final_output = self.execute(plan, plan_run_inputs).outputs.final_output
+            return output_value(final_output) if final_output is not None else None
+
+        if max_parallel is None:
+            max_parallel = int(os.getenv("PORTIA_PHASE_PARALLELISM", "4"))
+        if self.tracer is None:
+            return run_phases(phases, inputs, execute, max_parallel=max(1, max_parallel))
+        with self.tracer.span("phases", phases=len(phases), max_parallel=max_parallel):
+            return run_phases(phases, inputs, execute, max_parallel=max(1, max_parallel))
+
+    def _open_cassette(self, state, plan, plan_run_inputs):
+        """Give the plan run its own cassette; returns the enclosing run's, restored on close."""
+        outer = state.cassette
+        if self.cassettes is not None:
+            state.cassette = self.cassettes.open(getattr(plan, "label", None), plan_run_inputs or {})
+            # Every step really runs, so recordings are complete and replays time the whole plan
+            state.lineage = None
+        return outer
+
+    def _close_cassette(self, state, outer):
+        if self.cassettes is not None and state.cassette is not None:
+            self.cassettes.close(state.cassette)
+            state.emit("cassette_replayed" if self.cassettes.replaying else "cassette_recorded", **state.cassette.stats())
+        state.cassette = outer
+
+    def _finish_checkpoint(self, state, status, error=None):
+        if self.checkpoints is not None and state.run_id is not None:
+            self.checkpoints.finish_run(state.run_id, status, error)
+
+    def _end_spans(self, state, error=None):
+        """End the step and tool spans a failed or interrupted run left open, innermost first."""
+        for key in [key for key in state.spans if key != "step"] + ["step"]:
+            if key in state.spans:
+                self.tracer.end(*state.spans.pop(key), error=error)
+
+    def _save_manifest(self, state, plan):
+        if state.run_id is not None:
+            self.manifests.save(state.run_id, state.artifacts, plan=getattr(plan, "label", None))
+
+    def _graph(self, plan):
+        registered = self.plans.lookup(plan)
+        return registered.graph if registered else StepGraph.from_plan(plan)
+
+    def _plan_inputs(self, plan, plan_run):
+        """Values of the plan's inputs for this run, including defaults."""
+        values = {i.name: i.default_value for i in getattr(plan, "plan_inputs", None) or []}
+        values.update({name: output_value(v) for name, v in (plan_run.plan_run_inputs or {}).items()})
+        return values
+
+    def _node(self, state, index):
+        """Graph node of the step at index of the running plan, if known."""
+        if state.plan is None:
+            return None
+        nodes = self._graph(state.plan).nodes
+        return nodes[index] if 0 <= index < len(nodes) else None
+
+    def _prompt_inputs(self, state, index):
+        """Values of the plan inputs and step outputs the step at index references."""
+        node = self._node(state, index)
+        if node is None:
+            return {}
+        return {name: state.values[name] for name in node.inputs | node.depends_on if name in state.values}
+
+    def _tool_context(self, plan, plan_run):
+        return ToolRunContext(
+            end_user=EndUser(external_id=plan_run.end_user_id),
+            plan_run=plan_run,
+            plan=plan,
+            config=self.portia.config,
+            clarifications=[],
+        )
+
+    # --- Execution hooks ---
+
+    def _run_state(self, plan_run):
+        return get_run(plan_run.id) or current_run()
+
+    def _step_name(self, state, plan_run, step):
+        """Name of the executing step, as declared in the PlanBuilderV2 plan."""
+        steps = getattr(state.plan, "steps", None) or []
+        index = plan_run.current_step_index
+        if 0 <= index < len(steps) and hasattr(steps[index], "step_name"):
+            return steps[index].step_name
+        return str(getattr(step, "output", index)).lstrip("$")
+
+    def _before_plan_run(self, plan, plan_run):
+        state = current_run()
+        if state is not None:
+            register_run(state, plan_run.id)
+            registered = self.plans.lookup(state.plan)
+            span = current_span() if self.tracer is not None else None
+            if span is not None and span.name == "plan_run":
+                span.set(run_id=str(plan_run.id), plan_hash=registered.plan_hash if registered else None)
+            state.emit(
+                "run_started",
+                plan=getattr(state.plan, "label", None),
+                plan_hash=registered.plan_hash if registered else None,
+            )
+            state.call_counts.clear()
+            state.attempts.clear()
+            state.enter_step(None)
+            if self.prompt_budgeter is not None:
+                state.prompt_budget = registered.budget if registered else None
+                state.values = self._plan_inputs(state.plan, plan_run) if state.plan is not None else {}
+            if self.checkpoints is not None:
+                self._start_checkpoint(state, plan_run)
+            if self.scheduler is not None and state.plan is not None:
+                graph = self._graph(state.plan)
+                # Steps replayed from checkpoints make no tool calls worth running ahead
+                replayed = {
+                    node.name for node in graph.nodes
+                    if state.replay is not None and state.replay.completed(node.index)
+                }
+                state.schedule = self.scheduler.start(
+                    state.plan,
+                    self._plan_inputs(state.plan, plan_run),
+                    self._tool_context(plan, plan_run),
+                    graph=graph,
+                    skip=replayed,
+                    state=state,
+                )
+                state.emit(
+                    "run_scheduled",
+                    levels=state.schedule.graph.levels(),
+                    lookahead=list(state.schedule.prefetched),
+                )
+
+    def _start_checkpoint(self, state, plan_run):
+        label = getattr(state.plan, "label", None)
+        inputs = self._plan_inputs(state.plan, plan_run)
+        run_id = str(plan_run.id)
+        ordinal = self.checkpoints.start_run(run_id, state.root_id, label, inputs, lineage=state.lineage)
+        graph = self._graph(state.plan)
+        state.fingerprints = step_fingerprints(state.plan, inputs, graph)
+        state.step_diff = None
+        if state.replay_root is not None:
+            # Resuming a whole request: replay the matching plan run of the earlier attempt
+            previous = self.checkpoints.find_run(state.replay_root, label, ordinal)
+            state.replay = self.checkpoints.journal(previous) if previous else None
+        elif state.replay is None or state.replay.run_id is None:
+            # Incremental re-execution (opt-in per lineage): replay steps whose fingerprint an earlier run of
+            # the lineage already completed, unless the caller bypasses cached answers or their searches expired
+            state.replay = None
+            if state.lineage is not None and not state.llm_cache_bypass:
+                matches = self.checkpoints.find_steps(label, state.fingerprints, exclude=run_id, lineage=state.lineage)
+                expired = self.checkpoints.expired_steps(matches, DEFAULT_TOOL_TTLS)
+                matches = fresh_matches(graph, matches, expired)
+                previous = self.checkpoints.latest_run(label, exclude=run_id, lineage=state.lineage)
+                if previous is not None:
+                    state.step_diff = diff_report(graph, matches, inputs, previous["inputs"], expired)
+                    state.emit("run_diff", steps=state.step_diff)
+                if matches:
+                    state.replay = self.checkpoints.reuse_journal(matches)
+
+    def _before_step_execution(self, plan, plan_run, step):
+        state = self._run_state(plan_run)
+        if state is not None:
+            # Cancellation is cooperative: a cancelled job stops at the next step boundary.
+            state.check_cancelled()
+            name = self._step_name(state, plan_run, step)
+            state.enter_step(name)
+            if self.prompt_budgeter is not None:
+                state.prompt_inputs = self._prompt_inputs(state, plan_run.current_step_index)
+            if self.metrics is not None:
+                state.step_started = time.perf_counter()
+            replayed = state.replay is not None and state.replay.completed(plan_run.current_step_index)
+            if self.tracer is not None:
+                node = self._node(state, plan_run.current_step_index)
+                state.spans["step"] = self.tracer.start(
+                    "step",
+                    step=name,
+                    step_index=plan_run.current_step_index,
+                    step_kind=node.kind if node is not None else type(step).__name__,
+                    tool_id=node.tool_id if node is not None else None,
+                    replayed=replayed,
+                )
+            state.emit(
+                "step_started",
+                step=name,
+                step_index=plan_run.current_step_index,
+                replayed=replayed,
+            )
+        return BeforeStepExecutionOutcome.CONTINUE
+
+    def _after_step_execution(self, plan, plan_run, step, output):
+        state = self._run_state(plan_run)
+        if state is None:
+            return
+        if state.schedule is not None:
+            state.schedule.step_finished(self._step_name(state, plan_run, step), output_value(output))
+        if self.prompt_budgeter is not None:
+            state.values[self._step_name(state, plan_run, step)] = output_value(output)
+        if self.metrics is not None and state.step_started is not None:
+            node = self._node(state, plan_run.current_step_index)
+            self.metrics.observe_step(
+                getattr(state.plan, "label", None),
+                self._step_name(state, plan_run, step),
+                node.kind if node is not None else type(step).__name__,
+                node.tool_id if node is not None else None,
+                time.perf_counter() - state.step_started,
+            )
+            state.step_started = None
+        if self.tracer is not None and "step" in state.spans:
+            state.spans["step"][0].set(output_bytes=payload_size(output_value(output)))
+            self._end_spans(state)
+        if self.checkpoints is not None:
+            name = self._step_name(state, plan_run, step)
+            self.checkpoints.save_step(
+                str(plan_run.id), plan_run.current_step_index, name, output_value(output), state.fingerprints.get(name)
+            )
+        if state.events is not None:
+            state.emit(
+                "step_finished",
+                step=self._step_name(state, plan_run, step),
+                step_index=plan_run.current_step_index,
+                output=to_jsonable(output_value(output)),
+            )
+
+    def _after_plan_run(self, plan, plan_run, output):
+        state = self._run_state(plan_run)
+        if state is not None:
+            if state.schedule is not None:
+                state.schedule.close()
+                state.schedule = None
+            state.emit("run_finished", state=str(plan_run.state))
+
+    def _before_tool_call(self, tool, args, plan_run, step):
+        path_arg = FILE_WRITING_TOOLS.get(tool.id)
+        state = self._run_state(plan_run)
+        if self.metrics is not None and state is not None:
+            state.tool_started[tool.id] = time.perf_counter()
+        if self.tracer is not None and state is not None:
+            key = (state.current_step, tool.id)
+            state.attempts[key] = state.attempts.get(key, 0) + 1
+            state.spans[tool.id] = self.tracer.start(
+                "tool_call",
+                CLIENT,
+                tool_id=tool.id,
+                step=state.current_step,
+                args_bytes=payload_size(args),
+                attempt=state.attempts[key],
+                retry=state.attempts[key] > 1,
+            )
+        if path_arg and state is not None and args.get(path_arg):
+            state.pending_tool_files[tool.id] = str(args[path_arg])
+        return None
 
+    def _after_tool_call(self, tool, output, plan_run, step):
+        state = self._run_state(plan_run)
+        if self.metrics is not None and state is not None and tool.id in state.tool_started:
+            self.metrics.observe_tool(tool.id, state.current_step, time.perf_counter() - state.tool_started.pop(tool.id))
+        if self.tracer is not None and state is not None and tool.id in state.spans:
+            span, token = state.spans.pop(tool.id)
+            span.set(output_bytes=payload_size(output_value(output)))
+            self.tracer.end(span, token)
+        if state is not None and tool.id in state.pending_tool_files:
+            path = state.pending_tool_files.pop(tool.id)
+            record_artifact(plan_run.id, path, tool_id=tool.id, step=self._step_name(state, plan_run, step))
+        return None
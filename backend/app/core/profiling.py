@@ -0,0 +1,326 @@
+"""On-demand CPU and allocation profiles of single requests and plan runs.
+
+Profiling is opt-in (PORTIA_PROFILING=1) and then off until asked for, in
+one of two ways:
+
+- an ``X-Profile: 1`` request header profiles that request, and each plan
+  run of the job it submits with ``?async=true``;
+- ``POST /api/admin/profile`` with ``{"requests": n, "plan_runs": m}`` arms
+  profiling of the next n requests and m plan runs.
+
+When PORTIA_PROFILE_TOKEN is set, both also need an ``X-Profile-Token``
+header with that token.
+
+A profile session samples the stack of the thread serving the request or
+running the plan every PORTIA_PROFILE_INTERVAL_MS, and traces allocations
+with ``tracemalloc`` while it is open. It writes these files to
+PORTIA_PROFILE_DIR (default ``profiles/``), named
+``<time>-<id>-<kind>-<label>``:
+
+- ``.cpu.folded``: collapsed stacks weighted by the thread's CPU time in
+  microseconds, ready for flamegraph.pl, speedscope or inferno;
+- ``.wall.folded``: collapsed stacks weighted by samples (wall clock,
+  including I/O wait);
+- ``.alloc.folded``: allocating tracebacks weighted by the bytes they
+  allocated, and not freed, during the session;
+- ``.tracemalloc``: the final snapshot, for ``tracemalloc.Snapshot.load``;
+- ``.json``: a summary with the top stacks and allocation sites.
+
+Only the profiled thread is sampled. Work it hands to thread pools shows up as
+waiting on futures, and the phases of a profiled pipeline run are profiled
+as plan runs of their own. ``tracemalloc`` is process-wide, so allocations
+made by concurrent requests at the same time are included. It also slows
+every thread down while a session is open.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = "requests"
+PLAN_RUNS = "plan_runs"
+
+UNSAFE_LABEL = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_name(code, lineno: int) -> str:
+    parts = Path(code.co_filename).parts
+    path = "/".join(parts[-2:]) if len(parts) > 1 else code.co_filename
+    return f"{code.co_name} ({path}:{lineno})".replace(";", ":")
+
+
+def collapse(frame) -> str:
+    """A frame's stack as one collapsed-stack line, root first."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def write_folded(path: Path, weights: Dict[str, int]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, weight in sorted(weights.items(), key=lambda item: -item[1]):
+            if weight > 0:
+                f.write(f"{stack} {weight}\n")
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.wall: Counter = Counter()
+        # CPU microseconds the sampled thread spent since the previous sample, by stack
+        self.cpu: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        try:
+            self._clock: Optional[int] = time.pthread_getcpuclockid(thread_id)
+        except (AttributeError, OSError):  # not available on this platform
+            self._clock = None
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _cpu_time(self) -> float:
+        try:
+            return time.clock_gettime(self._clock)
+        except OSError:  # the thread has exited
+            return 0.0
+
+    def _run(self) -> None:
+        last_cpu = self._cpu_time() if self._clock is not None else 0.0
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = collapse(frame)
+            del frame
+            self.samples += 1
+            self.wall[stack] += 1
+            if self._clock is not None:
+                now = self._cpu_time()
+                self.cpu[stack] += int((now - last_cpu) * 1e6)
+                last_cpu = now
+
+
+class ProfileSession:
+    """One profiled request or plan run."""
+
+    def __init__(self, directory: Path, kind: str, label: str, interval: float, tracemalloc_frames: int):
+        self.directory = directory
+        self.kind = kind
+        label = UNSAFE_LABEL.sub("_", label).strip("_")[:60] or "run"
+        self.name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}-{kind}-{label}"
+        self.interval = interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.summary: Optional[Dict[str, Any]] = None
+        self._sampler: Optional[StackSampler] = None
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        _start_tracemalloc(self.tracemalloc_frames)
+        self._baseline = tracemalloc.take_snapshot()
+        self._sampler = StackSampler(threading.get_ident(), self.interval)
+        self._started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self._sampler.stop()
+        elapsed = time.perf_counter() - self._started
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        _stop_tracemalloc()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        snapshot = snapshot.filter_traces(ignore)
+        growth = snapshot.compare_to(self._baseline.filter_traces(ignore), "traceback")
+        self._baseline = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / self.name
+        allocations = {
+            ";".join(f"{Path(frame.filename).name}:{frame.lineno}" for frame in stat.traceback): stat.size_diff
+            for stat in growth
+            if stat.size_diff > 0
+        }
+        write_folded(base.with_name(f"{self.name}.cpu.folded"), self._sampler.cpu)
+        write_folded(base.with_name(f"{self.name}.wall.folded"), self._sampler.wall)
+        write_folded(base.with_name(f"{self.name}.alloc.folded"), allocations)
+        snapshot.dump(str(base.with_name(f"{self.name}.tracemalloc")))
+        self.summary = {
+            "name": self.name,
+            "kind": self.kind,
+            "seconds": round(elapsed, 3),
+            "cpu_seconds": round(sum(self._sampler.cpu.values()) / 1e6, 3),
+            "samples": self._sampler.samples,
+            "allocated_bytes": sum(allocations.values()),
+            "peak_traced_bytes": peak,
+            "top_cpu": _top(self._sampler.cpu),
+            "top_allocations": _top_lines(growth),
+            "files": sorted(path.name for path in self.directory.glob(f"{self.name}.*")) + [f"{self.name}.json"],
+        }
+        with open(base.with_name(f"{self.name}.json"), "w", encoding="utf-8") as f:
+            json.dump(self.summary, f, indent=2)
+        logger.info("Profile %s written to %s", self.name, self.directory)
+        return self.summary
+
+
+def _top(weights: Dict[str, int], n: int = 15) -> List[Dict[str, Any]]:
+    """Heaviest frames by self weight (the leaf of each stack)."""
+    leaves: Counter = Counter()
+    for stack, weight in weights.items():
+        leaves[stack.rsplit(";", 1)[-1]] += weight
+    return [{"frame": frame, "weight": weight} for frame, weight in leaves.most_common(n) if weight > 0]
+
+
+def _top_lines(growth: List[tracemalloc.StatisticDiff], n: int = 15) -> List[Dict[str, Any]]:
+    """Source lines that allocated the most bytes still alive at the end of the session."""
+    lines: Dict[str, List[int]] = {}
+    for stat in growth:
+        if stat.size_diff > 0:
+            entry = lines.setdefault(str(stat.traceback[-1]), [0, 0])
+            entry[0] += stat.size_diff
+            entry[1] += stat.count_diff
+    ranked = sorted(lines.items(), key=lambda item: -item[1][0])[:n]
+    return [{"line": line, "bytes": size, "count": count} for line, (size, count) in ranked]
+
+
+# tracemalloc is process-wide: it runs while any session is open
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def _start_tracemalloc(frames: int) -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc() -> None:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class Profiler:
+    """Decides what to profile and opens profile sessions."""
+
+    def __init__(
+        self,
+        directory: str = "profiles",
+        interval: float = 0.005,
+        tracemalloc_frames: int = 25,
+        token: Optional[str] = None,
+        keep: int = 50,
+    ):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.token = token
+        self._armed = {REQUESTS: 0, PLAN_RUNS: 0}
+        # Thread ids with an open session; nested requests for a profile on the same thread are ignored
+        self._active: Dict[int, ProfileSession] = {}
+        self._recent: List[Dict[str, Any]] = []
+        self._keep = keep
+        self._lock = threading.Lock()
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return self.token is None or token == self.token
+
+    def arm(self, requests: int = 0, plan_runs: int = 0) -> Dict[str, int]:
+        """Profile the next requests / plan runs; returns what is armed now."""
+        with self._lock:
+            self._armed[REQUESTS] += max(0, requests)
+            self._armed[PLAN_RUNS] += max(0, plan_runs)
+            return dict(self._armed)
+
+    def take(self, kind: str) -> bool:
+        """Consume one armed profile of kind, if any."""
+        with self._lock:
+            if self._armed[kind] > 0:
+                self._armed[kind] -= 1
+                return True
+            return False
+
+    def active(self) -> bool:
+        with self._lock:
+            return threading.get_ident() in self._active
+
+    def start(self, kind: str, label: str) -> Optional[ProfileSession]:
+        """Open a session on the calling thread (None if one is already open there)."""
+        session = ProfileSession(self.directory, kind, label, self.interval, self.tracemalloc_frames)
+        with self._lock:
+            if threading.get_ident() in self._active:
+                return None
+            self._active[threading.get_ident()] = session
+        session.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> Optional[Dict[str, Any]]:
+        try:
+            summary = session.stop()
+        except Exception:
+            logger.exception("Writing profile %s failed", session.name)
+            summary = None
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            if summary is not None:
+                self._recent = ([summary] + self._recent)[: self._keep]
+        return summary
+
+    @contextmanager
+    def session(self, kind: str, label: str):
+        session = self.start(kind, label)
+        try:
+            yield session
+        finally:
+            if session is not None:
+                self.stop(session)
+
+    def plan_run(self, label: str, requested: bool = False):
+        """Context manager profiling a plan run when requested or armed (and not inside a profiled request)."""
+        if self.active() or not (requested or self.take(PLAN_RUNS)):
+            return nullcontext()
+        return self.session("plan_run", label)
+
+    def recent(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"armed": dict(self._armed), "directory": str(self.directory), "profiles": list(self._recent)}
+
+
+def create_profiler() -> Optional[Profiler]:
+    """Build the profiler configured from the environment; None unless PORTIA_PROFILING=1."""
+    if os.getenv("PORTIA_PROFILING", "0").lower() not in ("1", "true", "yes", "on"):
+        return None
+    return Profiler(
+        directory=os.getenv("PORTIA_PROFILE_DIR", "profiles"),
+        interval=float(os.getenv("PORTIA_PROFILE_INTERVAL_MS", "5")) / 1000,
+        tracemalloc_frames=int(os.getenv("PORTIA_PROFILE_TRACEMALLOC_FRAMES", "25")),
+        token=os.getenv("PORTIA_PROFILE_TOKEN") or None,
+    )
@@ -0,0 +1,192 @@
+"""Token budgets for the inputs rendered into LLM step prompts.
+
+Plans pass whole upstream outputs into their prompts (a podcast script three
+times, every phase of the master pipeline in the approval gate), so prompt
+size grows with the content. The budgeter sits in front of the model and
+sees every prompt the engine sends. For each LLM step it:
+
+- measures the prompt and each input value rendered into it;
+- shrinks inputs that exceed their cap before the call;
+- records prompt-size metrics per plan and step.
+
+Caps are declared per plan with a ``PromptBudget`` (see ``agents.PROMPT_BUDGETS``),
+per step and input, on top of a global per-input default. Inputs over their
+cap are shrunk by one of three policies:
+
+- ``truncate`` keeps the beginning;
+- ``middle`` keeps the beginning and the end;
+- ``summarize`` condenses the input with the map-reduce summarizer and falls
+  back to ``truncate`` without one.
+
+Input values are located in the rendered prompt by their text, so an input
+the engine renders differently (e.g. reformatted) is measured as part of the
+prompt but left as it is.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.compaction import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TRUNCATE = "truncate"
+MIDDLE = "middle"
+SUMMARIZE = "summarize"
+POLICIES = (TRUNCATE, MIDDLE, SUMMARIZE)
+
+# Values shorter than this are never worth locating in the prompt
+MIN_MATCH_CHARS = 64
+
+
+@dataclass(frozen=True)
+class InputCap:
+    max_tokens: int
+    policy: str = TRUNCATE
+
+    def __post_init__(self):
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown prompt budget policy {self.policy!r}, expected one of {POLICIES}")
+
+
+@dataclass(frozen=True)
+class PromptBudget:
+    """Per-step input caps of a plan: {step: {input name or "*": InputCap}}."""
+
+    steps: Dict[str, Dict[str, InputCap]] = field(default_factory=dict)
+    default: Optional[InputCap] = None
+
+    def cap(self, step: Optional[str], name: str) -> Optional[InputCap]:
+        caps = self.steps.get(step or "", {})
+        return caps.get(name) or caps.get("*") or self.default
+
+
+def renderings(value: Any) -> List[str]:
+    """The ways an input value may appear in a rendered prompt, most likely first."""
+    if isinstance(value, str):
+        return [value]
+    if hasattr(value, "model_dump_json"):
+        candidates = [value.model_dump_json(), value.model_dump_json(indent=2), str(value)]
+    else:
+        candidates = [
+            json.dumps(value, default=str),
+            json.dumps(value, default=str, ensure_ascii=False),
+            json.dumps(value, default=str, indent=2),
+            str(value),
+        ]
+    return list(dict.fromkeys(candidates))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary > max_chars // 2:
+        cut = cut[: boundary + 1]
+    return f"{cut.rstrip()} [… truncated {estimate_tokens(text) - estimate_tokens(cut)} tokens]"
+
+
+def keep_ends(text: str, max_tokens: int) -> str:
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    head, tail = text[: max_chars // 2], text[len(text) - max_chars // 2:]
+    omitted = estimate_tokens(text) - estimate_tokens(head) - estimate_tokens(tail)
+    return f"{head.rstrip()}\n[… {omitted} tokens omitted …]\n{tail.lstrip()}"
+
+
+class PromptBudgeter:
+    """Applies input caps to rendered prompts and aggregates prompt-size metrics."""
+
+    def __init__(
+        self,
+        default: Optional[InputCap] = None,
+        condense: Optional[Callable[[str, int], str]] = None,
+    ):
+        self.default = default
+        # condense(text, max_tokens) for the summarize policy
+        self.condense = condense
+        self._stats: Dict[Tuple[Optional[str], Optional[str]], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def shrink(self, text: str, cap: InputCap) -> str:
+        if estimate_tokens(text) <= cap.max_tokens:
+            return text
+        if cap.policy == SUMMARIZE and self.condense is not None:
+            try:
+                return truncate(self.condense(text, cap.max_tokens), cap.max_tokens)
+            except Exception:
+                logger.exception("Summarizing a prompt input failed, truncating it instead")
+        if cap.policy == MIDDLE:
+            return keep_ends(text, cap.max_tokens)
+        return truncate(text, cap.max_tokens)
+
+    def apply(
+        self,
+        contents: List[str],
+        values: Dict[str, Any],
+        budget: Optional[PromptBudget] = None,
+        plan: Optional[str] = None,
+        step: Optional[str] = None,
+    ) -> Tuple[List[str], Dict[str, Any]]:
+        """(contents with over-budget input values shrunk, prompt-size report)."""
+        budget = budget or PromptBudget()
+        before = sum(estimate_tokens(content) for content in contents)
+        report_inputs: Dict[str, Dict[str, Any]] = {}
+        # Largest values first, so a value that contains another is shrunk as a whole
+        ordered = sorted(values.items(), key=lambda item: -len(renderings(item[1])[0]))
+        for name, value in ordered:
+            cap = budget.cap(step, name) or self.default
+            rendered = next(
+                (text for text in renderings(value) if len(text) >= MIN_MATCH_CHARS and any(text in c for c in contents)),
+                None,
+            )
+            if rendered is None:
+                continue
+            tokens = estimate_tokens(rendered)
+            entry: Dict[str, Any] = {"tokens": tokens}
+            if cap is not None and tokens > cap.max_tokens:
+                shrunk = self.shrink(rendered, cap)
+                contents = [content.replace(rendered, shrunk) for content in contents]
+                entry.update(capped_tokens=estimate_tokens(shrunk), policy=cap.policy)
+            report_inputs[name] = entry
+        after = sum(estimate_tokens(content) for content in contents)
+        report = {"plan": plan, "step": step, "prompt_tokens": before, "budgeted_tokens": after, "inputs": report_inputs}
+        self._record(report)
+        logger.info("Prompt of %s/%s: %d tokens, %d after budget", plan, step, before, after)
+        return contents, report
+
+    def _record(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(
+                (report["plan"], report["step"]),
+                {"calls": 0, "prompt_tokens": 0, "budgeted_tokens": 0, "max_prompt_tokens": 0, "capped_inputs": 0},
+            )
+            stats["calls"] += 1
+            stats["prompt_tokens"] += report["prompt_tokens"]
+            stats["budgeted_tokens"] += report["budgeted_tokens"]
+            stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], report["prompt_tokens"])
+            stats["capped_inputs"] += sum(1 for entry in report["inputs"].values() if "capped_tokens" in entry)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Prompt-size totals per plan and step."""
+        with self._lock:
+            return [
+                {"plan": plan, "step": step, **stats, "avg_prompt_tokens": stats["prompt_tokens"] // stats["calls"]}
+                for (plan, step), stats in self._stats.items()
+            ]
+
+
+def create_prompt_budgeter(condense: Optional[Callable[[str, int], str]] = None) -> Optional[PromptBudgeter]:
+    """Build the budgeter configured from the environment; None when PORTIA_PROMPT_BUDGET=0."""
+    if os.getenv("PORTIA_PROMPT_BUDGET", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    max_tokens = int(os.getenv("PORTIA_PROMPT_INPUT_MAX_TOKENS", "8000"))
+    default = InputCap(max_tokens, os.getenv("PORTIA_PROMPT_INPUT_POLICY", TRUNCATE)) if max_tokens > 0 else None
+    return PromptBudgeter(default=default, condense=condense)
@@ -0,0 +1,131 @@
+"""Encoding, field projection and compression of API responses.
+
+Plan results are returned as structured data and encoded exactly once, with
+orjson when it is installed (falling back to the standard library). Clients
+can ask for part of a response with ``?fields=``, and large bodies are
+gzip-compressed for clients that accept it.
+"""
+
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.core.phases import PATH_PART, pick
+from app.core.serialization import to_jsonable
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _default(value: Any) -> Any:
+    converted = to_jsonable(value)
+    if converted is value:
+        return str(value)
+    return converted
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON encoding of value."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when available."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def parse_fields(fields: str) -> list:
+    return [path.strip() for path in (fields or "").split(",") if path.strip()]
+
+
+def project(body: Any, paths: Iterable[str]) -> Dict[str, Any]:
+    """Keep only the dotted paths of a response body, e.g. ``result.outputs.final_output``.
+
+    A path whose first key is not in the body is looked up under ``result``,
+    so ``outputs.final_output`` selects the plan run's final output. Paths can
+    index lists (``outputs.sources[0].url``); the projected list keeps the
+    item at its index, with None before it. Paths that do not resolve are
+    left out.
+    """
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        first = PATH_PART.match(path)
+        if (
+            isinstance(body, dict)
+            and first is not None
+            and first.group(1) not in body
+            and isinstance(body.get("result"), dict)
+        ):
+            path = f"result.{path}"
+        value = pick(body, path)
+        if value is None:
+            continue
+        # Same path syntax as pick: ``sources[0]`` is item 0 of the sources list
+        keys = [int(index) if index else name for name, index in PATH_PART.findall(path)]
+        target = projected
+        for key, following in zip(keys, keys[1:]):
+            target = _child(target, key, [] if isinstance(following, int) else {})
+        _child(target, keys[-1], None)
+        target[keys[-1]] = value
+    return projected
+
+
+def _child(target, key, default):
+    """target[key], set to default first if missing; lists are padded with None up to key."""
+    if isinstance(target, list):
+        target.extend([None] * (key + 1 - len(target)))
+        if target[key] is None:
+            target[key] = default
+        return target[key]
+    return target.setdefault(key, default)
+
+
+def compress(response, accept_encoding: str, min_bytes: int = 1024, level: int = 5):
+    """gzip a buffered JSON or text response in place when it is large enough."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or "gzip" not in (accept_encoding or "").lower()
+        or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=level))
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def compression_settings() -> Optional[Dict[str, int]]:
+    """compress() keyword arguments from the environment; None when PORTIA_COMPRESS=0."""
+    if os.getenv("PORTIA_COMPRESS", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return {
+        "min_bytes": int(os.getenv("PORTIA_COMPRESS_MIN_BYTES", "1024")),
+        "level": int(os.getenv("PORTIA_COMPRESS_LEVEL", "5")),
+    }
@@ -0,0 +1,162 @@
+"""Per-run state shared between the API layer, the Portia client and its hooks.
+
+A ``RunState`` is bound to the thread that executes a plan. Execution hooks and
+custom tools only see the Portia ``PlanRun``, so the state is also registered
+under the plan run id once Portia has assigned one.
+"""
+
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.events import EventLog
+
+
+class RunCancelled(Exception):
+    """Raised inside a plan run when its job has been cancelled."""
+
+
+@dataclass
+class RunState:
+    job_id: Optional[str] = None
+    run_id: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    events: Optional[EventLog] = None
+    plan: Any = None
+    artifacts: List[Dict[str, Any]] = field(default_factory=list)
+    pending_tool_files: Dict[str, str] = field(default_factory=dict)
+    llm_cache_bypass: bool = False
+    schedule: Any = None
+    # Groups the plan runs of one API request (phases, finalization) for checkpoints
+    root_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # Checkpointed request whose recorded calls are replayed, and the journal of the current plan run
+    replay_root: Optional[str] = None
+    replay: Any = None
+    # Step the engine is executing; calls made for a look-ahead run see theirs as current_step instead
+    engine_step: Optional[str] = None
+    # Caller-supplied lineage: reuse outputs of unchanged steps from its earlier runs of the same plan (opt-in)
+    lineage: Optional[str] = None
+    fingerprints: Dict[str, str] = field(default_factory=dict)
+    step_diff: Optional[List[Dict[str, Any]]] = None
+    call_counts: Dict[Tuple[Optional[str], str], int] = field(default_factory=dict)
+    # Prompt budget of the plan, its input values and finished step outputs, and those the current step references
+    prompt_budget: Any = None
+    values: Dict[str, Any] = field(default_factory=dict)
+    prompt_inputs: Dict[str, Any] = field(default_factory=dict)
+    # perf_counter() start of the current step and of in-flight tool calls, for metrics
+    step_started: Optional[float] = None
+    tool_started: Dict[str, float] = field(default_factory=dict)
+    # Open trace spans of the current step and its tool calls ((span, token) by "step" / tool id)
+    spans: Dict[str, Any] = field(default_factory=dict)
+    attempts: Dict[Tuple[Optional[str], str], int] = field(default_factory=dict)
+    # Profile each plan run of this request or job (X-Profile header)
+    profile: bool = False
+    # Cassette recording or replaying this plan run's tool and LLM calls (PORTIA_CASSETTE_MODE)
+    cassette: Any = None
+
+    def fork(self) -> "RunState":
+        """State for a concurrent sub-run sharing this run's job, event stream and cancellation."""
+        return RunState(
+            job_id=self.job_id,
+            cancel_event=self.cancel_event,
+            events=self.events,
+            llm_cache_bypass=self.llm_cache_bypass,
+            lineage=self.lineage,
+            root_id=self.root_id,
+            replay_root=self.replay_root,
+            profile=self.profile,
+        )
+
+    @property
+    def current_step(self) -> Optional[str]:
+        """Step the calling code works for: the one bound by bind_step, else the engine's."""
+        bound = _bound_step.get()
+        if bound is not None and bound[0] is self:
+            return bound[1]
+        return self.engine_step
+
+    @current_step.setter
+    def current_step(self, step: Optional[str]) -> None:
+        self.engine_step = step
+
+    def enter_step(self, step: Optional[str]) -> None:
+        """Mark the step the engine is about to execute."""
+        with _runs_lock:
+            self.engine_step = step
+
+    def next_call(self, kind: str) -> Tuple[Optional[str], int]:
+        """(step, ordinal) identifying the next `kind` call made in the current step."""
+        with _runs_lock:
+            key = (self.current_step, kind)
+            ordinal = self.call_counts.get(key, 0)
+            self.call_counts[key] = ordinal + 1
+            return self.current_step, ordinal
+
+    def emit(self, event_type: str, **data) -> None:
+        """Publish a progress event if a stream is attached to this run."""
+        if self.events is not None:
+            self.events.publish(event_type, job_id=self.job_id, run_id=self.run_id, **data)
+
+    def check_cancelled(self):
+        """Raise RunCancelled if cancellation was requested for this run."""
+        if self.cancel_event.is_set():
+            raise RunCancelled(f"Run {self.run_id or self.job_id} was cancelled")
+
+
+_current_run: ContextVar[Optional[RunState]] = ContextVar("current_run", default=None)
+# (run, step) of work done outside the engine for a step other than its current one (look-ahead runs)
+_bound_step: ContextVar[Optional[Tuple[RunState, str]]] = ContextVar("bound_step", default=None)
+_runs_by_id: Dict[str, RunState] = {}
+_runs_lock = threading.Lock()
+
+
+def current_run() -> Optional[RunState]:
+    """Return the RunState bound to the calling context, if any."""
+    return _current_run.get()
+
+
+def get_run(run_id) -> Optional[RunState]:
+    """Return the RunState registered for a Portia plan run id."""
+    if run_id is None:
+        return None
+    with _runs_lock:
+        return _runs_by_id.get(str(run_id))
+
+
+def register_run(state: RunState, run_id) -> None:
+    """Associate a RunState with the plan run id Portia assigned to it."""
+    state.run_id = str(run_id)
+    with _runs_lock:
+        _runs_by_id[state.run_id] = state
+
+
+@contextmanager
+def bind_run(state: Optional[RunState] = None):
+    """Bind a RunState to the current context for the duration of a plan run."""
+    state = state or RunState()
+    token = _current_run.set(state)
+    try:
+        yield state
+    finally:
+        _current_run.reset(token)
+        if state.run_id:
+            with _runs_lock:
+                _runs_by_id.pop(state.run_id, None)
+
+
+@contextmanager
+def bind_step(state: Optional[RunState], step: str):
+    """Bind a run to the current context with its calls attributed to step, e.g. in a look-ahead thread."""
+    if state is None:
+        yield None
+        return
+    run_token = _current_run.set(state)
+    step_token = _bound_step.set((state, step))
+    try:
+        yield state
+    finally:
+        _bound_step.reset(step_token)
+        _current_run.reset(run_token)
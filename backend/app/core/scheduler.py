@@ -0,0 +1,303 @@
+"""Step dependency graphs and look-ahead execution of independent tool steps.
+
+Portia executes the steps of a plan one after another, but many of them do not
+depend on each other: the market research plan issues six independent searches
+and crawls before synthesizing them. ``StepGraph`` derives each step's
+dependencies from the ``Input``/``StepOutput`` references in its arguments.
+``StepScheduler`` starts every read-only tool step (search, extract, crawl)
+as soon as the values it references are known, up to a parallelism cap. When
+the engine reaches the step, its tool call (through ``with_lookahead``) takes
+the result of the look-ahead run, or joins it while it is still in flight, so
+a run of independent tool steps takes as long as the slowest of them rather
+than their sum. Steps that a resumed or incremental run replays from
+checkpoints are not run ahead. Calls made by a look-ahead run are attributed
+to its own step (``bind_step``), not to the step the engine is executing.
+
+Only tool steps are run ahead. Independent LLM steps still run one after
+another, in plan order: their prompts are rendered by the engine itself.
+"""
+
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.run_state import bind_step
+from app.core.tool_cache import READ_ONLY_TOOLS, normalize_args
+from app.core.tracing import CLIENT, current_span, payload_size
+
+logger = logging.getLogger(__name__)
+
+# References as rendered into f-strings, e.g. "{{ Input('topic') }}"
+TEMPLATE_REFERENCE = re.compile(
+    r"\{\{\s*(Input|StepOutput)\(\s*(?:'([^']*)'|\"([^\"]*)\"|(\d+))\s*\)\s*\}\}"
+)
+
+# Step fields that never hold references to inputs or other steps
+SKIPPED_FIELDS = {"step_name", "conditional_block", "function", "output_schema", "system_prompt"}
+
+
+class Unresolved(Exception):
+    """A referenced input or step output is not known yet."""
+
+
+def _reference(value) -> Optional[Tuple[str, Any]]:
+    # Builder references are matched by class name: Input(name) / StepOutput(step)
+    kind = type(value).__name__
+    if kind == "Input":
+        return kind, value.name
+    if kind == "StepOutput":
+        return kind, value.step
+    return None
+
+
+def _template_reference(match) -> Tuple[str, Any]:
+    kind, single, double, index = match.groups()
+    if index is not None:
+        return kind, int(index)
+    return kind, single if single is not None else double
+
+
+def find_references(value, found: Optional[Set[Tuple[str, Any]]] = None) -> Set[Tuple[str, Any]]:
+    """All (kind, target) references in a step argument, however deeply nested."""
+    found = set() if found is None else found
+    reference = _reference(value)
+    if reference is not None:
+        found.add(reference)
+    elif isinstance(value, str):
+        found.update(_template_reference(m) for m in TEMPLATE_REFERENCE.finditer(value))
+    elif isinstance(value, dict):
+        for item in value.values():
+            find_references(item, found)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            find_references(item, found)
+    return found
+
+
+@dataclass
+class StepNode:
+    name: str
+    index: int
+    kind: str
+    tool_id: Optional[str] = None
+    args: Optional[Dict[str, Any]] = None
+    inputs: Set[str] = field(default_factory=set)
+    depends_on: Set[str] = field(default_factory=set)
+    conditional: bool = False
+
+
+class StepGraph:
+    """Dependencies between the steps of a PlanBuilderV2 plan."""
+
+    def __init__(self, nodes: List[StepNode]):
+        self.nodes = nodes
+        self.names = [node.name for node in nodes]
+
+    @classmethod
+    def from_plan(cls, plan) -> "StepGraph":
+        steps = list(getattr(plan, "steps", None) or [])
+        names = [getattr(step, "step_name", None) or f"step_{i}" for i, step in enumerate(steps)]
+        nodes = []
+        for index, step in enumerate(steps):
+            references = set()
+            for name, value in vars(step).items():
+                if name not in SKIPPED_FIELDS:
+                    find_references(value, references)
+            depends_on = set()
+            for kind, target in references:
+                if kind == "StepOutput":
+                    target = names[target] if isinstance(target, int) and 0 <= target < len(names) else target
+                    if target in names[:index]:
+                        depends_on.add(target)
+            tool = getattr(step, "tool", None)
+            args = getattr(step, "args", None)
+            nodes.append(StepNode(
+                name=names[index],
+                index=index,
+                kind=type(step).__name__,
+                tool_id=(tool if isinstance(tool, str) else getattr(tool, "id", None)) if isinstance(args, dict) else None,
+                args=args if isinstance(args, dict) else None,
+                inputs={target for kind, target in references if kind == "Input"},
+                depends_on=depends_on,
+                conditional=getattr(step, "conditional_block", None) is not None,
+            ))
+        return cls(nodes)
+
+    def levels(self) -> List[List[str]]:
+        """Steps grouped by depth; steps in the same level are independent of each other."""
+        depth: Dict[str, int] = {}
+        for node in self.nodes:
+            # Steps can only reference earlier steps, so plan order is a topological order
+            depth[node.name] = 1 + max((depth[d] for d in node.depends_on), default=-1)
+        levels: List[List[str]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for node in self.nodes:
+            levels[depth[node.name]].append(node.name)
+        return levels
+
+    def ready(self, done: Set[str]) -> List[StepNode]:
+        """Steps not yet done whose dependencies all are."""
+        return [node for node in self.nodes if node.name not in done and node.depends_on <= done]
+
+    def resolve(self, value, inputs: Dict[str, Any], outputs: Dict[str, Any]):
+        """Substitute known input and step output values into a step argument."""
+        reference = _reference(value)
+        if reference is not None:
+            if getattr(value, "path", None):
+                raise Unresolved(str(value))
+            return self._lookup(reference, inputs, outputs)
+        if isinstance(value, str):
+            return TEMPLATE_REFERENCE.sub(
+                lambda m: str(self._lookup(_template_reference(m), inputs, outputs)), value
+            )
+        if isinstance(value, dict):
+            return {key: self.resolve(item, inputs, outputs) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.resolve(item, inputs, outputs) for item in value]
+        return value
+
+    def _lookup(self, reference, inputs, outputs):
+        kind, target = reference
+        if kind == "Input":
+            if target not in inputs:
+                raise Unresolved(target)
+            return inputs[target]
+        if isinstance(target, int) and 0 <= target < len(self.names):
+            target = self.names[target]
+        if target not in outputs:
+            raise Unresolved(target)
+        return outputs[target]
+
+
+class PlanSchedule:
+    """Look-ahead state of a single plan run."""
+
+    def __init__(
+        self,
+        scheduler: "StepScheduler",
+        graph: StepGraph,
+        inputs: Dict[str, Any],
+        ctx,
+        skip: Set[str] = frozenset(),
+        state=None,
+    ):
+        self.scheduler = scheduler
+        self.graph = graph
+        self.inputs = inputs
+        self.ctx = ctx
+        # RunState the look-ahead calls belong to, and the span they are traced under (the plan run's)
+        self.state = state
+        self.span = current_span()
+        # Steps the engine will not really run (replayed from checkpoints)
+        self.skip = set(skip)
+        self.outputs: Dict[str, Any] = {}
+        self.prefetched: List[str] = []
+        # step name -> (tool id, args, future) of its look-ahead run
+        self._runs: Dict[str, Tuple[str, Any, Future]] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def step_finished(self, name: str, value: Any) -> None:
+        """Record a step output from the engine and start steps it unblocked."""
+        with self._lock:
+            self.outputs[name] = value
+        self.submit_ready()
+
+    def submit_ready(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            for node in self.graph.ready(set(self.outputs)):
+                if node.name in self.prefetched or node.name in self.skip or not self.scheduler.prefetchable(node):
+                    continue
+                try:
+                    args = self.graph.resolve(node.args, self.inputs, self.outputs)
+                except Unresolved:
+                    continue
+                self.prefetched.append(node.name)
+                future = self.scheduler.submit(self._prefetch, node, args)
+                self._runs[node.name] = (node.tool_id, normalize_args(args), future)
+
+    def run(self, step: Optional[str], tool_id: str, args: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        """Result of the engine's call: the step's look-ahead run if it had the same arguments, else compute()."""
+        with self._lock:
+            prefetched = self._runs.pop(step, None) if step is not None else None
+        if prefetched is not None and prefetched[:2] == (tool_id, normalize_args(args)):
+            try:
+                return prefetched[2].result()
+            except Exception:
+                # Already logged by _prefetch; the engine's own call reports the error
+                pass
+        return compute()
+
+    def close(self) -> None:
+        """Drop look-ahead work that has not started; the run is over."""
+        with self._lock:
+            self._closed = True
+            for _, _, future in self._runs.values():
+                future.cancel()
+            self._runs.clear()
+
+    def _prefetch(self, node: StepNode, args: Dict[str, Any]) -> Any:
+        tracer = self.scheduler.tracer
+        with bind_step(self.state, node.name):
+            span = None
+            if tracer is not None:
+                span = tracer.start(
+                    "lookahead_call", CLIENT, parent=self.span, tool_id=node.tool_id, step=node.name,
+                    args_bytes=payload_size(args),
+                )
+            try:
+                result = self.scheduler.tool_registry.get_tool(node.tool_id).run(self.ctx, **args)
+            except Exception as e:
+                logger.warning("Look-ahead run of step %s failed", node.name, exc_info=True)
+                if span is not None:
+                    tracer.end(*span, error=e)
+                raise
+            if span is not None:
+                span[0].set(output_bytes=payload_size(result))
+                tracer.end(*span)
+            return result
+
+
+class StepScheduler:
+    """Runs read-only tool steps ahead of the engine as their inputs become known."""
+
+    def __init__(self, tool_registry, max_parallel: int = 4, read_only: Set[str] = READ_ONLY_TOOLS, tracer=None):
+        self.tool_registry = tool_registry
+        self.max_parallel = max_parallel
+        self.read_only = set(read_only)
+        self.tracer = tracer
+        self._pool = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="step-lookahead")
+
+    def prefetchable(self, node: StepNode) -> bool:
+        # Running a step early, or twice when its arguments turn out different, must be harmless
+        return node.tool_id is not None and not node.conditional and node.tool_id in self.read_only
+
+    def start(
+        self,
+        plan,
+        inputs: Dict[str, Any],
+        ctx,
+        graph: Optional[StepGraph] = None,
+        skip: Set[str] = frozenset(),
+        state=None,
+    ) -> PlanSchedule:
+        """Look-ahead for one plan run of state; steps in skip are left to the engine."""
+        schedule = PlanSchedule(self, graph or StepGraph.from_plan(plan), inputs, ctx, skip, state)
+        schedule.submit_ready()
+        return schedule
+
+    def submit(self, fn, *args):
+        return self._pool.submit(fn, *args)
+
+
+def create_step_scheduler(tool_registry, tracer=None) -> Optional[StepScheduler]:
+    """Scheduler with PORTIA_STEP_PARALLELISM workers (0 disables)."""
+    parallelism = int(os.getenv("PORTIA_STEP_PARALLELISM", "4"))
+    if parallelism <= 0:
+        return None
+    return StepScheduler(tool_registry, parallelism, tracer=tracer)
@@ -0,0 +1,44 @@
+"""Helpers for turning plan outputs into JSON-compatible values, and stable encodings for hashing them."""
+
+import hashlib
+import json
+from typing import Any
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert step outputs (pydantic models, Portia Output objects, ...) to JSON-compatible data."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def output_value(output: Any) -> Any:
+    """Return the plain value held by a Portia Output (or the object itself)."""
+    if hasattr(output, "get_value"):
+        return output.get_value()
+    return getattr(output, "value", output)
+
+
+def stable_repr(value: Any) -> str:
+    """JSON fallback for fingerprints and plan hashes, stable across processes (no object addresses)."""
+    code = getattr(value, "__code__", None)
+    if code is not None:
+        return f"{value.__module__}.{value.__qualname__}:{hashlib.sha256(code.co_code).hexdigest()[:16]}"
+    if isinstance(value, type):
+        name = f"{value.__module__}.{value.__qualname__}"
+        if hasattr(value, "model_json_schema"):
+            # Output schemas: a changed field changes the fingerprint, not just a renamed class
+            schema = json.dumps(value.model_json_schema(), sort_keys=True, default=str)
+            return f"{name}:{hashlib.sha256(schema.encode('utf-8')).hexdigest()[:16]}"
+        return name
+    return str(value)
@@ -0,0 +1,85 @@
+"""GenerativeModel answered by the offline simulator (PORTIA_SIMULATE=1, see app/core/simulation.py)."""
+
+import asyncio
+import uuid
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from portia.config import LLMProvider
+from portia.model import GenerativeModel, Message
+from pydantic import BaseModel
+
+from app.core.simulation import Simulator
+
+
+def _prompt(messages) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+
+def _tool_spec(tool: Any) -> Tuple[str, Optional[type]]:
+    """Name and argument schema of a tool bound to the chat model."""
+    if isinstance(tool, type) and issubclass(tool, BaseModel):
+        return tool.__name__, tool
+    if isinstance(tool, dict):
+        function = tool.get("function", tool)
+        return function.get("name", "tool"), None
+    schema = getattr(tool, "args_schema", None)
+    return tool.name, schema if isinstance(schema, type) and issubclass(schema, BaseModel) else None
+
+
+class SimulatedChatModel(BaseChatModel):
+    """LangChain side of the simulated model, for the engine's tool-calling agents.
+
+    With tools bound, it calls the first one with arguments synthesized from its
+    schema. Once a tool result is in the conversation, it answers in text.
+    """
+
+    simulator: Any
+    tools: List[Any] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "portia-simulated"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools": list(tools)})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = _prompt(messages)
+        if self.tools and not (messages and isinstance(messages[-1], ToolMessage)):
+            name, schema = _tool_spec(self.tools[0])
+            args = self.simulator.structured(prompt, schema) if schema is not None else {}
+            message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}])
+        else:
+            message = AIMessage(content=self.simulator.completion(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class SimulatedGenerativeModel(GenerativeModel):
+    """Text and structured responses drawn from the simulator, with its latency and failure profile."""
+
+    provider: LLMProvider = LLMProvider.CUSTOM
+
+    def __init__(self, simulator: Simulator, model_name: str = "simulated"):
+        super().__init__(model_name=model_name)
+        self.simulator = simulator
+
+    def get_response(self, messages: list[Message]) -> Message:
+        return Message(role="assistant", content=self.simulator.completion(_prompt(messages)))
+
+    def get_structured_response(self, messages: list[Message], schema):
+        return schema.model_validate(self.simulator.structured(_prompt(messages), schema))
+
+    async def aget_response(self, messages: list[Message]) -> Message:
+        return await asyncio.to_thread(self.get_response, messages)
+
+    async def aget_structured_response(self, messages: list[Message], schema):
+        return await asyncio.to_thread(self.get_structured_response, messages, schema)
+
+    def to_langchain(self):
+        return SimulatedChatModel(simulator=self.simulator)
+
+    def __str__(self) -> str:
+        return f"simulated/{self.model_name}"
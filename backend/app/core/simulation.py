@@ -0,0 +1,389 @@
+"""Offline simulation of the LLM and the remote tools, for load tests and benchmarks.
+
+With PORTIA_SIMULATE=1, PortiaClient swaps the model and the remote tools
+for simulated ones. That covers Tavily search/crawl/extract, ElevenLabs TTS,
+the InVideo, Notion and Apify MCP tools, and the LLM. Local tools (file
+writer, directories) still run for real, so plans run end to end without
+network access or API keys and write their usual files.
+
+Every simulated call draws from per-tool profiles:
+
+- ``latency_ms``: how long the call takes;
+- ``size_bytes``: how much text it returns (tool payloads, LLM responses and
+  the strings of structured LLM outputs);
+- ``failure_rate``: the probability that the call raises ``SimulatedFailure``.
+
+Distributions are written as ``"lognormal:<median>,<sigma>"``,
+``"normal:<mean>,<sd>"``, ``"uniform:<low>,<high>"``,
+``"exponential:<mean>"`` or a plain number. The built-in profiles
+(``DEFAULT_PROFILES``) can be overridden by a JSON file (PORTIA_SIM_CONFIG)
+shaped like ``{"seed": 1, "latency_scale": 0.1, "default": {...},
+"tools": {"search_tool": {...}, "mcp": {...}}, "llm": {...}}``. The ``mcp``
+profile applies to every MCP tool without one of its own.
+
+Draws are seeded by PORTIA_SIM_SEED, the tool, its arguments and how often
+those arguments were seen before. The same plan run with the same seed
+therefore gets the same latencies, payloads and failures, however its
+steps interleave. PORTIA_SIM_LATENCY_SCALE (default 0.1) multiplies every
+latency, so that plans finish in seconds; 1 reproduces the profiled timings
+and 0 removes them. PORTIA_SIM_FAILURE_RATE overrides every failure rate.
+"""
+
+import enum
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+import types
+import typing
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+MCP_PREFIX = "portia:mcp:"
+LLM = "llm"
+
+WORDS = tuple(
+    "adoption analysis audience benchmark brand campaign clinical content conversion customer data demand "
+    "diagnosis digital engagement evidence growth health impact insight industry launch market measure "
+    "model network outcome patient platform policy practice product quality reach report research revenue "
+    "risk scale segment signal strategy study survey system team technology trend trust value video workflow".split()
+)
+
+
+class SimulatedFailure(RuntimeError):
+    """Raised by a simulated call chosen for failure injection."""
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """A non-negative random quantity: fixed, uniform, normal, lognormal or exponential."""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: Any) -> "Distribution":
+        if isinstance(spec, Distribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("fixed", float(spec))
+        kind, _, params = str(spec).partition(":")
+        if not params:
+            return cls("fixed", float(kind))
+        values = [float(value) for value in params.split(",")]
+        if kind not in ("fixed", "uniform", "normal", "lognormal", "exponential"):
+            raise ValueError(f"Unknown distribution {kind!r}")
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            value = rng.gauss(self.a, self.b)
+        elif self.kind == "lognormal":
+            value = self.a * math.exp(rng.gauss(0.0, self.b))
+        elif self.kind == "exponential":
+            value = rng.expovariate(1.0 / self.a) if self.a > 0 else 0.0
+        else:
+            value = self.a
+        return max(0.0, value)
+
+
+@dataclass(frozen=True)
+class CallProfile:
+    latency_ms: Distribution = Distribution("lognormal", 300, 0.5)
+    size_bytes: Distribution = Distribution("lognormal", 3000, 0.6)
+    failure_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: Dict[str, Any], base: Optional["CallProfile"] = None) -> "CallProfile":
+        base = base or cls()
+        return cls(
+            latency_ms=Distribution.parse(spec["latency_ms"]) if "latency_ms" in spec else base.latency_ms,
+            size_bytes=Distribution.parse(spec["size_bytes"]) if "size_bytes" in spec else base.size_bytes,
+            failure_rate=float(spec.get("failure_rate", base.failure_rate)),
+        )
+
+
+def _profile(latency: str, size: str) -> CallProfile:
+    return CallProfile(Distribution.parse(latency), Distribution.parse(size))
+
+
+# Rough shapes of the real services
+DEFAULT_PROFILES: Dict[str, CallProfile] = {
+    "search_tool": _profile("lognormal:900,0.4", "lognormal:6000,0.5"),
+    "crawl_tool": _profile("lognormal:6000,0.5", "lognormal:40000,0.7"),
+    "extract_tool": _profile("lognormal:2500,0.5", "lognormal:20000,0.7"),
+    "elevenlabs_tts_tool": _profile("lognormal:8000,0.4", "lognormal:400000,0.3"),
+    "mcp": _profile("lognormal:3000,0.6", "lognormal:2000,0.5"),
+    "portia:mcp:mcp.invideo.io:generate_video_from_script": _profile("lognormal:20000,0.4", "fixed:300"),
+    LLM: _profile("lognormal:4000,0.6", "lognormal:3000,0.6"),
+}
+
+
+@dataclass
+class SimulationConfig:
+    seed: int = 0
+    latency_scale: float = 0.1
+    default: CallProfile = field(default_factory=CallProfile)
+    profiles: Dict[str, CallProfile] = field(default_factory=lambda: dict(DEFAULT_PROFILES))
+    failure_rate: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base: Optional["SimulationConfig"] = None) -> "SimulationConfig":
+        config = base or cls()
+        default = CallProfile.parse(data.get("default", {}), config.default)
+        profiles = dict(config.profiles)
+        for name, spec in (data.get("tools") or {}).items():
+            profiles[name] = CallProfile.parse(spec, profiles.get(name, default))
+        if "llm" in data:
+            profiles[LLM] = CallProfile.parse(data["llm"], profiles.get(LLM, default))
+        return cls(
+            seed=int(data.get("seed", config.seed)),
+            latency_scale=float(data.get("latency_scale", config.latency_scale)),
+            default=default,
+            profiles=profiles,
+            failure_rate=data.get("failure_rate", config.failure_rate),
+        )
+
+
+# --- Payloads ---
+
+def _words(rng: random.Random, count: int, topic: List[str]) -> List[str]:
+    vocabulary = WORDS + tuple(topic) * 3
+    return [rng.choice(vocabulary) for _ in range(count)]
+
+
+def text(rng: random.Random, size: int, topic: Optional[List[str]] = None) -> str:
+    """About size bytes of sentences, mixing in the topic's words."""
+    sentences = []
+    length = 0
+    while length < size:
+        words = _words(rng, rng.randint(8, 18), topic or [])
+        sentence = " ".join(words).capitalize() + (" " + str(rng.randint(2, 98)) + "%." if rng.random() < 0.2 else ".")
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)[: max(size, 1)]
+
+
+def topic_words(value: Any) -> List[str]:
+    """Words of a query, URL or prompt worth echoing in generated text."""
+    raw = json.dumps(value, default=str) if not isinstance(value, str) else value
+    words = [word.strip(".,:;!?\"'()[]{}").lower() for word in raw.replace("/", " ").replace("_", " ").split()]
+    return [word for word in words if word.isalpha() and len(word) > 3][:12]
+
+
+def _slug(words: List[str], rng: random.Random) -> str:
+    return "-".join(words[:4] or [rng.choice(WORDS)]) + f"-{rng.randint(100, 999)}"
+
+
+def _url(rng: random.Random, words: List[str]) -> str:
+    domain = rng.choice(("healthitnews.com", "medicalfuturist.com", "example.org", "insights.example.com"))
+    return f"https://{domain}/{_slug(words, rng)}"
+
+
+def _mcp_text(payload: Any) -> Dict[str, Any]:
+    return {"content": [{"type": "text", "text": payload if isinstance(payload, str) else json.dumps(payload)}]}
+
+
+def tool_output(tool_id: str, args: Dict[str, Any], rng: random.Random, size: int) -> Any:
+    """A payload shaped like the real tool's output, about size bytes long."""
+    words = topic_words(args)
+    if tool_id == "search_tool":
+        count = max(3, min(10, size // 1500))
+        return {
+            "query": args.get("search_query", ""),
+            "results": [
+                {
+                    "title": " ".join(_words(rng, 6, words)).title(),
+                    "url": _url(rng, words),
+                    "content": text(rng, size // count, words),
+                    "score": round(rng.uniform(0.4, 0.99), 3),
+                }
+                for _ in range(count)
+            ],
+        }
+    if tool_id in ("crawl_tool", "extract_tool"):
+        urls = args.get("urls") if tool_id == "extract_tool" else args.get("url")
+        urls = [urls] if isinstance(urls, str) else list(urls or [])
+        if tool_id == "crawl_tool":
+            base = urls[0] if urls else _url(rng, words)
+            urls = [f"{base.rstrip('/')}/{_slug(_words(rng, 3, words), rng)}" for _ in range(max(2, min(8, size // 5000)))]
+        urls = urls or [_url(rng, words)]
+        return {
+            "results": [{"url": url, "raw_content": text(rng, size // len(urls), words)} for url in urls],
+            "failed_results": [],
+        }
+    if tool_id.endswith("generate_video_from_script"):
+        return _mcp_text(f"Your video is being generated: https://ai.invideo.io/watch/{rng.getrandbits(64):016x}")
+    if tool_id.endswith("notion_create_pages"):
+        page = f"{rng.getrandbits(128):032x}"
+        return _mcp_text({"pages": [{"id": page, "url": f"https://www.notion.so/{page}"}]})
+    if tool_id.startswith(MCP_PREFIX):
+        count = max(1, min(5, size // 1500))
+        return _mcp_text([
+            {"url": _url(rng, words), "title": " ".join(_words(rng, 6, words)).title(), "snippet": text(rng, size // count, words)}
+            for _ in range(count)
+        ])
+    return text(rng, size, words)
+
+
+def synthesize(annotation: Any, rng: random.Random, size: int = 2000, words: Optional[List[str]] = None, name: str = "", depth: int = 0) -> Any:
+    """JSON data that validates as annotation (a pydantic model or a typing annotation).
+
+    Strings share the size budget, so larger sizes give longer texts.
+    """
+    words = words or []
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        fields = annotation.model_fields
+        share = max(40, size // max(1, len(fields)))
+        return {
+            field_name: synthesize(info.annotation, rng, share, words, field_name, depth + 1)
+            for field_name, info in fields.items()
+            if info.is_required() or rng.random() < 0.7
+        }
+    if origin in (typing.Union, types.UnionType):
+        options = [arg for arg in args if arg is not type(None)]
+        return synthesize(options[0], rng, size, words, name, depth) if options else None
+    if origin is typing.Literal:
+        return rng.choice(args)
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return rng.choice(list(annotation)).value
+    if origin in (list, set, tuple, frozenset) or annotation in (list, List):
+        count = rng.randint(2, 5) if depth < 4 else 1
+        item = args[0] if args else str
+        return [synthesize(item, rng, size // count, words, name, depth + 1) for _ in range(count)]
+    if origin is dict or annotation in (dict, Dict):
+        value = args[1] if len(args) == 2 else str
+        count = rng.randint(2, 4) if depth < 4 else 1
+        return {
+            f"{rng.choice(WORDS)}_{n}": synthesize(value, rng, size // count, words, name, depth + 1) for n in range(count)
+        }
+    if annotation is bool:
+        return rng.random() < 0.5
+    if annotation is int:
+        return rng.randint(1, 100)
+    if annotation is float:
+        return round(rng.uniform(0, 100), 2)
+    if annotation is datetime:
+        return datetime(2025, 1, 1 + rng.randint(0, 27), rng.randint(0, 23)).isoformat()
+    if "url" in name.lower():
+        return _url(rng, words)
+    if name.lower().endswith(("path", "file")):
+        return f"output/{_slug(words, rng)}.txt"
+    return text(rng, max(20, size), words)
+
+
+# --- Simulator ---
+
+class Simulator:
+    """Draws seeded latencies, payload sizes and failures for simulated calls."""
+
+    def __init__(self, config: Optional[SimulationConfig] = None, sleep: Callable[[float], None] = time.sleep):
+        self.config = config or SimulationConfig()
+        self._sleep = sleep
+        self._seen: Dict[str, int] = {}
+        self.counters = {"calls": 0, "failures": 0, "simulated_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def profile(self, name: str) -> CallProfile:
+        profiles = self.config.profiles
+        if name in profiles:
+            return profiles[name]
+        if name.startswith(MCP_PREFIX) and "mcp" in profiles:
+            return profiles["mcp"]
+        return self.config.default
+
+    def _rng(self, name: str, key: Any) -> random.Random:
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        with self._lock:
+            ordinal = self._seen.get(f"{name}:{digest}", 0)
+            self._seen[f"{name}:{digest}"] = ordinal + 1
+        return random.Random(f"{self.config.seed}:{name}:{digest}:{ordinal}")
+
+    def call(self, name: str, key: Any, produce: Callable[[random.Random, int], Any]) -> Any:
+        """Wait out a simulated call to name, then return produce(rng, size) or raise SimulatedFailure."""
+        rng = self._rng(name, key)
+        profile = self.profile(name)
+        latency = profile.latency_ms.sample(rng) / 1000 * self.config.latency_scale
+        size = max(1, int(profile.size_bytes.sample(rng)))
+        rate = self.config.failure_rate if self.config.failure_rate is not None else profile.failure_rate
+        failed = rng.random() < float(rate)
+        if latency > 0:
+            self._sleep(latency)
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["failures"] += failed
+            self.counters["simulated_seconds"] += latency
+        if failed:
+            raise SimulatedFailure(f"Simulated failure of {name}")
+        return produce(rng, size)
+
+    def tool(self, tool_id: str, args: Dict[str, Any]) -> Any:
+        return self.call(tool_id, args, lambda rng, size: tool_output(tool_id, args, rng, size))
+
+    def completion(self, prompt: str) -> str:
+        return self.call(LLM, prompt, lambda rng, size: text(rng, size, topic_words(prompt[-2000:])))
+
+    def structured(self, prompt: str, schema: Any) -> Any:
+        key = {"prompt": prompt, "schema": getattr(schema, "__name__", str(schema))}
+        return self.call(LLM, key, lambda rng, size: synthesize(schema, rng, size, topic_words(prompt[-2000:])))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, simulated_seconds=round(self.counters["simulated_seconds"], 3))
+
+
+def create_simulator() -> Optional[Simulator]:
+    """Build the simulator configured from the environment; None unless PORTIA_SIMULATE=1.
+
+    Cassette replays (PORTIA_CASSETTE_MODE=replay) also get one, without
+    latency, to answer calls the cassette did not record.
+    """
+    simulate = os.getenv("PORTIA_SIMULATE", "0").lower() in ("1", "true", "yes", "on")
+    replay = os.getenv("PORTIA_CASSETTE_MODE", "").lower() == "replay"
+    if not simulate and not replay:
+        return None
+    config = SimulationConfig()
+    path = os.getenv("PORTIA_SIM_CONFIG")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config = SimulationConfig.from_dict(json.load(f))
+    if not simulate:
+        config.latency_scale = 0.0
+    if os.getenv("PORTIA_SIM_SEED"):
+        config.seed = int(os.environ["PORTIA_SIM_SEED"])
+    if os.getenv("PORTIA_SIM_LATENCY_SCALE"):
+        config.latency_scale = float(os.environ["PORTIA_SIM_LATENCY_SCALE"])
+    if os.getenv("PORTIA_SIM_FAILURE_RATE"):
+        config.failure_rate = float(os.environ["PORTIA_SIM_FAILURE_RATE"])
+    return Simulator(config)
+
+
+@lru_cache(maxsize=None)
+def get_simulator() -> Optional[Simulator]:
+    """The process-wide simulator shared by the simulated model and tools (None when off)."""
+    return create_simulator()
+
+
+def simulated_path(path: str) -> str:
+    """Where state that runs write for later runs (caches, checkpoints) lives.
+
+    With the simulator on, that is a ``simulated`` directory next to the
+    configured path. Simulated search results and completions then never
+    answer, or get reused by, runs against the real services.
+    """
+    if get_simulator() is None:
+        return path
+    head, tail = os.path.split(os.path.normpath(path))
+    return os.path.join(head, "simulated", tail)
@@ -0,0 +1,138 @@
+"""Result cache for deterministic, network-bound tools (search, extract, crawl).
+
+Entries are keyed on the tool id plus normalized call arguments. Each tool has
+a TTL during which cached results are served as-is, followed by a
+stale-while-revalidate window in which the stale result is returned
+immediately and refreshed in the background. Concurrent misses for the same
+key share a single computation.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.coalesce import SingleFlight
+from app.core.disk_cache import DiskCache
+from app.core.simulation import simulated_path
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+# tool id -> (ttl seconds, stale-while-revalidate seconds)
+DEFAULT_TOOL_TTLS: Dict[str, Tuple[float, float]] = {
+    "search_tool": (6 * HOUR, 24 * HOUR),
+    "extract_tool": (24 * HOUR, 72 * HOUR),
+    "crawl_tool": (24 * HOUR, 72 * HOUR),
+}
+
+# Tools without side effects: safe to cache, replay or run ahead of the engine
+READ_ONLY_TOOLS = frozenset(DEFAULT_TOOL_TTLS)
+
+
+def normalize_args(value: Any) -> Any:
+    """Canonical form of tool arguments: sorted keys, collapsed whitespace."""
+    if isinstance(value, dict):
+        return {str(k): normalize_args(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalize_args(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def cache_key(namespace: str, payload: Any) -> str:
+    canonical = json.dumps(normalize_args(payload), sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(f"{namespace}\x00{canonical}".encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """Per-tool TTL cache with stale-while-revalidate over a DiskCache."""
+
+    def __init__(self, store: DiskCache, ttls: Optional[Dict[str, Tuple[float, float]]] = None, refresh_workers: int = 2):
+        self.store = store
+        self.ttls = dict(DEFAULT_TOOL_TTLS if ttls is None else ttls)
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "joined": 0, "refreshes": 0, "errors": 0}
+        self._refreshing = set()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="tool-cache-refresh")
+
+    def caches(self, tool_id: str) -> bool:
+        return tool_id in self.ttls
+
+    def fetch(self, tool_id: str, args: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        """Return the cached result for (tool_id, args), computing it on a miss."""
+        ttl, swr = self.ttls[tool_id]
+        key = cache_key(tool_id, args)
+        entry = self.store.get(key)
+        if entry is not None and entry.age <= ttl:
+            self._count("hits")
+            return entry.value
+        if entry is not None and entry.age <= ttl + swr:
+            self._count("stale_hits")
+            self._schedule_refresh(key, compute)
+            return entry.value
+        return self._compute_once(key, compute)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, **self.store.stats()}
+
+    def _compute_once(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Compute a missing entry, or wait for the caller already computing it."""
+        def compute_and_store():
+            value = compute()
+            self._store(key, value)
+            return value
+
+        value, shared = self._flights.do(key, compute_and_store)
+        self._count("joined" if shared else "misses")
+        return value
+
+    def _store(self, key: str, value: Any) -> None:
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            # Only plain JSON results are cacheable
+            return
+        self.store.set(key, value)
+
+    def _schedule_refresh(self, key: str, compute: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, compute())
+                self._count("refreshes")
+            except Exception:
+                self._count("errors")
+                logger.exception("Background refresh of cached tool result failed")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_pool.submit(refresh)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+
+def create_tool_result_cache() -> Optional[ToolResultCache]:
+    """Build the tool cache configured from the environment (None when disabled)."""
+    if os.getenv("PORTIA_TOOL_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    store = DiskCache(
+        simulated_path(os.getenv("PORTIA_TOOL_CACHE_DIR", "cache/tools")),
+        max_bytes=int(os.getenv("PORTIA_TOOL_CACHE_MAX_MB", "512")) * 1024 * 1024,
+    )
+    return ToolResultCache(store)
@@ -0,0 +1,110 @@
+"""On-disk snapshot of tool metadata, for fast warm boots.
+
+Building the full tool registry means importing every tool module and asking
+Portia cloud for its tools, including the remote MCP servers. The snapshot
+records, per registry source, the id, description and argument schema of
+each tool the last time that source was loaded. A warm process can then list
+tools and route a tool id to the one source that provides it without loading
+the others.
+
+Entries expire after a TTL and are ignored when the configuration they were
+built under (API key, endpoint) changes.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.tool_cache import cache_key
+
+
+def tool_metadata(tool) -> Dict[str, Any]:
+    """JSON-safe description of a Portia tool."""
+    try:
+        args = tool.args_schema.model_json_schema()
+    except Exception:
+        args = None
+    output = getattr(tool, "output_schema", None)
+    return {
+        "id": tool.id,
+        "name": tool.name,
+        "description": tool.description,
+        "args_schema": args,
+        "output_schema": list(output) if output else None,
+    }
+
+
+class ToolSnapshot:
+    """JSON file of {source: {"loaded_at", "config", "tools": [metadata]}}."""
+
+    def __init__(self, path: str = "cache/tool_metadata.json", ttl_seconds: float = 24 * 3600, config: Any = None):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.config = cache_key("tool-snapshot", config)
+        self._lock = threading.Lock()
+        self._sources: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if self._sources is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            self._sources = data if isinstance(data, dict) else {}
+        return self._sources
+
+    def _fresh(self, entry: Dict[str, Any]) -> bool:
+        return entry.get("config") == self.config and time.time() - entry.get("loaded_at", 0) < self.ttl_seconds
+
+    def source(self, name: str) -> Optional[List[Dict[str, Any]]]:
+        """Snapshotted tools of a source, or None if missing or stale."""
+        with self._lock:
+            entry = self._read().get(name)
+        return entry["tools"] if entry and self._fresh(entry) else None
+
+    def owner(self, tool_id: str) -> Optional[str]:
+        """Name of the source that provided tool_id when last loaded."""
+        with self._lock:
+            sources = dict(self._read())
+        for name, entry in sources.items():
+            if self._fresh(entry) and any(tool["id"] == tool_id for tool in entry["tools"]):
+                return name
+        return None
+
+    def tools(self, sources: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Snapshotted tools of all the given sources, or None if any is missing or stale."""
+        tools = []
+        for name in sources:
+            entry = self.source(name)
+            if entry is None:
+                return None
+            tools.extend(entry)
+        return tools
+
+    def save(self, name: str, tools: List[Dict[str, Any]]) -> None:
+        """Record the tools of a freshly loaded source."""
+        with self._lock:
+            sources = self._read()
+            sources[name] = {"loaded_at": time.time(), "config": self.config, "tools": tools}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(sources, default=str), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def create_tool_snapshot() -> Optional[ToolSnapshot]:
+    """Snapshot configured from the environment (PORTIA_TOOL_SNAPSHOT=0 disables it)."""
+    if os.getenv("PORTIA_TOOL_SNAPSHOT", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return ToolSnapshot(
+        os.getenv("PORTIA_TOOL_SNAPSHOT_PATH", "cache/tool_metadata.json"),
+        ttl_seconds=float(os.getenv("PORTIA_TOOL_SNAPSHOT_TTL", str(24 * 3600))),
+        # Tools listed by Portia cloud depend on the account and endpoint
+        config={
+            "portia_api_key": cache_key("key", os.getenv("PORTIA_API_KEY", "")),
+            "portia_api_endpoint": os.getenv("PORTIA_API_ENDPOINT", ""),
+        },
+    )
@@ -0,0 +1,392 @@
+"""Trace spans for API requests, plan runs, phases, steps and tool/LLM calls.
+
+A span records a named interval with attributes and a parent:
+
+    HTTP request → job → phase → plan run → step → tool call / LLM call
+
+Spans are kept in a context variable, so nested ``tracer.span(...)`` blocks
+form the tree on their own. Work handed to thread pools is wrapped with
+``in_context`` to stay in the trace. Incoming W3C ``traceparent`` headers
+continue the caller's trace, and responses carry the trace id.
+
+Finished spans are exported in batches from a background thread, to either:
+
+- a JSON-lines file (``PORTIA_TRACE_EXPORTER=file``, ``PORTIA_TRACE_FILE``,
+  default ``traces/spans.jsonl``), or
+- a local OpenTelemetry collector over OTLP/HTTP JSON
+  (``PORTIA_TRACE_EXPORTER=otlp``, ``PORTIA_OTLP_ENDPOINT``, default
+  ``http://localhost:4318/v1/traces``).
+
+The most recent traces are also kept in memory. ``waterfall`` lays out one
+of them, and ``critical_path`` follows the chain of spans that determined its
+end time. Tracing is off by default; ``create_tracer`` then returns None and
+callers skip span bookkeeping.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SERVER = "server"
+INTERNAL = "internal"
+CLIENT = "client"
+OTLP_KINDS = {INTERNAL: 1, SERVER: 2, CLIENT: 3}
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _hex_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: str = INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns is not None else None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def fail(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent span_id) of a W3C traceparent header, if valid."""
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if set(parts[1]) == {"0"} or set(parts[2]) == {"0"}:
+        return None
+    return parts[1], parts[2]
+
+
+def in_context(fn: Callable, *args, **kwargs) -> Callable[[], Any]:
+    """fn bound to a copy of the caller's context (current span and run), for thread pools."""
+    context = contextvars.copy_context()
+    return lambda: context.run(fn, *args, **kwargs)
+
+
+def payload_size(value: Any) -> int:
+    """Approximate serialized size of a value in bytes."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8", errors="replace"))
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class Tracer:
+    """Creates spans and hands finished ones to an exporter."""
+
+    def __init__(self, export: Callable[[Span], None], keep_traces: int = 200, archive: Optional["JsonFileWriter"] = None):
+        self._export = export
+        # Where traces no longer kept in memory can be read back from, if anywhere
+        self._archive = archive
+        self._recent: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._keep_traces = keep_traces
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        name: str,
+        kind: str = INTERNAL,
+        parent: Optional[Span] = None,
+        remote_parent: Optional[Tuple[str, str]] = None,
+        **attributes: Any,
+    ) -> Tuple[Span, contextvars.Token]:
+        """Open a span as a child of parent (default: the current span) and make it current."""
+        parent = parent or current_span()
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif remote_parent is not None:
+            trace_id, parent_id = remote_parent
+        else:
+            trace_id, parent_id = _hex_id(128), None
+        span = Span(name=name, trace_id=trace_id, span_id=_hex_id(64), parent_id=parent_id, kind=kind)
+        span.set(**attributes)
+        return span, _current_span.set(span)
+
+    def end(self, span: Span, token: Optional[contextvars.Token] = None, error: Optional[BaseException] = None) -> None:
+        if span.end_ns is not None:
+            return
+        if error is not None:
+            span.fail(error)
+        span.end_ns = time.time_ns()
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:  # ended from another context
+                pass
+        with self._lock:
+            spans = self._recent.setdefault(span.trace_id, [])
+            spans.append(span)
+            self._recent.move_to_end(span.trace_id)
+            while len(self._recent) > self._keep_traces:
+                self._recent.popitem(last=False)
+        self._export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = INTERNAL, parent: Optional[Span] = None, **attributes: Any):
+        span, token = self.start(name, kind, parent, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end(span, token, error=e)
+            raise
+        self.end(span, token)
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """Finished spans of a trace, by start time."""
+        with self._lock:
+            spans = list(self._recent.get(trace_id, []))
+        if not spans and self._archive is not None:
+            return self._archive.read_trace(trace_id)
+        return sorted(spans, key=lambda span: span.start_ns)
+
+
+def waterfall(spans: List[Span]) -> List[Dict[str, Any]]:
+    """Spans in tree order with their depth and offset from the trace start (ms)."""
+    if not spans:
+        return []
+    ids = {span.span_id for span in spans}
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in spans:
+        parent = span.parent_id if span.parent_id in ids else None
+        children.setdefault(parent, []).append(span)
+    start = min(span.start_ns for span in spans)
+    rows: List[Dict[str, Any]] = []
+
+    def visit(parent: Optional[str], depth: int) -> None:
+        for span in sorted(children.get(parent, []), key=lambda s: s.start_ns):
+            rows.append({**span.to_dict(), "depth": depth, "offset_ms": (span.start_ns - start) / 1e6})
+            visit(span.span_id, depth + 1)
+
+    visit(None, 0)
+    return rows
+
+
+def critical_path(spans: List[Span]) -> List[Dict[str, Any]]:
+    """From the root down, the child that finished last at each level, with its self time (ms)."""
+    finished = [span for span in spans if span.end_ns is not None]
+    if not finished:
+        return []
+    ids = {span.span_id for span in finished}
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in finished:
+        children.setdefault(span.parent_id if span.parent_id in ids else None, []).append(span)
+    path: List[Dict[str, Any]] = []
+    node = max(children.get(None, []), key=lambda s: s.end_ns - s.start_ns)
+    while node is not None:
+        kids = children.get(node.span_id, [])
+        busy = sum(kid.end_ns - kid.start_ns for kid in kids)
+        path.append({
+            "name": node.name,
+            "span_id": node.span_id,
+            "duration_ms": node.duration_ms,
+            "self_ms": max(0.0, (node.end_ns - node.start_ns - busy) / 1e6),
+            "attributes": node.attributes,
+        })
+        node = max(kids, key=lambda s: s.end_ns) if kids else None
+    return path
+
+
+# --- Exporters ---
+
+class BatchExporter:
+    """Queues finished spans and writes them in batches from a daemon thread."""
+
+    def __init__(self, write: Callable[[List[Span]], None], max_queue: int = 10000, batch_size: int = 256, interval: float = 2.0):
+        self._write = write
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._interval = interval
+        self.dropped = 0
+        threading.Thread(target=self._run, name="trace-export", daemon=True).start()
+
+    def __call__(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        batch: List[Span] = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self._batch_size:
+                self._send(batch)
+                batch = []
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch: List[Span]) -> None:
+        try:
+            self._write(batch)
+        except Exception:
+            logger.exception("Exporting %d spans failed", len(batch))
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            self.flush()
+
+
+class JsonFileWriter:
+    """Appends spans as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def __call__(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def read_trace(self, trace_id: str) -> List[Span]:
+        if not self.path.exists():
+            return []
+        spans = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if trace_id not in line:
+                    continue
+                data = json.loads(line)
+                if data["trace_id"] == trace_id:
+                    data.pop("duration_ms", None)
+                    spans.append(Span(**data))
+        return sorted(spans, key=lambda span: span.start_ns)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpWriter:
+    """Posts spans to an OpenTelemetry collector as OTLP/HTTP JSON."""
+
+    def __init__(self, endpoint: str, service_name: str = "portia-ads", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.core.tracing"},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                            "name": span.name,
+                            "kind": OTLP_KINDS.get(span.kind, 1),
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns),
+                            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+                        }
+                        for span in spans
+                    ],
+                }],
+            }]
+        }
+
+    def __call__(self, spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.encode(spans), default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def create_tracer() -> Optional[Tracer]:
+    """Build the tracer configured from the environment; None unless PORTIA_TRACE_EXPORTER is set."""
+    exporter = os.getenv("PORTIA_TRACE_EXPORTER", "none").lower()
+    if exporter == "file":
+        writer = JsonFileWriter(os.getenv("PORTIA_TRACE_FILE", "traces/spans.jsonl"))
+    elif exporter == "otlp":
+        writer = OtlpHttpWriter(
+            os.getenv("PORTIA_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+            service_name=os.getenv("PORTIA_TRACE_SERVICE", "portia-ads"),
+        )
+    else:
+        return None
+    return Tracer(
+        BatchExporter(writer),
+        keep_traces=int(os.getenv("PORTIA_TRACE_KEEP", "200")),
+        archive=writer if isinstance(writer, JsonFileWriter) else None,
+    )
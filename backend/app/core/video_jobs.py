@@ -0,0 +1,117 @@
+"""Video generation jobs, indexed by the plan run that started them.
+
+The InVideo MCP tool answers with an MCP call result: a JSON document whose
+text content mentions the link of the video being generated. The tool is
+wrapped (see ``custom_tools.video_job_tool``) so that its output is parsed
+once, right where it is produced, into a video job (url, job id, status).
+The job is recorded here under the run id, so the API can look the video up
+directly instead of searching the serialized plan run for a link.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+VIDEO_URL = re.compile(r"https://ai\.invideo\.io/[^\s\"'<>)\]]+")
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+def _texts(output: Any) -> List[str]:
+    """Text parts of an MCP call result (or of a plain string / dict output)."""
+    if isinstance(output, (bytes, bytearray)):
+        output = output.decode("utf-8", errors="replace")
+    if isinstance(output, str):
+        try:
+            parsed = json.loads(output)
+        except ValueError:
+            return [output]
+        if not isinstance(parsed, dict):
+            return [output]
+        output = parsed
+    if isinstance(output, dict):
+        texts = [item.get("text", "") for item in output.get("content") or [] if isinstance(item, dict)]
+        texts += [str(output[key]) for key in ("url", "video_url", "text") if isinstance(output.get(key), str)]
+        return texts
+    return [str(output)] if output is not None else []
+
+
+def parse_video_output(output: Any) -> Dict[str, Optional[str]]:
+    """url, job_id and status of a video generation tool output."""
+    is_error = isinstance(output, dict) and bool(output.get("isError"))
+    if isinstance(output, str):
+        try:
+            is_error = bool(json.loads(output).get("isError"))
+        except (ValueError, AttributeError):
+            pass
+    url = next((match.group(0).rstrip(".,;") for text in _texts(output) for match in VIDEO_URL.finditer(text)), None)
+    job_id = None
+    if url:
+        job_id = url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1] or None
+    if isinstance(output, dict) and isinstance(output.get("job_id"), str):
+        job_id = output["job_id"]
+    status = FAILED if is_error else READY if url else PENDING
+    return {"url": url, "job_id": job_id, "status": status}
+
+
+class VideoJobStore:
+    """SQLite index of video jobs by plan run id and pipeline root."""
+
+    def __init__(self, db_path: str = "jobs/video_jobs.db"):
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS video_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    root_id TEXT,
+                    tool_id TEXT,
+                    job_id TEXT,
+                    url TEXT,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS video_jobs_run ON video_jobs (run_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS video_jobs_root ON video_jobs (root_id)")
+
+    def record(self, run_id: str, job: Dict[str, Any], root_id: Optional[str] = None, tool_id: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO video_jobs (run_id, root_id, tool_id, job_id, url, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, root_id, tool_id, job.get("job_id"), job.get("url"), job.get("status") or PENDING, time.time()),
+            )
+
+    def find(self, run_id: str, root_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Video jobs of a plan run, or of any run of its pipeline when root_id is given; newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM video_jobs WHERE run_id = ? OR (root_id IS NOT NULL AND root_id = ?) ORDER BY id DESC",
+                (run_id, root_id),
+            ).fetchall()
+        return [
+            {key: row[key] for key in ("run_id", "job_id", "url", "status", "tool_id", "created_at")} for row in rows
+        ]
+
+    def latest(self, run_id: str, root_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        jobs = self.find(run_id, root_id)
+        return jobs[0] if jobs else None
+
+
+def create_video_job_store() -> VideoJobStore:
+    """Build the store configured from the environment."""
+    return VideoJobStore(os.getenv("PORTIA_VIDEO_JOB_DB", "jobs/video_jobs.db"))
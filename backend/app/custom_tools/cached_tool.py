@@ -0,0 +1,29 @@
+from typing import Any
+from pydantic import PrivateAttr
+from portia.tool import ToolRunContext
+from app.core.tool_cache import ToolResultCache
+from app.custom_tools.delegating_tool import DelegatingTool, wrap_registry
+
+# --- Cached Tool Wrapper ---
+
+class CachedTool(DelegatingTool):
+    """Wraps another tool and serves its results from a ToolResultCache."""
+
+    _cache: ToolResultCache = PrivateAttr()
+
+    def _delegate(self, ctx: ToolRunContext, call, *args, **kwargs) -> Any:
+        return self._cache.fetch(self.id, self._cache_args(kwargs), call)
+
+    def _cache_args(self, kwargs):
+        # Key on the validated arguments so omitted defaults and explicit ones share an entry
+        try:
+            return self.args_schema.model_validate(kwargs).model_dump(mode="json")
+        except Exception:
+            return kwargs
+
+
+def with_tool_cache(registry, cache: ToolResultCache):
+    """Return `registry` with every tool the cache has a TTL for wrapped in CachedTool."""
+    if cache is None:
+        return registry
+    return wrap_registry(registry, lambda tool: CachedTool.wrap(tool, cache=cache) if cache.caches(tool.id) else tool)
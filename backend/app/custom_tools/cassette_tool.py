@@ -0,0 +1,27 @@
+from typing import Any
+from pydantic import PrivateAttr
+from portia.tool import ToolRunContext
+from app.core.cassettes import CassetteStore
+from app.core.run_state import get_run
+from app.custom_tools.delegating_tool import DelegatingTool, wrap_registry
+
+# Local tools keep running on replay, so the files later steps read are really written
+LOCAL_TOOL_IDS = {"file_writer_tool", "file_reader_tool", "make_directory_tool", "make_file_in_folder_tool", "calculator_tool"}
+
+# --- Cassette Tool Wrapper ---
+
+class CassetteTool(DelegatingTool):
+    """Wraps another tool, recording its calls into the run's cassette or replaying them from it."""
+
+    _store: CassetteStore = PrivateAttr()
+
+    def _delegate(self, ctx: ToolRunContext, call, *args, **kwargs) -> Any:
+        state = get_run(ctx.plan_run.id)
+        return self._store.call(state, "tool", self.id, {"args": list(args), "kwargs": kwargs}, call)
+
+
+def with_cassettes(registry, store: CassetteStore):
+    """Return `registry` with every remote tool wrapped in CassetteTool."""
+    if store is None:
+        return registry
+    return wrap_registry(registry, lambda tool: tool if tool.id in LOCAL_TOOL_IDS else CassetteTool.wrap(tool, store=store))
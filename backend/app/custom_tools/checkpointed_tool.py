@@ -0,0 +1,29 @@
+from typing import Any
+from pydantic import PrivateAttr
+from portia.tool import ToolRunContext
+from app.core.checkpoints import CheckpointStore
+from app.core.run_state import get_run
+from app.core.tool_cache import READ_ONLY_TOOLS
+from app.custom_tools.delegating_tool import DelegatingTool, wrap_registry
+
+# Read-only tools whose results steps reused by incremental re-execution may replay;
+# every other tool (file writers, TTS, Notion, InVideo) has side effects and runs again
+REPLAYABLE_TOOLS = READ_ONLY_TOOLS
+
+# --- Checkpointed Tool Wrapper ---
+
+class CheckpointedTool(DelegatingTool):
+    """Wraps another tool, journaling its results so resumed runs can replay them."""
+
+    _store: CheckpointStore = PrivateAttr()
+
+    def _delegate(self, ctx: ToolRunContext, call, *args, **kwargs) -> Any:
+        state = get_run(ctx.plan_run.id)
+        return self._store.call(state, f"tool:{self.id}", call, rerun=self.id not in REPLAYABLE_TOOLS)
+
+
+def with_checkpoints(registry, store: CheckpointStore):
+    """Return `registry` with every tool wrapped in CheckpointedTool."""
+    if store is None:
+        return registry
+    return wrap_registry(registry, lambda tool: CheckpointedTool.wrap(tool, store=store))
@@ -0,0 +1,52 @@
+from typing import Any, Callable, ClassVar, Optional, Tuple
+from pydantic import PrivateAttr
+from portia import InMemoryToolRegistry
+from portia.tool import Tool, ToolRunContext
+from app.custom_tools.lazy_registry import LazyToolRegistry
+
+# --- Delegating Tool Wrapper ---
+
+class DelegatingTool(Tool[Any]):
+    """Stands in for another tool under its id and schema; subclasses change how a call runs in `_delegate`."""
+
+    # (name, description) replacing the wrapped tool's output schema, if the wrapper changes the output
+    OUTPUT_SCHEMA: ClassVar[Optional[Tuple[str, str]]] = None
+
+    _inner: Tool = PrivateAttr()
+
+    @classmethod
+    def wrap(cls, tool: Tool, **attributes: Any) -> "DelegatingTool":
+        """Wrap tool; each keyword sets the wrapper's private attribute of that name (store=... sets _store)."""
+        wrapped = cls(
+            id=tool.id,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            output_schema=cls.OUTPUT_SCHEMA or tool.output_schema,
+            should_summarize=tool.should_summarize,
+        )
+        wrapped._inner = tool
+        for name, value in attributes.items():
+            setattr(wrapped, f"_{name}", value)
+        return wrapped
+
+    def ready(self, ctx: ToolRunContext):
+        return self._inner.ready(ctx)
+
+    def run(self, ctx: ToolRunContext, *args, **kwargs) -> Any:
+        return self._delegate(ctx, lambda: self._inner.run(ctx, *args, **kwargs), *args, **kwargs)
+
+    def _delegate(self, ctx: ToolRunContext, call: Callable[[], Any], *args, **kwargs) -> Any:
+        """Result of a call; `call()` runs the wrapped tool with the same arguments."""
+        return call()
+
+
+def wrap_registry(registry, wrapper: Callable[[Tool], Tool]):
+    """Return `registry` with every tool replaced by wrapper(tool); tools it returns unchanged stay as they are."""
+    if isinstance(registry, LazyToolRegistry):
+        return registry.map_tools(wrapper)
+    wrapped = [new for tool, new in ((tool, wrapper(tool)) for tool in registry.get_tools()) if new is not tool]
+    if not wrapped:
+        return registry
+    wrapped_ids = {tool.id for tool in wrapped}
+    return registry.filter_tools(lambda tool: tool.id not in wrapped_ids) + InMemoryToolRegistry.from_local_tools(wrapped)
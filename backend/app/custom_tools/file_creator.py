@@ -3,11 +3,15 @@ import json
 from pathlib import Path
 from pydantic import BaseModel, Field
 from portia.tool import Tool, ToolRunContext
-import requests
-from elevenlabs.client import ElevenLabs
 from dotenv import load_dotenv
+from app.core.artifacts import record_artifact
 load_dotenv()
 
+
+def _run_id(ctx: ToolRunContext):
+    plan_run = getattr(ctx, "plan_run", None)
+    return getattr(plan_run, "id", None)
+
 # --- Folder Creator Tool (unchanged) ---
 
 class MakeDirectoryToolSchema(BaseModel):
@@ -39,7 +43,7 @@ class MakeFileInFolderTool(Tool[str]):
     args_schema: type[BaseModel] = MakeFileInFolderToolSchema
     output_schema: tuple[str, str] = ("str", "A message confirming the file creation.")
 
-    def run(self, _: ToolRunContext, folder_path: str, filename: str, content) -> str:
+    def run(self, ctx: ToolRunContext, folder_path: str, filename: str, content) -> str:
         folder = Path(folder_path)
         folder.mkdir(parents=True, exist_ok=True)
         file_path = folder / filename
@@ -48,12 +52,11 @@ class MakeFileInFolderTool(Tool[str]):
                 json.dump(content, f, ensure_ascii=False, indent=2)
         else:
             file_path.write_text(str(content), encoding="utf-8")
+        record_artifact(_run_id(ctx), file_path, tool_id=self.id)
         return f"File '{file_path}' created with provided content."
     
 
 
-from elevenlabs.client import ElevenLabs
-
 load_dotenv()
 
 class ElevenLabsTTSSchema(BaseModel):
@@ -70,7 +73,10 @@ class ElevenLabsTTSTool(Tool[str]):
     args_schema: type[BaseModel] = ElevenLabsTTSSchema
     output_schema: tuple[str, str] = ("str", "Path to the generated audio file")
 
-    def run(self, _: ToolRunContext, text: str, voice_id: str, model_id: str, output_format: str, output_path: str) -> str:
+    def run(self, ctx: ToolRunContext, text: str, voice_id: str, model_id: str, output_format: str, output_path: str) -> str:
+        # Imported on first use: the ElevenLabs SDK is slow to import
+        from elevenlabs.client import ElevenLabs
+
         api_key = os.getenv("ELEVEN_LABS_API_KEY")
         elevenlabs = ElevenLabs(api_key=api_key)
         audio = elevenlabs.text_to_speech.convert(
@@ -81,4 +87,5 @@ class ElevenLabsTTSTool(Tool[str]):
         )
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
         Path(output_path).write_bytes(b"".join(audio))
+        record_artifact(_run_id(ctx), output_path, tool_id=self.id)
         return str(Path(output_path).absolute())
\ No newline at end of file
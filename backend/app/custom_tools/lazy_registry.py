@@ -0,0 +1,150 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from portia import ToolRegistry
+from portia.errors import ToolNotFoundError
+from portia.tool import Tool
+
+from app.core.tool_snapshot import ToolSnapshot, tool_metadata
+
+# --- Lazy Tool Registry ---
+
+# A transform maps a resolved tool to its wrapped form, or to None to hide it.
+ToolTransform = Callable[[Tool], Optional[Tool]]
+
+
+class _Sources:
+    """Named registry factories, each built at most once, on first use."""
+
+    def __init__(self, factories: Sequence[Tuple[str, Callable[[], ToolRegistry]]], snapshot: Optional[ToolSnapshot]):
+        self.factories = dict(factories)
+        self.names = [name for name, _ in factories]
+        self.snapshot = snapshot
+        self.loaded: Dict[str, ToolRegistry] = {}
+        self._lock = threading.RLock()
+
+    def load(self, name: str) -> ToolRegistry:
+        registry = self.loaded.get(name)
+        if registry is not None:
+            return registry
+        with self._lock:
+            if name not in self.loaded:
+                registry = self.factories[name]()
+                if self.snapshot is not None:
+                    self.snapshot.save(name, [tool_metadata(tool) for tool in registry.get_tools()])
+                self.loaded[name] = registry
+        return self.loaded[name]
+
+    def search_order(self, tool_id: str) -> List[str]:
+        """Sources to try for tool_id: the snapshotted owner first, then loaded sources, then the rest."""
+        owner = self.snapshot.owner(tool_id) if self.snapshot is not None else None
+        order = [owner] if owner in self.factories else []
+        order += [name for name in self.names if name in self.loaded and name not in order]
+        return order + [name for name in self.names if name not in order]
+
+
+class LazyToolRegistry(ToolRegistry):
+    """Registry over several sources that builds each source only when one of its tools is needed.
+
+    `get_tool(id)` loads just the source that provides the tool (known from the
+    tool metadata snapshot, or found by trying sources in order), so running a
+    plan that only uses local tools never performs remote tool discovery.
+    `get_tools()` loads everything. Wrappers added with `map_tools` are applied
+    to tools as they are resolved.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[Tuple[str, Callable[[], ToolRegistry]]] = (),
+        snapshot: Optional[ToolSnapshot] = None,
+        _shared: Optional[_Sources] = None,
+        _transforms: Tuple[ToolTransform, ...] = (),
+    ):
+        super().__init__()
+        self._sources = _shared or _Sources(sources, snapshot)
+        self._transforms = _transforms
+        self._resolved: Dict[str, Optional[Tool]] = {}
+        self._overrides: Dict[str, Tool] = {}
+        self._lock = threading.Lock()
+
+    def map_tools(self, transform: ToolTransform) -> "LazyToolRegistry":
+        """A view of this registry with transform applied to every tool it resolves."""
+        return LazyToolRegistry(_shared=self._sources, _transforms=self._transforms + (transform,))
+
+    def filter_tools(self, predicate: Callable[[Tool], bool]) -> "LazyToolRegistry":
+        return self.map_tools(lambda tool: tool if predicate(tool) else None)
+
+    def load_all(self) -> "LazyToolRegistry":
+        """Build every source now (e.g. before forking server workers)."""
+        for name in self._sources.names:
+            self._sources.load(name)
+        return self
+
+    def loaded_sources(self) -> List[str]:
+        return [name for name in self._sources.names if name in self._sources.loaded]
+
+    def with_tool(self, tool: Tool, *, overwrite: bool = False) -> None:
+        if not overwrite and tool.id in self._overrides:
+            raise ValueError(f"Tool {tool.id} is already registered")
+        self._overrides[tool.id] = tool
+
+    def replace_tool(self, tool: Tool) -> None:
+        self.with_tool(tool, overwrite=True)
+
+    def get_tool(self, tool_id: str) -> Tool:
+        if tool_id in self._overrides:
+            return self._overrides[tool_id]
+        if tool_id not in self._resolved:
+            for name in self._sources.search_order(tool_id):
+                try:
+                    tool = self._sources.load(name).get_tool(tool_id)
+                except ToolNotFoundError:
+                    continue
+                self._remember(tool)
+                break
+        tool = self._resolved.get(tool_id)
+        if tool is None:
+            raise ToolNotFoundError(tool_id)
+        return tool
+
+    def get_tools(self) -> List[Tool]:
+        tools: Dict[str, Tool] = {}
+        for name in self._sources.names:
+            for tool in self._sources.load(name).get_tools():
+                if tool.id in tools or tool.id in self._overrides:
+                    continue
+                resolved = self._remember(tool)
+                if resolved is not None:
+                    tools[tool.id] = resolved
+        return list(tools.values()) + list(self._overrides.values())
+
+    def match_tools(self, query: Optional[str] = None, tool_ids: Optional[List[str]] = None) -> List[Tool]:
+        if tool_ids is None:
+            return self.get_tools()
+        tools = []
+        for tool_id in tool_ids:
+            try:
+                tools.append(self.get_tool(tool_id))
+            except ToolNotFoundError:
+                continue
+        return tools
+
+    def tool_metadata(self) -> List[Dict[str, Any]]:
+        """Metadata of every tool, from the snapshot when it covers all sources."""
+        snapshot = self._sources.snapshot
+        if snapshot is not None and not self._transforms and not self._overrides:
+            tools = snapshot.tools(self._sources.names)
+            if tools is not None:
+                return tools
+        return [tool_metadata(tool) for tool in self.get_tools()]
+
+    def _remember(self, tool: Tool) -> Optional[Tool]:
+        tool_id = tool.id
+        with self._lock:
+            if tool_id not in self._resolved:
+                for transform in self._transforms:
+                    tool = transform(tool)
+                    if tool is None:
+                        break
+                self._resolved[tool_id] = tool
+            return self._resolved[tool_id]
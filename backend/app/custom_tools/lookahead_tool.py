@@ -0,0 +1,23 @@
+from typing import Any
+from portia.tool import ToolRunContext
+from app.core.run_state import get_run
+from app.core.scheduler import StepScheduler
+from app.custom_tools.delegating_tool import DelegatingTool, wrap_registry
+
+# --- Look-ahead Tool Wrapper ---
+
+class LookaheadTool(DelegatingTool):
+    """Wraps another tool and hands the engine the result of the step's look-ahead run."""
+
+    def _delegate(self, ctx: ToolRunContext, call, *args, **kwargs) -> Any:
+        state = get_run(ctx.plan_run.id)
+        if state is None or state.schedule is None or args:
+            return call()
+        return state.schedule.run(state.current_step, self.id, kwargs, call)
+
+
+def with_lookahead(registry, scheduler: StepScheduler):
+    """Return `registry` with every tool the scheduler runs ahead wrapped in LookaheadTool."""
+    if scheduler is None:
+        return registry
+    return wrap_registry(registry, lambda tool: LookaheadTool.wrap(tool) if tool.id in scheduler.read_only else tool)
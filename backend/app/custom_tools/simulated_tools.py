@@ -0,0 +1,105 @@
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from portia import InMemoryToolRegistry
+from portia.open_source_tools.registry import open_source_tool_registry
+from portia.tool import Tool, ToolRunContext
+
+from app.core.artifacts import record_artifact
+from app.core.simulation import Simulator
+from app.custom_tools.file_creator import ElevenLabsTTSSchema, _run_id
+from app.custom_tools.lazy_registry import LazyToolRegistry
+
+# --- Simulated Tools (PORTIA_SIMULATE=1, see app/core/simulation.py) ---
+
+class SearchSchema(BaseModel):
+    search_query: str = Field(..., description="The query to search for.")
+
+
+class CrawlSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    url: str = Field(..., description="The root URL to begin the crawl.")
+    instructions: Optional[str] = Field(None, description="What to look for while crawling.")
+    max_depth: int = Field(1, description="How far from the root URL to crawl.")
+
+
+class ExtractSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    urls: Union[str, List[str]] = Field(..., description="The URLs to extract content from.")
+
+
+class McpSchema(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+class SimulatedTool(Tool[Any]):
+    """Answers calls with payloads drawn by the simulator instead of calling the service."""
+
+    _simulator: Simulator = PrivateAttr()
+
+    @classmethod
+    def create(cls, simulator: Simulator, **fields) -> "SimulatedTool":
+        tool = cls(**fields)
+        tool._simulator = simulator
+        return tool
+
+    def run(self, ctx: ToolRunContext, **kwargs) -> Any:
+        return self._simulator.tool(self.id, kwargs)
+
+
+class SimulatedTTSTool(SimulatedTool):
+    """Writes a placeholder audio file of simulated size where ElevenLabs would write the MP3."""
+
+    def run(self, ctx: ToolRunContext, **kwargs) -> Any:
+        args = ElevenLabsTTSSchema.model_validate(kwargs)
+        audio = self._simulator.call(self.id, kwargs, lambda rng, size: rng.randbytes(size))
+        Path(args.output_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output_path).write_bytes(audio)
+        record_artifact(_run_id(ctx), args.output_path, tool_id=self.id)
+        return str(Path(args.output_path).absolute())
+
+
+# id, name, args schema, description
+SIMULATED_TOOLS = [
+    ("search_tool", "Search Tool", SearchSchema, "Searches the web (simulated)."),
+    ("crawl_tool", "Crawl Tool", CrawlSchema, "Crawls a website (simulated)."),
+    ("extract_tool", "Extract Tool", ExtractSchema, "Extracts the content of web pages (simulated)."),
+    ("portia:mcp:actors-mcp-server.apify.actor:apify_slash_rag_web_browser", "Apify RAG Web Browser", McpSchema,
+     "Searches and reads web pages for RAG (simulated)."),
+    ("portia:mcp:mcp.invideo.io:generate_video_from_script", "InVideo Generate Video From Script", McpSchema,
+     "Generates a video from a script (simulated)."),
+    ("portia:mcp:mcp.notion.com:notion_create_pages", "Notion Create Pages", McpSchema,
+     "Creates Notion pages (simulated)."),
+]
+SIMULATED_TOOL_IDS = {tool_id for tool_id, *_ in SIMULATED_TOOLS} | {"elevenlabs_tts_tool"}
+
+
+def simulated_tool_registry(simulator: Simulator) -> LazyToolRegistry:
+    """Simulated remote tools plus the real local ones (file writer, directories), without cloud tool discovery."""
+
+    def build():
+        from app.custom_tools.registry import custom_tool_registry
+
+        simulated = [
+            SimulatedTool.create(
+                simulator, id=tool_id, name=name, description=description, args_schema=schema,
+                output_schema=("dict", "Simulated tool output"),
+            )
+            for tool_id, name, schema, description in SIMULATED_TOOLS
+        ]
+        simulated.append(
+            SimulatedTTSTool.create(
+                simulator, id="elevenlabs_tts_tool", name="ElevenLabs TTS Tool",
+                description="Converts text to speech (simulated).", args_schema=ElevenLabsTTSSchema,
+                output_schema=("str", "Path to the generated audio file"),
+            )
+        )
+        local = lambda tool: tool.id not in SIMULATED_TOOL_IDS
+        return (
+            InMemoryToolRegistry.from_local_tools(simulated)
+            + open_source_tool_registry.filter_tools(local)
+            + custom_tool_registry.filter_tools(local)
+        )
+
+    return LazyToolRegistry([("simulated", build)])
@@ -0,0 +1,36 @@
+from typing import Any
+from pydantic import PrivateAttr
+from portia.tool import ToolRunContext
+from app.core.run_state import get_run
+from app.core.video_jobs import VideoJobStore, parse_video_output
+from app.custom_tools.delegating_tool import DelegatingTool, wrap_registry
+from app.schema.content_schemas import VideoJob
+
+# Tools that start a video generation job
+VIDEO_GENERATION_TOOLS = {"portia:mcp:mcp.invideo.io:generate_video_from_script"}
+
+# --- Video Job Tool Wrapper ---
+
+class VideoJobTool(DelegatingTool):
+    """Wraps a video generation tool: returns a typed VideoJob and indexes it by run id."""
+
+    OUTPUT_SCHEMA = ("VideoJob", "The video generation job: url, job_id and status")
+
+    _store: VideoJobStore = PrivateAttr()
+
+    def _delegate(self, ctx: ToolRunContext, call, *args, **kwargs) -> Any:
+        output = call()
+        run_id = str(ctx.plan_run.id)
+        job = VideoJob(**parse_video_output(output), run_id=run_id)
+        state = get_run(ctx.plan_run.id)
+        self._store.record(
+            run_id, job.model_dump(), root_id=state.root_id if state is not None else None, tool_id=self.id
+        )
+        return job
+
+
+def with_video_jobs(registry, store: VideoJobStore):
+    """Return `registry` with the video generation tools wrapped in VideoJobTool."""
+    return wrap_registry(
+        registry, lambda tool: VideoJobTool.wrap(tool, store=store) if tool.id in VIDEO_GENERATION_TOOLS else tool
+    )
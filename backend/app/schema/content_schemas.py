@@ -59,6 +59,13 @@ class PodcastPackage(BaseModel):
     audio_instructions: str = Field(description="Audio production instructions")
     estimated_duration: str = Field(description="Estimated episode duration")
 
+class VideoJob(BaseModel):
+    """A video generation job started by the video generation tool."""
+    url: Optional[str] = Field(default=None, description="Link to the generated video, once known")
+    job_id: Optional[str] = Field(default=None, description="Video generator's id for the job")
+    status: str = Field(description="pending, ready or failed")
+    run_id: Optional[str] = Field(default=None, description="Plan run that started the job")
+
 class VideoPackage(BaseModel):
     """Schema for video production output."""
     video_script: str = Field(description="Complete video script")
@@ -66,7 +73,8 @@ class VideoPackage(BaseModel):
     thumbnail_concepts: List[str] = Field(description="Thumbnail design concepts")
     video_metadata: Dict[str, Any] = Field(description="Video metadata (title, description, tags, etc.)")
     editing_instructions: str = Field(description="Video editing instructions")
-    video_url: str = Field(description="URL to the generated video")
+    video_url: Optional[str] = Field(default=None, description="URL to the generated video")
+    video_job: Optional[VideoJob] = Field(default=None, description="Video generation job behind video_url")
     production_details: Dict[str, Any] = Field(description="Additional production details such as topic, platform, estimated time, equipment, and status")
 
 class PublishingResults(BaseModel):
@@ -0,0 +1,67 @@
+import os
+from app.core.artifact_index import ArtifactIndex, derive_topic
+
+def _write(path, content, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    os.utime(path, (mtime, mtime))
+
+def test_reconcile_and_paginate(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(5):
+        _write(tmp_path / "research_reports" / f"topic{i}_summary.txt", f"summary {i}", 1000 + i)
+    _write(tmp_path / "content_drafts" / "topic0_package.json", "{}", 2000)
+
+    index = ArtifactIndex(str(tmp_path / "index.db"))
+    assert index.reconcile(["research_reports", "content_drafts"]) == {"scanned": 6, "updated": 6, "removed": 0}
+    # Unchanged files are not re-hashed
+    assert index.reconcile(["research_reports", "content_drafts"])["updated"] == 0
+
+    first = index.query(kind="research_reports", limit=2, fields=["name", "topic"])
+    assert first["items"] == [
+        {"name": "topic4_summary.txt", "topic": "topic4"},
+        {"name": "topic3_summary.txt", "topic": "topic3"},
+    ]
+    second = index.query(kind="research_reports", limit=2, cursor=first["next_cursor"], fields=["name"])
+    third = index.query(kind="research_reports", limit=2, cursor=second["next_cursor"], fields=["name"])
+    assert [i["name"] for i in second["items"] + third["items"]] == [
+        "topic2_summary.txt", "topic1_summary.txt", "topic0_summary.txt"
+    ]
+    assert third["next_cursor"] is None
+
+    assert [i["kind"] for i in index.query(topic="topic0")["items"]] == ["content_drafts", "research_reports"]
+
+    (tmp_path / "research_reports" / "topic4_summary.txt").unlink()
+    assert index.reconcile(["research_reports"])["removed"] == 1
+    assert index.latest("research_reports", name_suffix=".txt")["name"] == "topic3_summary.txt"
+
+def test_upsert_keeps_run_id_and_tracks_hash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = tmp_path / "fact_check_reports" / "verification_report_default.json"
+    _write(report, '{"claims": 1}', 1000)
+
+    index = ArtifactIndex(str(tmp_path / "index.db"))
+    first = index.upsert_file(report, run_id="prun-1")
+    _write(report, '{"claims": 2}', 1001)
+    index.reconcile(["fact_check_reports"])
+    updated = index.get("fact_check_reports/verification_report_default.json")
+    assert updated["run_id"] == "prun-1"
+    assert updated["sha256"] != first["sha256"]
+    assert updated["topic"] == "default"
+
+def test_derive_topic():
+    assert derive_topic("AI in Healtcare_market_research.json") == "AI in Healtcare"
+    assert derive_topic("notion_publication_report_ai_medical_diagnosis_2025.json") == "ai_medical_diagnosis_2025"
+
+def test_name_suffix_matches_wildcards_literally(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write(tmp_path / "research_reports" / "ai_100%_report.txt", "a", 1000)
+    _write(tmp_path / "research_reports" / "ai_1000_report.txt", "b", 1001)
+    _write(tmp_path / "research_reports" / "aiXreport.txt", "c", 1002)
+
+    index = ArtifactIndex(str(tmp_path / "index.db"))
+    index.reconcile(["research_reports"])
+    assert [i["name"] for i in index.query(name_suffix="0%_report.txt")["items"]] == ["ai_100%_report.txt"]
+    assert [i["name"] for i in index.query(name_suffix="_report.txt")["items"]] == [
+        "ai_1000_report.txt", "ai_100%_report.txt"
+    ]
@@ -0,0 +1,27 @@
+from app.core.artifacts import ManifestStore, record_artifact, run_artifact_refs
+from app.core.run_state import RunState, bind_run, register_run
+
+def test_manifest_only_contains_files_from_the_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "research_reports").mkdir()
+    (tmp_path / "research_reports" / "old_report.json").write_text("{}")
+    report = tmp_path / "research_reports" / "AI_market_research.json"
+    report.write_text('{"trending_topics": []}')
+
+    with bind_run(RunState()) as state:
+        register_run(state, "prun-123")
+        record_artifact("prun-123", "research_reports/AI_market_research.json", tool_id="file_writer_tool")
+        # Rewriting the same file keeps a single entry
+        record_artifact("prun-123", report, tool_id="file_writer_tool")
+        refs = run_artifact_refs(state, "research_reports")
+        store = ManifestStore(str(tmp_path / "run_manifests"))
+        store.save(state.run_id, state.artifacts)
+
+    assert list(refs) == ["AI_market_research.json"]
+    assert refs["AI_market_research.json"]["url"] == (
+        "/api/runs/prun-123/artifacts/research_reports/AI_market_research.json"
+    )
+    assert refs["AI_market_research.json"]["size"] == report.stat().st_size
+    assert store.find_artifact("prun-123", "AI_market_research.json")["kind"] == "research_reports"
+    assert store.find_artifact("prun-123", "old_report.json") is None
+    assert store.load("prun-unknown") is None
@@ -0,0 +1,135 @@
+import gzip
+import json
+import time
+
+import pytest
+
+from app.agents.scenarios import SCENARIOS
+from app.core.cassettes import (
+    Cassette,
+    CassetteMiss,
+    CassetteStore,
+    ReplayedError,
+    create_cassette_store,
+)
+from app.core.run_state import RunState
+from app.core.simulation import get_simulator
+
+INPUTS = SCENARIOS["market-research"]
+
+def _record(tmp_path, calls):
+    store = CassetteStore(str(tmp_path), mode="record")
+    state = RunState(cassette=store.open("Market Research", INPUTS))
+    for step, kind, name, request, value in calls:
+        state.current_step = step
+        store.call(state, kind, name, request, lambda: time.sleep(0.002) or value)
+    store.close(state.cassette)
+    return state.cassette.path
+
+def test_record_and_replay_round_trip(tmp_path):
+    path = _record(tmp_path, [
+        ("research", "tool", "search_tool", {"search_query": "AI in Healthcare"}, {"results": [{"url": "https://a.example.com"}]}),
+        ("summary", "llm", "text", [{"role": "user", "content": "Summarize"}], {"role": "assistant", "content": "Done"}),
+    ])
+    assert path.name.startswith("market-research-") and path.name.endswith(".jsonl.gz")
+    with gzip.open(path, "rt") as f:
+        header = json.loads(f.readline())
+    assert header["plan"] == "Market Research" and header["inputs"] == INPUTS
+
+    slept = []
+    store = CassetteStore(str(tmp_path), mode="replay", latency_scale=0.5, sleep=slept.append)
+    state = RunState(cassette=store.open("Market Research", INPUTS))
+    state.current_step = "research"
+    assert store.call(state, "tool", "search_tool", {"search_query": "AI in Healthcare"}, pytest.fail) == {
+        "results": [{"url": "https://a.example.com"}]
+    }
+    state.current_step = "summary"
+    assert store.call(state, "llm", "text", [{"role": "user", "content": "Summarize"}], pytest.fail)["content"] == "Done"
+    assert len(slept) == 2 and all(0.001 <= seconds < 1 for seconds in slept)
+    assert state.cassette.stats()["replayed"] == 2
+
+def test_unmatched_prompts_fall_back_to_call_order_within_the_step(tmp_path):
+    _record(tmp_path, [
+        ("plan", "llm", "Outline", [{"content": "run 1a2b outline"}], {"title": "first"}),
+        ("plan", "llm", "Outline", [{"content": "run 1a2b outline again"}], {"title": "second"}),
+    ])
+    store = CassetteStore(str(tmp_path), mode="replay", latency_scale=0)
+    state = RunState(cassette=store.open("Market Research", INPUTS), engine_step="plan")
+    # Run ids in the prompt differ, so keys miss and calls are matched in order
+    assert store.call(state, "llm", "Outline", [{"content": "run 9f8e outline"}], pytest.fail)["title"] == "first"
+    assert store.call(state, "llm", "Outline", [{"content": "run 9f8e outline again"}], pytest.fail)["title"] == "second"
+    # Nothing left: the call goes to the wrapped model
+    assert store.call(state, "llm", "Outline", [{"content": "extra"}], lambda: {"title": "live"}) == {"title": "live"}
+    assert state.cassette.stats()["misses"] == 1
+
+def test_recorded_errors_are_replayed(tmp_path):
+    store = CassetteStore(str(tmp_path), mode="record")
+    state = RunState(cassette=store.open("Fact Checking", {}), engine_step="verify")
+
+    def fail():
+        raise TimeoutError("search timed out")
+
+    with pytest.raises(TimeoutError):
+        store.call(state, "tool", "search_tool", {"search_query": "FDA approvals"}, fail)
+    store.close(state.cassette)
+    replay = CassetteStore(str(tmp_path), mode="replay", latency_scale=0)
+    state = RunState(cassette=replay.open("Fact Checking", {}), engine_step="verify")
+    with pytest.raises(ReplayedError, match="TimeoutError: search timed out"):
+        replay.call(state, "tool", "search_tool", {"search_query": "FDA approvals"}, pytest.fail)
+
+def test_strict_replay(tmp_path):
+    strict = CassetteStore(str(tmp_path), mode="replay", strict=True)
+    with pytest.raises(CassetteMiss):
+        strict.open("Market Research", INPUTS)
+    assert CassetteStore(str(tmp_path), mode="replay").open("Market Research", INPUTS) is None
+    _record(tmp_path, [])
+    state = RunState(cassette=strict.open("Market Research", INPUTS))
+    with pytest.raises(CassetteMiss):
+        strict.call(state, "tool", "crawl_tool", {"url": "https://example.com"}, pytest.fail)
+    # Runs without a cassette are passed through
+    assert strict.call(RunState(), "tool", "crawl_tool", {}, lambda: "live") == "live"
+
+def test_configuration(tmp_path, monkeypatch):
+    assert create_cassette_store() is None
+    monkeypatch.setenv("PORTIA_CASSETTE_MODE", "replay")
+    monkeypatch.setenv("PORTIA_CASSETTE_DIR", str(tmp_path))
+    monkeypatch.setenv("PORTIA_CASSETTE_LATENCY", "zero")
+    store = create_cassette_store()
+    assert store.replaying and store.latency_scale == 0 and store.directory == tmp_path
+    monkeypatch.setenv("PORTIA_CASSETTE_LATENCY", "0.25")
+    assert create_cassette_store().latency_scale == 0.25
+    monkeypatch.setenv("PORTIA_CASSETTE_MODE", "rewind")
+    with pytest.raises(ValueError):
+        create_cassette_store()
+    path = tmp_path / "old.jsonl.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(json.dumps({"version": 0}) + "\n")
+    with pytest.raises(ValueError):
+        Cassette.load(path)
+
+@pytest.mark.parametrize("latency", ["zero", "original"])
+def test_plans_replay_offline(tmp_path, monkeypatch, latency):
+    pytest.importorskip("portia")
+    from app.core.portia_client import PortiaClient, base_tool_registry
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PORTIA_CASSETTE_DIR", str(tmp_path / "cassettes"))
+    monkeypatch.setenv("PORTIA_SIM_LATENCY_SCALE", "0.01")
+
+    def client(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        get_simulator.cache_clear()
+        base_tool_registry.cache_clear()
+        return PortiaClient()
+
+    # Record against the simulator standing in for the services, then replay without it
+    recorder = client(PORTIA_SIMULATE="1", PORTIA_CASSETTE_MODE="record")
+    plan = recorder.plans.get("market-research")
+    recorder.execute(plan, INPUTS)
+    monkeypatch.delenv("PORTIA_SIMULATE")
+    player = client(PORTIA_CASSETTE_MODE="replay", PORTIA_CASSETTE_LATENCY=latency, PORTIA_CASSETTE_STRICT="1")
+    plan_run = player.execute(player.plans.get("market-research"), INPUTS)
+    assert str(getattr(plan_run.state, "value", plan_run.state)).lower() == "complete"
+    get_simulator.cache_clear()
+    base_tool_registry.cache_clear()
@@ -0,0 +1,60 @@
+from app.core.checkpoints import CheckpointStore
+from app.core.run_state import RunState
+
+def run_steps(store, state, steps, fail_at=None):
+    """Stand-in for the engine and execution hooks: run steps, journaling their calls."""
+    calls = []
+    for index, step in enumerate(steps):
+        if index == fail_at:
+            store.finish_run(state.run_id, "failed", "elevenlabs timeout")
+            return calls
+        state.enter_step(step)
+
+        def search(step=step):
+            calls.append(step)
+            return {"results": [f"{step} result"]}
+
+        output = store.call(state, "tool:search_tool", search)
+        store.save_step(state.run_id, index, step, output)
+    store.finish_run(state.run_id, "COMPLETE")
+    return calls
+
+def test_resumed_run_replays_completed_steps(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    steps = ["research_podcast_content", "analyze_similar_podcasts", "generate_podcast_audio"]
+
+    first = RunState(run_id="prun-1")
+    store.start_run("prun-1", first.root_id, "Podcast Production", {"episode_topic": "AI"})
+    assert run_steps(store, first, steps, fail_at=2) == ["research_podcast_content", "analyze_similar_podcasts"]
+    record = store.get_run("prun-1")
+    assert record["status"] == "failed" and record["inputs"] == {"episode_topic": "AI"}
+    assert [s["name"] for s in record["completed_steps"]] == steps[:2]
+
+    # Resume: the completed steps are answered from the journal, only the last one runs
+    second = RunState(run_id="prun-2", replay=store.journal("prun-1"))
+    store.start_run("prun-2", second.root_id, "Podcast Production", {"episode_topic": "AI"})
+    assert run_steps(store, second, steps) == ["generate_podcast_audio"]
+    assert store.step_outputs("prun-2")[0]["output"] == {"results": ["research_podcast_content result"]}
+
+def test_calls_are_numbered_per_step_and_kind(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    state = RunState(run_id="prun-1")
+    state.enter_step("synthesize_research")
+    slots = [store.begin_call(state, kind) for kind in ("llm", "llm", "tool:search_tool")]
+    assert [(s.step, s.kind, s.ordinal) for s in slots] == [
+        ("synthesize_research", "llm", 0), ("synthesize_research", "llm", 1), ("synthesize_research", "tool:search_tool", 0)
+    ]
+    # Calls outside any run are neither journaled nor replayed
+    assert store.begin_call(None, "llm") is None
+
+def test_plan_runs_of_a_request_are_matched_by_plan_and_ordinal(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    store.start_pipeline("root-1", "master-pipeline", {"project_name": "ai"})
+    assert store.start_run("prun-1", "root-1", "Market Research", {}) == 0
+    assert store.start_run("prun-2", "root-1", "Video Production", {}) == 0
+    assert store.start_run("prun-3", "root-1", "Market Research", {}) == 1
+    assert store.find_run("root-1", "Market Research", 1) == "prun-3"
+    assert store.get_pipeline("root-1")["pipeline"] == "master-pipeline"
+
+    assert store.prune(max_age_seconds=-1) == 3
+    assert store.get_run("prun-1") is None and store.get_pipeline("root-1") is None
@@ -0,0 +1,45 @@
+import json
+from app.core.compaction import canonical_url, compact_sources
+
+ARTICLE = "AI in healthcare helps radiologists read scans faster and flags early signs of disease in patients. " * 6
+
+def test_canonical_url():
+    assert canonical_url("http://WWW.Example.com/blog/post/?utm_source=x&b=2&a=1#top") == "https://example.com/blog/post?a=1&b=2"
+    assert canonical_url("https://example.com") == canonical_url("https://www.example.com/")
+
+def test_compaction_dedupes_ranks_and_budgets():
+    search = {"query": "ai healthcare", "results": [
+        {"url": "https://www.example.com/ai-healthcare?utm_source=news", "title": "AI in healthcare", "content": "short snippet"},
+        {"url": "https://cooking.example.org/pasta", "title": "Pasta recipes", "content": "Boil water, add salt and pasta."},
+        {"url": "https://mirror.example.net/copy", "title": "Copy", "content": ARTICLE + " Shared."},
+    ]}
+    crawl = json.dumps({"base_url": "https://example.com", "results": [
+        {"url": "https://example.com/ai-healthcare/", "raw_content": ARTICLE},
+    ]})
+    compacted = compact_sources({"search": search, "crawl": crawl}, topic="AI in healthcare", token_budget=1000)
+    sources = compacted["sources"]
+    stats = compacted["stats"]
+    assert stats["results_in"] == 4 and stats["unique_urls"] == 3 and stats["near_duplicates"] == 1
+    # The page found by both steps is merged (longest text kept) and ranked first
+    assert sources[0]["url"] == "https://example.com/ai-healthcare"
+    assert sources[0]["steps"] == ["search", "crawl"] and sources[0]["text"] == ARTICLE.strip()
+    assert [s["url"] for s in sources][-1] == "https://cooking.example.org/pasta"
+
+    tight = compact_sources({"search": search, "crawl": crawl}, topic="AI in healthcare", token_budget=60)
+    assert tight["stats"]["tokens_out"] <= 60 and len(tight["sources"]) == 1
+    assert tight["sources"][0]["text"].endswith("…")
+
+def test_only_selected_sources_are_condensed():
+    search = {"results": [
+        {"url": "https://example.com/ai-healthcare", "title": "AI in healthcare", "content": ARTICLE * 4},
+        {"url": "https://cooking.example.org/pasta", "title": "Pasta recipes", "content": "Boil water, add salt and pasta. " * 60},
+    ]}
+    calls = []
+    def condense(texts, max_tokens):
+        calls.append((texts, max_tokens))
+        return ["AI helps radiologists." for _ in texts]
+    compacted = compact_sources({"search": search}, topic="AI in healthcare", token_budget=100, condense=condense)
+    # The off-topic page ranks below the budget and is never summarized
+    assert calls == [([(ARTICLE * 4).strip()], [100])]
+    assert compacted["sources"][0]["text"] == "AI helps radiologists."
+    assert compacted["stats"]["condensed"] == 1
@@ -0,0 +1,158 @@
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from app.core.coalesce import SharedFlight, SingleFlight
+from app.core.idempotency import COMPLETED, RUNNING, IdempotencyStore, request_fingerprint
+from app.core.jobs import FAILED, JobManager, JobStore, SUCCEEDED
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def test_identical_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    release = threading.Event()
+    runs = []
+    results = []
+
+    def master_pipeline():
+        runs.append(1)
+        release.wait(5)
+        return {"result": "campaign"}
+
+    threads = [threading.Thread(target=lambda: results.append(flights.do("key", master_pipeline))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.3)  # let the followers reach the in-flight call
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(runs) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert flights.pending("key") is None
+
+def test_request_fingerprint_canonicalizes_body():
+    a = request_fingerprint("podcast-production", {"episode_topic": "AI  in care", "episode_number": 1})
+    b = request_fingerprint("podcast-production", {"episode_number": 1, "episode_topic": "AI in care"})
+    assert a == b
+    assert a != request_fingerprint("video-production", {"episode_number": 1, "episode_topic": "AI in care"})
+
+def test_idempotency_key_lifecycle(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"), retention_seconds=60)
+    assert store.begin("retry-1", "fp") is None
+    assert store.begin("retry-1", "fp")["status"] == RUNNING
+
+    store.complete("retry-1", 200, {"result": "episode"})
+    record = store.begin("retry-1", "fp")
+    assert record["status"] == COMPLETED and record["response"] == {"result": "episode"}
+
+    # Failed requests release their key for a retry
+    assert store.begin("retry-2", "fp") is None
+    store.release("retry-2")
+    assert store.begin("retry-2", "fp") is None
+
+def test_expired_keys_are_forgotten(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"), retention_seconds=-1)
+    store.begin("retry-1", "fp")
+    assert store.begin("retry-1", "fp") is None
+
+def test_submit_once_attaches_to_unfinished_job(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=2)
+    release = threading.Event()
+
+    def run(inputs):
+        release.wait(5)
+        return {"topic": inputs["topic"]}
+
+    first, coalesced = manager.submit_once("fp", "master-pipeline", {"topic": "AI"}, run)
+    second, joined = manager.submit_once("fp", "master-pipeline", {"topic": "AI"}, run)
+    assert (coalesced, joined) == (False, True)
+    assert second["job_id"] == first["job_id"]
+    release.set()
+    assert manager.wait(first["job_id"], timeout=5)["status"] == SUCCEEDED
+
+    # Once finished, the same request starts a new job
+    third, coalesced = manager.submit_once("fp", "master-pipeline", {"topic": "AI"}, lambda inputs: None)
+    assert not coalesced and third["job_id"] != first["job_id"]
+    manager.shutdown()
+
+def test_shared_flight_coalesces_across_processes(tmp_path):
+    # Two instances over one database stand in for two server workers
+    leader = SharedFlight(str(tmp_path / "flights.db"), poll_interval=0.05)
+    follower = SharedFlight(str(tmp_path / "flights.db"), poll_interval=0.05)
+    started, release = threading.Event(), threading.Event()
+    runs, results = [], []
+
+    def master_pipeline():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return {"result": "campaign"}
+
+    thread = threading.Thread(target=lambda: results.append(leader.do("key", master_pipeline)))
+    thread.start()
+    started.wait(5)
+    joiner = threading.Thread(target=lambda: results.append(follower.do("key", master_pipeline)))
+    joiner.start()
+    assert follower.join("other") == (False, None)
+    time.sleep(0.2)
+    release.set()
+    thread.join(5)
+    joiner.join(5)
+    assert len(runs) == 1
+    assert sorted(results, key=lambda r: r[1]) == [({"result": "campaign"}, False), ({"result": "campaign"}, True)]
+    # Finished flights are not served to later requests
+    assert follower.do("key", lambda: {"result": "again"}) == ({"result": "again"}, False)
+
+def test_shared_flight_failures_and_abandoned_flights(tmp_path):
+    flights = SharedFlight(str(tmp_path / "flights.db"), poll_interval=0.05)
+    with pytest.raises(ValueError):
+        flights.do("key", lambda: (_ for _ in ()).throw(ValueError("no topic")))
+    # A flight left running by a worker that exited is taken over
+    conn = sqlite3.connect(str(tmp_path / "flights.db"))
+    with conn:
+        conn.execute(
+            "UPDATE flights SET status = 'running', owner = ?, updated_at = ? WHERE key = 'key'", (exited_pid(), time.time())
+        )
+    assert flights.join("key") == (False, None)
+    assert flights.do("key", lambda: 1) == (1, False)
+
+def test_keys_of_exited_processes_are_released(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"), retention_seconds=60)
+    assert store.begin("retry-1", "fp") is None
+    assert store.begin("retry-1", "fp")["status"] == RUNNING
+    conn = sqlite3.connect(str(tmp_path / "idempotency.db"))
+    with conn:
+        conn.execute("UPDATE idempotency_keys SET owner = ? WHERE key = 'retry-1'", (exited_pid(),))
+    assert store.begin("retry-1", "fp") is None
+
+def test_submit_once_coalesces_across_job_managers(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    first_manager = JobManager(JobStore(db), max_workers=1)
+    second_manager = JobManager(JobStore(db), max_workers=1, recover=False)
+    release = threading.Event()
+
+    def run(inputs):
+        release.wait(5)
+        return {"topic": inputs["topic"]}
+
+    first, coalesced = first_manager.submit_once("fp", "master-pipeline", {"topic": "AI"}, run)
+    second, joined = second_manager.submit_once("fp", "master-pipeline", {"topic": "AI"}, run)
+    assert (coalesced, joined) == (False, True) and second["job_id"] == first["job_id"]
+    release.set()
+    assert first_manager.wait(first["job_id"], timeout=5)["status"] == SUCCEEDED
+
+    # An unfinished job of an exited process is failed, and the request runs again
+    stale = first_manager.store.create("master-pipeline", {"topic": "AI"}, dedupe_key="fp-2")
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", (exited_pid(), stale["job_id"]))
+    fresh, coalesced = second_manager.submit_once("fp-2", "master-pipeline", {"topic": "AI"}, lambda inputs: None)
+    assert not coalesced and fresh["job_id"] != stale["job_id"]
+    assert second_manager.get(stale["job_id"])["status"] == FAILED
+    first_manager.shutdown()
+    second_manager.shutdown()
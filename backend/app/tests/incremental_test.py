@@ -0,0 +1,134 @@
+import time
+
+from pydantic import BaseModel
+
+from app.core.checkpoints import CheckpointStore
+from app.core.incremental import diff_report, fresh_matches, step_fingerprints
+from app.core.run_state import RunState
+from app.core.scheduler import StepGraph
+from app.tests.scheduler_test import Input, InvokeToolStep, LLMStep, Plan, StepOutput
+
+ARTICLE_PLAN = Plan(
+    InvokeToolStep("research_topic_details", "search_tool", {"query": f"{Input('topic')} comprehensive guide"}),
+    InvokeToolStep("analyze_top_content", "search_tool", {"query": f"best {Input('topic')} articles"}),
+    LLMStep("create_article_outline", "Outline", [StepOutput("research_topic_details"), StepOutput("analyze_top_content")]),
+    LLMStep("write_full_article", "Write", [StepOutput("create_article_outline"), Input("brand_guidelines")]),
+    LLMStep("create_social_variants", "Social", [StepOutput("write_full_article")]),
+)
+
+INPUTS = {"topic": "AI in healthcare", "brand_guidelines": "friendly"}
+
+def test_changed_input_only_invalidates_its_downstream_cone():
+    before = step_fingerprints(ARTICLE_PLAN, INPUTS)
+    after = step_fingerprints(ARTICLE_PLAN, {**INPUTS, "brand_guidelines": "formal"})
+    unchanged = [name for name in before if before[name] == after[name]]
+    assert unchanged == ["research_topic_details", "analyze_top_content", "create_article_outline"]
+    assert step_fingerprints(ARTICLE_PLAN, dict(INPUTS)) == before
+
+def test_diff_report_explains_recomputed_steps():
+    graph = StepGraph.from_plan(ARTICLE_PLAN)
+    reused = {name: "prun-1" for name in ("research_topic_details", "analyze_top_content", "create_article_outline")}
+    report = diff_report(graph, reused, {**INPUTS, "brand_guidelines": "formal"}, INPUTS)
+    assert report[0] == {"step": "research_topic_details", "status": "reused", "from_run": "prun-1"}
+    assert report[3] == {"step": "write_full_article", "status": "recomputed", "changed_inputs": ["brand_guidelines"]}
+    assert report[4] == {
+        "step": "create_social_variants", "status": "recomputed", "recomputed_upstream": ["write_full_article"]
+    }
+
+def test_reuse_journal_replays_matching_steps_only(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    fingerprints = step_fingerprints(ARTICLE_PLAN, INPUTS)
+    first = RunState(run_id="prun-1")
+    store.start_run("prun-1", first.root_id, "Article Writing", INPUTS)
+    for index, node in enumerate(StepGraph.from_plan(ARTICLE_PLAN).nodes):
+        first.enter_step(node.name)
+        output = store.call(first, "llm", lambda name=node.name: f"{name} v1")
+        store.save_step("prun-1", index, node.name, output, fingerprints[node.name])
+
+    changed = step_fingerprints(ARTICLE_PLAN, {**INPUTS, "brand_guidelines": "formal"})
+    matches = store.find_steps("Article Writing", changed)
+    assert sorted(matches) == ["analyze_top_content", "create_article_outline", "research_topic_details"]
+
+    second = RunState(run_id="prun-2", replay=store.reuse_journal(matches))
+    second.enter_step("create_article_outline")
+    assert store.call(second, "llm", lambda: "outline v2") == "create_article_outline v1"
+    second.enter_step("write_full_article")
+    assert store.call(second, "llm", lambda: "article v2") == "article v2"
+
+def test_reused_steps_come_from_one_run(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    fingerprints = step_fingerprints(ARTICLE_PLAN, INPUTS)
+    names = list(fingerprints)
+    # prun-1 completed every step; the later prun-2 only the first two
+    for run_id, steps in (("prun-1", names), ("prun-2", names[:2])):
+        store.start_run(run_id, "root", "Article Writing", INPUTS)
+        for index, name in enumerate(steps):
+            store.save_step(run_id, index, name, f"{name} {run_id}", fingerprints[name])
+    assert store.find_steps("Article Writing", fingerprints) == {name: "prun-1" for name in names}
+    assert store.find_steps("Article Writing", fingerprints, exclude="prun-1") == {name: "prun-2" for name in names[:2]}
+
+def test_changed_output_schema_invalidates_the_step():
+    def fingerprint(schema):
+        step = LLMStep("outline", "Outline", [Input("topic")])
+        step.output_schema = schema
+        return step_fingerprints(Plan(step), INPUTS)["outline"]
+
+    class Outline(BaseModel):
+        title: str
+
+    before = fingerprint(Outline)
+
+    class Outline(BaseModel):
+        title: str
+        sections: list
+
+    assert fingerprint(Outline) != before
+
+def test_side_effecting_calls_run_again_on_reuse(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    first = RunState(run_id="prun-1")
+    first.enter_step("save_article")
+    store.call(first, "tool:file_writer_tool", lambda: "written v1", rerun=True)
+    store.save_step("prun-1", 0, "save_article", "written v1", "fp")
+
+    reused = RunState(run_id="prun-2", replay=store.reuse_journal({"save_article": "prun-1"}))
+    reused.enter_step("save_article")
+    assert store.call(reused, "tool:file_writer_tool", lambda: "written v2", rerun=True) == "written v2"
+    # Resuming the same run still replays it
+    resumed = RunState(run_id="prun-1", replay=store.journal("prun-1"))
+    resumed.enter_step("save_article")
+    assert store.call(resumed, "tool:file_writer_tool", lambda: "written v3", rerun=True) == "written v1"
+
+def test_reuse_is_scoped_to_the_lineage(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    fingerprints = step_fingerprints(ARTICLE_PLAN, INPUTS)
+    store.start_run("prun-1", "root-1", "Article Writing", INPUTS, lineage="team-a")
+    for index, name in enumerate(fingerprints):
+        store.save_step("prun-1", index, name, name, fingerprints[name])
+    assert store.find_steps("Article Writing", fingerprints, lineage="team-b") == {}
+    assert store.latest_run("Article Writing", lineage="team-b") is None
+    assert store.find_steps("Article Writing", fingerprints, lineage="team-a") == {name: "prun-1" for name in fingerprints}
+    assert store.latest_run("Article Writing", lineage="team-a")["run_id"] == "prun-1"
+
+def test_expired_search_results_are_recomputed_downstream(tmp_path, monkeypatch):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    fingerprints = step_fingerprints(ARTICLE_PLAN, INPUTS)
+    graph = StepGraph.from_plan(ARTICLE_PLAN)
+    state = RunState(run_id="prun-1")
+    store.start_run("prun-1", state.root_id, "Article Writing", INPUTS, lineage="team-a")
+    for index, node in enumerate(graph.nodes):
+        state.enter_step(node.name)
+        kind = f"tool:{node.tool_id}" if node.tool_id else "llm"
+        store.call(state, kind, lambda name=node.name: name)
+        store.save_step("prun-1", index, node.name, node.name, fingerprints[node.name])
+    matches = store.find_steps("Article Writing", fingerprints, lineage="team-a")
+    ttls = {"search_tool": (60, 0)}
+    assert store.expired_steps(matches, ttls) == set()
+
+    later = time.time() + 120
+    monkeypatch.setattr("app.core.checkpoints.time.time", lambda: later)
+    expired = store.expired_steps(matches, ttls)
+    assert expired == {"research_topic_details", "analyze_top_content"}
+    assert fresh_matches(graph, matches, expired) == {}
+    report = diff_report(graph, {}, INPUTS, INPUTS, expired)
+    assert report[0] == {"step": "research_topic_details", "status": "recomputed", "expired": True}
@@ -0,0 +1,152 @@
+import threading
+from app.core.jobs import JobManager, JobStore, CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED
+from app.core.run_state import current_run
+
+def test_job_runs_and_persists_result(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    manager = JobManager(store, max_workers=2)
+    job = manager.submit("market-research", {"topic": "AI"}, lambda inputs: {"echo": inputs["topic"]})
+    assert job["status"] == QUEUED
+
+    finished = manager.wait(job["job_id"], timeout=5)
+    assert finished["status"] == SUCCEEDED
+    assert finished["result"] == {"echo": "AI"}
+
+    # A fresh store on the same file sees the persisted job
+    reopened = JobStore(str(tmp_path / "jobs.db"))
+    assert reopened.get(job["job_id"], include_result=True)["result"] == {"echo": "AI"}
+    manager.shutdown()
+
+def test_job_failure_is_recorded(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=1)
+
+    def boom(_):
+        raise ValueError("plan failed")
+
+    job = manager.submit("video-production", {}, boom)
+    finished = manager.wait(job["job_id"], timeout=5)
+    assert finished["status"] == FAILED
+    assert finished["error"] == "plan failed"
+    manager.shutdown()
+
+def test_job_queue_time_is_observed(tmp_path):
+    class Metrics:
+        def __init__(self):
+            self.queued = []
+
+        def observe_job_queue(self, kind, seconds):
+            self.queued.append((kind, seconds))
+
+    metrics = Metrics()
+    release = threading.Event()
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=1, metrics=metrics)
+    first = manager.submit("market-research", {}, lambda _: release.wait(5))
+    second = manager.submit("video-production", {}, lambda _: None)
+    release.set()
+    manager.wait(first["job_id"], timeout=5)
+    manager.wait(second["job_id"], timeout=5)
+    assert [kind for kind, _ in metrics.queued] == ["market-research", "video-production"]
+    # The second job waited for the only worker
+    assert metrics.queued[1][1] > 0
+    manager.shutdown()
+
+def test_cancel_queued_and_running_jobs(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=1)
+    started = threading.Event()
+
+    def long_running(_):
+        started.set()
+        state = current_run()
+        # Stand-in for the step-boundary check done by the Portia execution hook
+        while not state.cancel_event.wait(0.01):
+            pass
+        state.check_cancelled()
+
+    running = manager.submit("master-pipeline", {}, long_running)
+    queued = manager.submit("master-pipeline", {}, lambda _: "never runs")
+    assert started.wait(5)
+    assert manager.get(running["job_id"])["status"] == RUNNING
+
+    assert manager.cancel(queued["job_id"])["status"] == CANCELLED
+    assert manager.cancel(running["job_id"])["cancel_requested"] is True
+    assert manager.wait(running["job_id"], timeout=5)["status"] == CANCELLED
+    manager.shutdown()
+
+def test_interrupted_jobs_are_failed_on_restart(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job = store.create("podcast-production", {})
+    store.update(job["job_id"], status=RUNNING)
+
+    JobManager(JobStore(str(tmp_path / "jobs.db"))).shutdown()
+    assert store.get(job["job_id"])["status"] == FAILED
+
+def test_cancel_from_another_worker(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    owner = JobManager(JobStore(db), max_workers=1, cancel_poll_interval=0.05)
+    started = threading.Event()
+
+    def long_running(_):
+        started.set()
+        state = current_run()
+        while not state.cancel_event.wait(0.01):
+            pass
+        state.check_cancelled()
+
+    job = owner.submit("master-pipeline", {}, long_running)
+    assert started.wait(5)
+    # A second worker shares the store but must not fail the first one's running jobs
+    other = JobManager(JobStore(db), recover=False)
+    assert other.get(job["job_id"])["status"] == RUNNING
+    other.cancel(job["job_id"])
+    assert owner.wait(job["job_id"], timeout=5)["status"] == CANCELLED
+    owner.shutdown()
+    other.shutdown()
+
+def test_job_progress_events_stream(tmp_path):
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=1)
+
+    def run_with_steps(_):
+        state = current_run()
+        state.emit("step_started", step="analyze_google_trends")
+        state.emit("step_finished", step="analyze_google_trends", output="trends")
+        return {"ok": True}
+
+    job = manager.submit("market-research", {}, run_with_steps)
+    events = [e for e in manager.event_log(job["job_id"]).iter_events(heartbeat=1) if e is not None]
+    assert [e["event"] for e in events] == [
+        "job_queued", "job_started", "step_started", "step_finished", "job_finished"
+    ]
+    assert events[3]["output"] == "trends"
+    assert events[-1]["status"] == SUCCEEDED and events[-1]["result"] == {"ok": True}
+
+    # Resuming from a Last-Event-ID only replays later events
+    replay = [e["event"] for e in manager.event_log(job["job_id"]).iter_events(after=3) if e]
+    assert replay == ["step_finished", "job_finished"]
+    manager.shutdown()
+
+def test_events_stream_from_another_worker(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    owner = JobManager(JobStore(db), max_workers=1)
+    other = JobManager(JobStore(db), recover=False)
+    release = threading.Event()
+
+    def run_with_steps(_):
+        state = current_run()
+        state.emit("step_started", step="analyze_google_trends")
+        release.wait(5)
+        state.emit("step_finished", step="analyze_google_trends", output="trends")
+        return {"ok": True}
+
+    job = owner.submit("market-research", {}, run_with_steps)
+    log = other.event_log(job["job_id"])
+    log.poll_interval = 0.05
+    threading.Timer(0.2, release.set).start()
+    events = [e for e in log.iter_events(heartbeat=1) if e is not None]
+    assert [e["event"] for e in events] == [
+        "job_queued", "job_started", "step_started", "step_finished", "job_finished"
+    ]
+    assert events[-1]["result"] == {"ok": True}
+    assert [e["event"] for e in other.event_log(job["job_id"]).iter_events(after=3) if e] == ["step_finished", "job_finished"]
+    assert other.event_log("unknown") is None
+    owner.shutdown()
+    other.shutdown()
@@ -0,0 +1,38 @@
+from app.core.disk_cache import DiskCache
+from app.core.llm_cache import CompletionCache
+from app.core.run_state import RunState, bind_run
+
+MESSAGES = [{"role": "user", "content": "Summarize AI in healthcare"}]
+
+def identity(value):
+    return value
+
+def test_identical_prompts_hit_the_cache(tmp_path):
+    cache = CompletionCache(DiskCache(str(tmp_path)))
+    calls = []
+
+    def complete():
+        calls.append(1)
+        return {"role": "assistant", "content": "summary"}
+
+    first = cache.fetch("openai/gpt-4.1", MESSAGES, None, complete, identity, identity)
+    second = cache.fetch("openai/gpt-4.1", MESSAGES, None, complete, identity, identity)
+    assert first == second
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["hit_rate"] == 0.5
+
+def test_model_and_schema_are_part_of_the_key(tmp_path):
+    cache = CompletionCache(DiskCache(str(tmp_path)))
+    cache.fetch("openai/gpt-4.1", MESSAGES, None, lambda: "a", identity, identity)
+    assert cache.fetch("openai/gpt-4.1-mini", MESSAGES, None, lambda: "b", identity, identity) == "b"
+    assert cache.fetch("openai/gpt-4.1", MESSAGES, {"type": "object"}, lambda: "c", identity, identity) == "c"
+    assert cache.stats()["misses"] == 3
+
+def test_run_can_bypass_the_cache(tmp_path):
+    cache = CompletionCache(DiskCache(str(tmp_path)))
+    cache.fetch("openai/gpt-4.1", MESSAGES, None, lambda: "cached", identity, identity)
+    with bind_run(RunState(llm_cache_bypass=True)):
+        assert cache.fetch("openai/gpt-4.1", MESSAGES, None, lambda: "fresh", identity, identity) == "fresh"
+    assert cache.stats()["bypassed"] == 1
+    # Bypassed completions are not written back
+    assert cache.fetch("openai/gpt-4.1", MESSAGES, None, lambda: "other", identity, identity) == "cached"
@@ -0,0 +1,50 @@
+import threading
+from app.core.disk_cache import DiskCache
+from app.core.map_reduce import MapReduceSummarizer, chunk_text
+
+PAGE = "\n\n".join(f"Paragraph {i} about AI diagnostics in radiology with figure {i * 7}%." for i in range(200))
+
+def fake_model(calls):
+    lock = threading.Lock()
+    def summarize(prompt):
+        with lock:
+            calls.append(prompt)
+        return f"summary {len(calls)}"
+    return summarize
+
+def test_chunks_overlap_and_respect_size():
+    chunks = chunk_text(PAGE, chunk_tokens=200, overlap_tokens=20)
+    assert len(chunks) > 5
+    assert all(len(chunk) <= 200 * 4 for chunk in chunks)
+    assert "Paragraph 199" in chunks[-1]
+    # Each chunk starts with the end of the previous one
+    assert chunks[1].split("\n\n")[0] in chunks[0]
+
+def test_map_reduce_keeps_result_shape_and_caches_chunks(tmp_path):
+    calls = []
+    summarizer = MapReduceSummarizer(
+        fake_model(calls), model_key="fake", cache=DiskCache(str(tmp_path / "cache")),
+        max_workers=4, chunk_tokens=200, overlap_tokens=20, fan_in=3,
+    )
+    document = {"results": [
+        {"url": "https://example.com/long", "title": "Long", "raw_content": PAGE},
+        {"url": "https://example.com/short", "title": "Short", "raw_content": "Short page."},
+    ]}
+    summarized = summarizer.summarize_document(document, "Summarize radiology evidence")
+    assert [r["url"] for r in summarized["results"]] == ["https://example.com/long", "https://example.com/short"]
+    assert summarized["results"][0]["content"].startswith("summary")
+    assert summarized["results"][1]["content"] == "Short page."
+    chunks = len(chunk_text(PAGE, 200, 20))
+    # One map call per chunk, then ceil(n / 3) reduce calls per level down to one
+    expected, level = chunks, chunks
+    while level > 1:
+        level = -(-level // 3)
+        expected += level
+    assert len(calls) == expected and summarizer.stats()["completions"] == expected
+
+    # Running again is served entirely from the per-chunk cache
+    again = summarizer.summarize_document(document, "Summarize radiology evidence")
+    assert again == summarized and len(calls) == expected
+    assert summarizer.stats()["cache_hits"] == expected
+
+    assert summarizer.summarize_document("A short note.") == "A short note."
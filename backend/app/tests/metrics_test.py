@@ -0,0 +1,23 @@
+import pytest
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+from app.core.metrics import Metrics, create_metrics
+
+def test_metrics_exposition():
+    metrics = Metrics(input_cost_per_1k=0.01, output_cost_per_1k=0.03)
+    metrics.observe_step("Market Research & Trend Analysis Pipeline", "analyze_google_trends", "InvokeToolStep", "search_tool", 1.5)
+    metrics.observe_llm("openai/gpt-4o", "synthesize_research", 4.0, tokens_in=2000, tokens_out=500)
+    metrics.observe_job_queue("market-research", 0.2)
+    metrics.error("Market Research & Trend Analysis Pipeline", "synthesize_research", "step")
+    body, content_type = metrics.exposition()
+    text = body.decode()
+    assert content_type.startswith("text/plain")
+    assert 'portia_step_duration_seconds_count{kind="InvokeToolStep",plan="Market Research & Trend Analysis Pipeline",step="analyze_google_trends",tool="search_tool"} 1.0' in text
+    assert 'portia_llm_tokens_sum{direction="in",model="openai/gpt-4o",step="synthesize_research"} 2000.0' in text
+    assert 'portia_llm_cost_usd_total{model="openai/gpt-4o",step="synthesize_research"} 0.035' in text
+    assert 'portia_errors_total{plan="Market Research & Trend Analysis Pipeline",source="step",step="synthesize_research"} 1.0' in text
+
+def test_metrics_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("PORTIA_METRICS", "0")
+    assert create_metrics() is None
@@ -0,0 +1,85 @@
+import threading
+import pytest
+from app.core.events import EventLog
+from app.core.phases import Phase, pick, run_phases
+from app.core.run_state import RunState, bind_run, current_run
+
+def test_pick_follows_attribute_key_and_index_paths():
+    class Plan:
+        recommended_angles = ["case studies", "myths"]
+
+    assert pick(Plan(), "recommended_angles[1]") == "myths"
+    assert pick({"main_article": {"title": "AI"}}, "main_article.title") == "AI"
+    assert pick({"main_article": None}, "main_article.title") is None
+    assert pick(None, "target_keywords") is None
+
+def test_independent_branches_overlap_and_dependencies_wait():
+    # Video only needs the inputs, so it must be running while the article is written
+    article_started = threading.Event()
+    video_started = threading.Event()
+    seen_inputs = {}
+
+    def execute(plan, plan_inputs):
+        seen_inputs[plan] = plan_inputs
+        current_run().artifacts.append({"path": f"{plan}.json"})
+        if plan == "article":
+            article_started.set()
+            assert video_started.wait(5)
+        if plan == "video":
+            video_started.set()
+            assert article_started.wait(5)
+        return {"main_article": f"{plan} output"}
+
+    phases = [
+        Phase("article", plan=lambda: "article", inputs=lambda i, o: {"topic": i["topic"]}),
+        Phase("fact_check", plan=lambda: "fact_check",
+              inputs=lambda i, o: {"content": pick(o["article"], "main_article")}, depends_on=("article",)),
+        Phase("podcast", plan=lambda: "podcast", inputs=lambda i, o: {}, depends_on=("article",),
+              enabled=lambda i: "podcast" in i["formats"]),
+        Phase("video", plan=lambda: "video", inputs=lambda i, o: {}),
+    ]
+    with bind_run(RunState()) as state:
+        report = run_phases(phases, {"topic": "AI", "formats": ["article", "video"]}, execute)
+
+    assert seen_inputs["fact_check"] == {"content": "article output"}
+    assert report.timings["podcast"] == {"status": "skipped"}
+    assert report.timings["video"]["status"] == "succeeded"
+    assert "podcast" not in report.outputs
+    assert sorted(a["path"] for a in state.artifacts) == ["article.json", "fact_check.json", "video.json"]
+    summary = report.summary()
+    assert summary["wall_time"] <= summary["sum_of_phases"] + 0.05
+
+def test_failed_phase_stops_dependents():
+    def execute(plan, plan_inputs):
+        if plan == "research":
+            raise RuntimeError("search quota exceeded")
+        return plan
+
+    ran = []
+    phases = [
+        Phase("research", plan=lambda: "research", inputs=lambda i, o: {}),
+        Phase("planning", plan=lambda: ran.append("planning"), inputs=lambda i, o: {}, depends_on=("research",)),
+    ]
+    with pytest.raises(RuntimeError, match="quota"):
+        run_phases(phases, {}, execute)
+    assert ran == []
+
+def test_failed_phase_keeps_its_timing():
+    def execute(plan, plan_inputs):
+        raise RuntimeError("search quota exceeded")
+
+    events = EventLog("job-1")
+    with bind_run(RunState(events=events)):
+        with pytest.raises(RuntimeError):
+            run_phases([Phase("research", plan=lambda: "research", inputs=lambda i, o: {})], {}, execute)
+    events.close()
+    failed = [event for event in events.iter_events() if event["event"] == "phase_failed"]
+    assert failed[0]["phase"] == "research" and failed[0]["duration"] >= 0 and "phase_run_id" in failed[0]
+
+def test_enabled_phase_cannot_depend_on_a_disabled_one():
+    phases = [
+        Phase("article", plan=lambda: "article", inputs=lambda i, o: {}, enabled=lambda i: False),
+        Phase("podcast", plan=lambda: "podcast", inputs=lambda i, o: {}, depends_on=("article",)),
+    ]
+    with pytest.raises(ValueError, match="disabled"):
+        run_phases(phases, {}, lambda plan, plan_inputs: plan)
@@ -0,0 +1,36 @@
+import uuid
+from app.core.plan_registry import PlanRegistry, plan_hash
+from app.tests.scheduler_test import Input, InvokeToolStep, LLMStep, Plan, StepOutput
+
+def build_research_plan(query_suffix="trends"):
+    plan = Plan(
+        InvokeToolStep("analyze_google_trends", "search_tool", {"search_query": f"{Input('topic')} {query_suffix}"}),
+        LLMStep("synthesize_research", "Summarize", [StepOutput("analyze_google_trends")]),
+    )
+    plan.id = uuid.uuid4()  # every build gets a new id, like PlanV2
+    plan.label = "Market Research & Trend Analysis Pipeline"
+    return plan
+
+def test_plans_are_built_once_and_shared():
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return build_research_plan()
+
+    registry = PlanRegistry({"market-research": factory})
+    plan = registry.get("market-research")
+    assert registry.get("market-research") is plan
+    assert len(builds) == 1
+    assert registry.lookup(plan).graph.names == ["analyze_google_trends", "synthesize_research"]
+    assert registry.by_label("Market Research & Trend Analysis Pipeline").plan is plan
+    assert registry.describe()[0]["hash"] == plan_hash(plan)
+
+def test_plan_hash_tracks_definition_not_build():
+    assert plan_hash(build_research_plan()) == plan_hash(build_research_plan())
+    assert plan_hash(build_research_plan()) != plan_hash(build_research_plan("industry report"))
+
+def test_registered_plans_carry_their_prompt_budget():
+    registry = PlanRegistry({"market-research": build_research_plan}, budgets={"market-research": lambda: "budget"})
+    assert registry.entry("market-research").budget == "budget"
+    assert PlanRegistry({"market-research": build_research_plan}).entry("market-research").budget is None
@@ -0,0 +1,68 @@
+import json
+import sys
+import tracemalloc
+
+from app.core.profiling import PLAN_RUNS, REQUESTS, Profiler, collapse, create_profiler
+
+def busy_work():
+    # CPU-bound loop plus allocations that stay alive until the session ends
+    blocks = [bytearray(64 * 1024) for _ in range(32)]
+    total = 0
+    for i in range(100_000):
+        total += i * i
+    return blocks, total
+
+def test_session_writes_flamegraph_files(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), interval=0.001)
+    with profiler.session("request", "POST /api/market-research") as session:
+        kept = busy_work()
+    summary = session.summary
+    assert summary["name"].endswith("-request-POST_api_market-research")
+    assert summary["samples"] > 0
+    assert summary["allocated_bytes"] >= 32 * 64 * 1024
+    assert any("profiling_test.py" in entry["line"] for entry in summary["top_allocations"])
+    files = {path.name for path in tmp_path.iterdir()}
+    for suffix in ("cpu.folded", "wall.folded", "alloc.folded", "tracemalloc", "json"):
+        assert f"{summary['name']}.{suffix}" in files
+    wall = (tmp_path / f"{summary['name']}.wall.folded").read_text().splitlines()
+    stack, count = wall[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+    assert any("busy_work (tests/profiling_test.py:" in line for line in wall)
+    assert json.loads((tmp_path / f"{summary['name']}.json").read_text())["kind"] == "request"
+    assert profiler.recent()["profiles"][0]["name"] == summary["name"]
+    # tracemalloc is stopped once the last session closes
+    assert not tracemalloc.is_tracing()
+    del kept
+
+def test_armed_profiles_are_consumed():
+    profiler = Profiler()
+    assert not profiler.take(REQUESTS)
+    assert profiler.arm(requests=2, plan_runs=1) == {REQUESTS: 2, PLAN_RUNS: 1}
+    assert profiler.take(REQUESTS) and profiler.take(REQUESTS)
+    assert not profiler.take(REQUESTS)
+    assert profiler.take(PLAN_RUNS)
+
+def test_plan_run_inside_profiled_request_is_not_profiled_again(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), interval=0.001)
+    with profiler.session("request", "GET /") as outer:
+        with profiler.plan_run("Market Research", requested=True) as inner:
+            assert inner is None
+    assert outer.summary is not None
+    with profiler.plan_run("Market Research") as unrequested:
+        assert unrequested is None
+    with profiler.plan_run("Market Research", requested=True) as requested:
+        pass
+    assert requested.summary["kind"] == "plan_run"
+
+def test_token_is_checked():
+    assert Profiler().authorized(None)
+    profiler = Profiler(token="secret")
+    assert not profiler.authorized(None)
+    assert profiler.authorized("secret")
+
+def test_collapse_is_root_first():
+    assert collapse(sys._getframe()).split(";")[-1].startswith("test_collapse_is_root_first (tests/profiling_test.py:")
+
+def test_profiling_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("PORTIA_PROFILING", raising=False)
+    assert create_profiler() is None
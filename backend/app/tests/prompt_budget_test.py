@@ -0,0 +1,36 @@
+from app.core.prompt_budget import MIDDLE, SUMMARIZE, InputCap, PromptBudget, PromptBudgeter
+
+SCRIPT = "HOST: Welcome to the show. " + "We talk about AI diagnostics in radiology. " * 400 + "HOST: Thanks for listening."
+
+def render(script, topic="AI in radiology"):
+    return f"Create show notes.\nScript: {script}\nEpisode topic: {topic}\nTask data: {script}"
+
+def test_caps_each_rendering_of_an_input():
+    budget = PromptBudget(steps={"generate_show_notes": {"create_podcast_script": InputCap(500, MIDDLE)}})
+    budgeter = PromptBudgeter(default=InputCap(100_000))
+    [content], report = budgeter.apply(
+        [render(SCRIPT)], {"create_podcast_script": SCRIPT, "episode_topic": "AI in radiology"},
+        budget=budget, plan="Podcast Production Pipeline", step="generate_show_notes",
+    )
+    assert SCRIPT not in content and content.count("tokens omitted") == 2
+    assert "Welcome to the show" in content and "Thanks for listening" in content
+    assert report["budgeted_tokens"] < report["prompt_tokens"]
+    assert report["inputs"]["create_podcast_script"]["policy"] == MIDDLE
+    [stats] = budgeter.stats()
+    assert stats["step"] == "generate_show_notes" and stats["calls"] == 1 and stats["capped_inputs"] == 1
+
+def test_global_default_and_summarize_policy():
+    condensed = []
+    budgeter = PromptBudgeter(default=InputCap(300), condense=lambda text, tokens: condensed.append(tokens) or "Short summary.")
+    budget = PromptBudget(steps={"final_approval_gate": {"*": InputCap(200, SUMMARIZE)}})
+    phase = {"article": SCRIPT}
+    [content], report = budgeter.apply(
+        [f"Article: {phase}"], {"article_creation_phase": phase}, budget=budget, step="final_approval_gate"
+    )
+    assert content == "Article: Short summary." and condensed == [200]
+    # Steps without a declared cap fall back to the global default (truncate)
+    [content], _ = budgeter.apply([render(SCRIPT)], {"create_podcast_script": SCRIPT}, budget=budget, step="other")
+    assert "truncated" in content and len(content) < len(render(SCRIPT)) // 4
+    # Values that fit, or are not found in the prompt, are left alone
+    [content], report = budgeter.apply(["Unrelated prompt"], {"create_podcast_script": SCRIPT}, step="other")
+    assert content == "Unrelated prompt" and report["inputs"] == {}
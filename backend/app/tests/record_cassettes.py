@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Record or replay cassettes of the plan test scenarios.
+
+    python -m app.tests.record_cassettes record                  # real services, writes cassettes/
+    python -m app.tests.record_cassettes replay --latency zero   # offline, from cassettes/
+    python -m app.tests.record_cassettes replay market-research fact-checking
+
+Runs each plan with its "AI in Healthcare" inputs from app/agents/scenarios.py
+and prints the wall time and cassette counters of every run.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from app.agents.scenarios import SCENARIOS
+
+PLANS = sorted(name for name in SCENARIOS if name != "master-pipeline")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("plans", nargs="*", default=PLANS, help="plan registry names (default: all)")
+    parser.add_argument("--latency", default="original", help='replay latency: "original", "zero" or a factor')
+    parser.add_argument("--dir", default=os.getenv("PORTIA_CASSETTE_DIR", "cassettes"))
+    parser.add_argument("--strict", action="store_true", help="fail on calls missing from the cassette")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.plans) - set(PLANS))
+    if unknown:
+        parser.error(f"unknown plans: {', '.join(unknown)}")
+
+    # The client reads its configuration when it is created
+    os.environ["PORTIA_CASSETTE_MODE"] = args.mode
+    os.environ["PORTIA_CASSETTE_DIR"] = args.dir
+    os.environ["PORTIA_CASSETTE_LATENCY"] = args.latency
+    os.environ["PORTIA_CASSETTE_STRICT"] = "1" if args.strict else "0"
+    from app.core.events import EventLog
+    from app.core.portia_client import PortiaClient
+    from app.core.run_state import RunState, bind_run
+
+    client = PortiaClient()
+    failed = 0
+    for name in args.plans:
+        events = EventLog(name)
+        started = time.perf_counter()
+        try:
+            with bind_run(RunState(events=events)):
+                plan_run = client.execute(client.plans.get(name), SCENARIOS[name])
+            status = str(getattr(plan_run.state, "value", plan_run.state)).lower()
+        except Exception as e:
+            status = f"error: {e}"
+        elapsed = time.perf_counter() - started
+        events.close()
+        stats = next((event for event in events.iter_events() if event["event"].startswith("cassette_")), {})
+        failed += status != "complete"
+        icon = "✅" if status == "complete" else "❌"
+        print(
+            f"{icon} {name:<26} {elapsed:8.2f}s  {status:<10} "
+            f"calls={stats.get('interactions', 0)} replayed={stats.get('replayed', 0)} "
+            f"misses={stats.get('misses', 0)} recorded_ms={stats.get('recorded_ms', 0)}  {stats.get('path', '')}"
+        )
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,39 @@
+import gzip
+import json
+from flask import Flask, jsonify
+from app.core.responses import FastJSONProvider, compress, dumps, parse_fields, project
+
+PLAN_RUN = {
+    "id": "prun-1",
+    "state": "COMPLETE",
+    "outputs": {"final_output": {"value": {"summary": "AI in healthcare"}}, "step_outputs": {"$a": "x" * 5000}},
+}
+
+def test_project_keeps_requested_paths():
+    body = {"result": PLAN_RUN, "run_id": "prun-1", "research_reports": []}
+    assert project(body, parse_fields("outputs.final_output, run_id")) == {
+        "result": {"outputs": {"final_output": {"value": {"summary": "AI in healthcare"}}}},
+        "run_id": "prun-1",
+    }
+    assert project(body, ["result.state", "missing.path"]) == {"result": {"state": "COMPLETE"}}
+
+def test_project_indexes_lists_like_pick():
+    body = {"result": {"outputs": {"sources": [{"url": "a", "title": "A"}, {"url": "b", "title": "B"}]}}}
+    assert project(body, ["outputs.sources[1].url", "outputs.sources[0].title"]) == {
+        "result": {"outputs": {"sources": [{"title": "A"}, {"url": "b"}]}}
+    }
+
+def test_results_are_encoded_once_and_compressed():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    with app.test_request_context():
+        response = jsonify({"result": PLAN_RUN})
+        # Structured, not a JSON string nested inside JSON
+        assert json.loads(response.get_data())["result"]["state"] == "COMPLETE"
+        compress(response, "gzip, deflate", min_bytes=1024)
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.get_data())) == {"result": PLAN_RUN}
+
+        small = compress(jsonify({"ok": True}), "gzip", min_bytes=1024)
+        assert "Content-Encoding" not in small.headers
+    assert json.loads(dumps({"when": {1, 2}, 3: "x"})) in ({"when": [1, 2], "3": "x"}, {"when": [2, 1], "3": "x"})
@@ -0,0 +1,133 @@
+import threading
+from app.core.run_state import RunState, current_run
+from app.core.scheduler import StepGraph, StepScheduler
+
+class Input:
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f"{{{{ Input('{self.name}') }}}}"
+
+class StepOutput:
+    def __init__(self, step):
+        self.step = step
+
+class InvokeToolStep:
+    def __init__(self, step_name, tool, args):
+        self.step_name, self.tool, self.args = step_name, tool, args
+        self.conditional_block = None
+
+class LLMStep:
+    def __init__(self, step_name, task, inputs):
+        self.step_name, self.task, self.inputs = step_name, task, inputs
+        self.conditional_block = None
+
+class Plan:
+    def __init__(self, *steps):
+        self.steps = list(steps)
+
+RESEARCH_PLAN = Plan(
+    InvokeToolStep("analyze_google_trends", "search_tool", {"search_query": f"{Input('topic')} trends"}),
+    InvokeToolStep("find_industry_reports", "search_tool", {"search_query": f"{Input('topic')} industry report"}),
+    LLMStep("synthesize_research", "Summarize", [StepOutput("analyze_google_trends"), StepOutput(1)]),
+    InvokeToolStep("search_followups", "search_tool", {"search_query": StepOutput("synthesize_research")}),
+    LLMStep("generate_show_notes", "Notes", [StepOutput("synthesize_research")]),
+    LLMStep("create_chapter_markers", "Chapters", [StepOutput("synthesize_research")]),
+)
+
+def test_graph_levels_group_independent_steps():
+    graph = StepGraph.from_plan(RESEARCH_PLAN)
+    assert graph.levels() == [
+        ["analyze_google_trends", "find_industry_reports"],
+        ["synthesize_research"],
+        ["search_followups", "generate_show_notes", "create_chapter_markers"],
+    ]
+    assert graph.nodes[0].inputs == {"topic"}
+
+class ConcurrentSearch:
+    """Search whose first two calls only return once both are in flight."""
+
+    def __init__(self):
+        self.calls = []
+        self.together = threading.Barrier(2, timeout=5)
+
+    def run(self, ctx, search_query):
+        self.calls.append(search_query)
+        if len(self.calls) <= 2:
+            self.together.wait()
+        return f"results for {search_query}"
+
+class Registry:
+    def __init__(self, tool):
+        self.tool = tool
+
+    def get_tool(self, tool_id):
+        return self.tool
+
+def engine_call(schedule, search, step, search_query):
+    # What LookaheadTool does for the engine's call of a step
+    return schedule.run(step, "search_tool", {"search_query": search_query}, lambda: search.run(None, search_query))
+
+def test_independent_tool_steps_run_ahead_concurrently():
+    search = ConcurrentSearch()
+    schedule = StepScheduler(Registry(search), max_parallel=4).start(RESEARCH_PLAN, {"topic": "AI"}, ctx=None)
+    assert schedule.prefetched == ["analyze_google_trends", "find_industry_reports"]
+
+    # The engine's own calls take the look-ahead runs instead of repeating them
+    first = engine_call(schedule, search, "analyze_google_trends", "AI trends")
+    second = engine_call(schedule, search, "find_industry_reports", "AI industry report")
+    assert (first, second) == ("results for AI trends", "results for AI industry report")
+    assert len(search.calls) == 2
+
+    # Steps that depend on an output start once the engine reports it
+    schedule.step_finished("analyze_google_trends", first)
+    schedule.step_finished("find_industry_reports", second)
+    schedule.step_finished("synthesize_research", "agentic care")
+    assert schedule.prefetched[-1] == "search_followups"
+    assert engine_call(schedule, search, "search_followups", "agentic care") == "results for agentic care"
+    assert len(search.calls) == 3
+    # Different arguments than the look-ahead run (or no look-ahead run): the engine calls the tool itself
+    assert engine_call(schedule, search, "search_followups", "agentic care") == "results for agentic care"
+    assert len(search.calls) == 4
+    schedule.close()
+
+def test_replayed_and_side_effecting_steps_are_not_run_ahead():
+    plan = Plan(
+        InvokeToolStep("analyze_google_trends", "search_tool", {"search_query": f"{Input('topic')} trends"}),
+        InvokeToolStep("find_industry_reports", "search_tool", {"search_query": f"{Input('topic')} industry report"}),
+        InvokeToolStep("save_research_report", "file_writer_tool", {"filename": f"{Input('topic')}.json"}),
+    )
+    class Search:
+        def run(self, ctx, search_query):
+            return f"results for {search_query}"
+
+    schedule = StepScheduler(Registry(Search()), max_parallel=4).start(
+        plan, {"topic": "AI"}, ctx=None, skip={"analyze_google_trends"}
+    )
+    assert schedule.prefetched == ["find_industry_reports"]
+    schedule.close()
+
+def test_lookahead_calls_are_attributed_to_their_own_step():
+    class Search:
+        def __init__(self):
+            self.steps = {}
+
+        def run(self, ctx, search_query):
+            state = current_run()
+            self.steps[search_query] = (state, state.current_step)
+            return f"results for {search_query}"
+
+    search = Search()
+    state = RunState()
+    state.enter_step("intro")
+    schedule = StepScheduler(Registry(search), max_parallel=4).start(RESEARCH_PLAN, {"topic": "AI"}, ctx=None, state=state)
+    engine_call(schedule, search, "analyze_google_trends", "AI trends")
+    engine_call(schedule, search, "find_industry_reports", "AI industry report")
+    assert search.steps == {
+        "AI trends": (state, "analyze_google_trends"),
+        "AI industry report": (state, "find_industry_reports"),
+    }
+    # The engine's own step is untouched
+    assert state.current_step == "intro"
+    schedule.close()
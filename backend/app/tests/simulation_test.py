@@ -0,0 +1,145 @@
+import random
+
+import pytest
+
+from app.agents.scenarios import SCENARIOS
+from app.core.simulation import (
+    CallProfile,
+    Distribution,
+    SimulatedFailure,
+    SimulationConfig,
+    Simulator,
+    create_simulator,
+    get_simulator,
+    simulated_path,
+    synthesize,
+)
+from app.schema.content_schemas import FinalContentOutput, PodcastPackage, ResearchSummary
+
+def test_distributions():
+    rng = random.Random(1)
+    assert Distribution.parse(250).sample(rng) == 250
+    assert Distribution.parse("fixed:10").sample(rng) == 10
+    uniform = Distribution.parse("uniform:5,10")
+    assert all(5 <= uniform.sample(rng) <= 10 for _ in range(100))
+    lognormal = Distribution.parse("lognormal:1000,0.5")
+    samples = sorted(lognormal.sample(rng) for _ in range(2001))
+    assert 800 < samples[1000] < 1250
+    assert all(Distribution.parse("normal:0,5").sample(rng) >= 0 for _ in range(100))
+    with pytest.raises(ValueError):
+        Distribution.parse("pareto:1,2")
+
+def test_calls_are_seeded_by_tool_and_arguments():
+    slept = []
+    first = Simulator(SimulationConfig(seed=7), sleep=slept.append)
+    second = Simulator(SimulationConfig(seed=7), sleep=slept.append)
+    args = {"search_query": "AI in Healthcare trends"}
+    result = first.tool("search_tool", args)
+    assert second.tool("search_tool", args) == result
+    assert slept[0] == slept[1] > 0
+    # Repeated calls with the same arguments draw new values
+    assert first.tool("search_tool", args) != result
+    assert Simulator(SimulationConfig(seed=8), sleep=slept.append).tool("search_tool", args) != second.tool("search_tool", args)
+
+def test_tool_payloads_have_the_real_shapes():
+    simulator = Simulator(SimulationConfig(latency_scale=0))
+    search = simulator.tool("search_tool", {"search_query": "AI in Healthcare"})
+    assert search["results"] and all(result["url"].startswith("https://") for result in search["results"])
+    assert 3000 < sum(len(result["content"]) for result in search["results"]) < 30000
+    extract = simulator.tool("extract_tool", {"urls": ["https://a.example.com", "https://b.example.com"]})
+    assert [result["url"] for result in extract["results"]] == ["https://a.example.com", "https://b.example.com"]
+    crawl = simulator.tool("crawl_tool", {"url": "https://medicalfuturist.com", "max_depth": 2})
+    assert all(result["url"].startswith("https://medicalfuturist.com/") for result in crawl["results"])
+    video = simulator.tool("portia:mcp:mcp.invideo.io:generate_video_from_script", {"script": "..."})
+    assert "https://ai.invideo.io/watch/" in video["content"][0]["text"]
+    assert simulator.stats()["calls"] == 4
+
+def test_failure_injection():
+    config = SimulationConfig(latency_scale=0)
+    config.profiles["search_tool"] = CallProfile(failure_rate=1.0)
+    simulator = Simulator(config)
+    with pytest.raises(SimulatedFailure):
+        simulator.tool("search_tool", {"search_query": "x"})
+    simulator.tool("extract_tool", {"urls": "https://example.com"})
+    config.failure_rate = 0.5
+    outcomes = []
+    for n in range(200):
+        try:
+            simulator.tool("crawl_tool", {"url": f"https://example.com/{n}"})
+            outcomes.append(True)
+        except SimulatedFailure:
+            outcomes.append(False)
+    assert 60 < outcomes.count(False) < 140
+    assert simulator.stats()["failures"] == 1 + outcomes.count(False)
+
+def test_structured_outputs_validate():
+    simulator = Simulator(SimulationConfig(latency_scale=0))
+    for schema in (ResearchSummary, PodcastPackage, FinalContentOutput):
+        schema.model_validate(simulator.structured("Summarize AI in Healthcare research", schema))
+    data = synthesize(ResearchSummary, random.Random(3), size=20000)
+    assert len(str(data)) > len(str(synthesize(ResearchSummary, random.Random(3), size=2000)))
+
+def test_config_file(tmp_path, monkeypatch):
+    path = tmp_path / "simulation.json"
+    path.write_text('{"seed": 3, "latency_scale": 1, "tools": {"mcp": {"latency_ms": 50, "failure_rate": 0.2}}, "llm": {"size_bytes": "uniform:100,200"}}')
+    monkeypatch.setenv("PORTIA_SIMULATE", "1")
+    monkeypatch.setenv("PORTIA_SIM_CONFIG", str(path))
+    monkeypatch.setenv("PORTIA_SIM_LATENCY_SCALE", "0")
+    simulator = create_simulator()
+    assert simulator.config.seed == 3
+    assert simulator.config.latency_scale == 0
+    notion = simulator.profile("portia:mcp:mcp.notion.com:notion_create_pages")
+    assert notion.latency_ms == Distribution("fixed", 50) and notion.failure_rate == 0.2
+    assert 100 <= len(simulator.completion("hello")) <= 200
+    monkeypatch.delenv("PORTIA_SIMULATE")
+    assert create_simulator() is None
+
+@pytest.fixture
+def offline_client(tmp_path, monkeypatch):
+    pytest.importorskip("portia")
+    monkeypatch.setenv("PORTIA_SIMULATE", "1")
+    monkeypatch.setenv("PORTIA_SIM_LATENCY_SCALE", "0")
+    monkeypatch.chdir(tmp_path)
+    from app.core.portia_client import PortiaClient, base_tool_registry
+
+    get_simulator.cache_clear()
+    base_tool_registry.cache_clear()
+    yield PortiaClient()
+    get_simulator.cache_clear()
+    base_tool_registry.cache_clear()
+
+@pytest.mark.parametrize("name", sorted(name for name in SCENARIOS if name != "master-pipeline"))
+def test_plans_run_offline(offline_client, name):
+    plan = offline_client.plans.get(name)
+    plan_run = offline_client.execute(plan, SCENARIOS[name])
+    assert str(getattr(plan_run.state, "value", plan_run.state)).lower() == "complete"
+    assert offline_client.simulator.stats()["calls"] > 0
+
+def test_master_pipeline_runs_offline(offline_client):
+    from app import agents
+
+    inputs = SCENARIOS["master-pipeline"]
+    phases = offline_client.run_phases(agents.create_master_phases(), inputs)
+    assert all(timing["status"] == "succeeded" for timing in phases.timings.values())
+    plan = offline_client.plans.get("master-finalization")
+    plan_run = offline_client.execute(plan, agents.master_finalization_inputs(inputs, phases.outputs))
+    assert plan_run.outputs.final_output is not None
+
+def test_simulated_runs_keep_their_state_apart(monkeypatch, tmp_path):
+    from app.core.checkpoints import create_checkpoint_store
+
+    monkeypatch.setenv("PORTIA_SIMULATE", "0")
+    monkeypatch.delenv("PORTIA_CASSETTE_MODE", raising=False)
+    get_simulator.cache_clear()
+    assert simulated_path("cache/tools") == "cache/tools"
+
+    monkeypatch.setenv("PORTIA_SIMULATE", "1")
+    get_simulator.cache_clear()
+    try:
+        assert simulated_path("cache/tools") == "cache/simulated/tools"
+        monkeypatch.setenv("PORTIA_CHECKPOINT_DB", str(tmp_path / "checkpoints" / "checkpoints.db"))
+        create_checkpoint_store()
+        assert (tmp_path / "checkpoints" / "simulated" / "checkpoints.db").exists()
+        assert not (tmp_path / "checkpoints" / "checkpoints.db").exists()
+    finally:
+        get_simulator.cache_clear()
@@ -0,0 +1,55 @@
+import os
+import time
+from app.core.disk_cache import DiskCache
+from app.core.tool_cache import ToolResultCache, cache_key
+
+def test_normalized_args_share_a_cache_entry(tmp_path):
+    cache = ToolResultCache(DiskCache(str(tmp_path)))
+    calls = []
+
+    def search():
+        calls.append(1)
+        return {"results": ["AI in healthcare trends"]}
+
+    first = cache.fetch("search_tool", {"search_query": "AI  in healthcare trends "}, search)
+    second = cache.fetch("search_tool", {"search_query": "AI in healthcare trends"}, search)
+    assert first == second == {"results": ["AI in healthcare trends"]}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_stale_while_revalidate(tmp_path):
+    cache = ToolResultCache(DiskCache(str(tmp_path)), ttls={"search_tool": (0, 60)})
+    cache.fetch("search_tool", {"search_query": "q"}, lambda: "old")
+    time.sleep(0.01)
+
+    # Stale entry is served immediately and refreshed in the background
+    assert cache.fetch("search_tool", {"search_query": "q"}, lambda: "new") == "old"
+    deadline = time.time() + 5
+    while cache.stats()["refreshes"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.store.get(cache_key("search_tool", {"search_query": "q"})).value == "new"
+
+def test_expired_entries_are_recomputed(tmp_path):
+    cache = ToolResultCache(DiskCache(str(tmp_path)), ttls={"crawl_tool": (0, 0)})
+    cache.fetch("crawl_tool", {"url": "https://medicalfuturist.com"}, lambda: "v1")
+    time.sleep(0.01)
+    assert cache.fetch("crawl_tool", {"url": "https://medicalfuturist.com"}, lambda: "v2") == "v2"
+
+def test_disk_cache_lru_eviction(tmp_path):
+    values = {name: os.urandom(300).hex() for name in "abc"}
+    store = DiskCache(str(tmp_path), max_bytes=900)
+    store.set("a", values["a"])
+    store.set("b", values["b"])
+    time.sleep(0.01)
+    assert store.get("a") is not None  # touch "a" so "b" is least recently used
+    store.set("c", values["c"])
+    assert store.get("b") is None
+    assert store.get("a").value == values["a"] and store.get("c").value == values["c"]
+
+def test_disk_cache_stores_identical_values_once(tmp_path):
+    store = DiskCache(str(tmp_path))
+    store.set("first", {"results": [1, 2, 3]})
+    store.set("second", {"results": [1, 2, 3]})
+    assert len([p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]) == 1
+    store.delete("first")
+    assert store.get("second").value == {"results": [1, 2, 3]}
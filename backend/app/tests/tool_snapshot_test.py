@@ -0,0 +1,40 @@
+import json
+import time
+from types import SimpleNamespace
+from app.core.tool_snapshot import ToolSnapshot, tool_metadata
+
+class SearchArgs:
+    @staticmethod
+    def model_json_schema():
+        return {"properties": {"search_query": {"type": "string"}}, "required": ["search_query"]}
+
+def fake_tool(tool_id):
+    return SimpleNamespace(
+        id=tool_id, name=tool_id, description=f"{tool_id} tool", args_schema=SearchArgs, output_schema=("str", "result")
+    )
+
+def test_snapshot_routes_tools_to_their_source(tmp_path):
+    path = str(tmp_path / "tools.json")
+    snapshot = ToolSnapshot(path, config={"key": "a"})
+    snapshot.save("open_source", [tool_metadata(fake_tool("search_tool"))])
+    assert snapshot.tools(["open_source", "portia"]) is None
+
+    snapshot.save("portia", [tool_metadata(fake_tool("portia:mcp:mcp.notion.com:notion_create_pages"))])
+    warm = ToolSnapshot(path, config={"key": "a"})
+    assert warm.owner("search_tool") == "open_source"
+    assert warm.owner("portia:mcp:mcp.notion.com:notion_create_pages") == "portia"
+    assert warm.owner("unknown_tool") is None
+    tools = warm.tools(["open_source", "portia"])
+    assert [tool["id"] for tool in tools] == ["search_tool", "portia:mcp:mcp.notion.com:notion_create_pages"]
+    assert tools[0]["args_schema"]["required"] == ["search_query"]
+
+def test_snapshot_ignores_stale_or_foreign_entries(tmp_path):
+    path = tmp_path / "tools.json"
+    ToolSnapshot(str(path), config={"key": "a"}).save("portia", [tool_metadata(fake_tool("portia:x"))])
+    assert ToolSnapshot(str(path), config={"key": "b"}).owner("portia:x") is None
+
+    data = json.loads(path.read_text())
+    data["portia"]["loaded_at"] = time.time() - 7200
+    path.write_text(json.dumps(data))
+    assert ToolSnapshot(str(path), ttl_seconds=3600, config={"key": "a"}).source("portia") is None
+    assert ToolSnapshot(str(path), ttl_seconds=86400, config={"key": "a"}).source("portia") is not None
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.tracing import (
+    CLIENT,
+    JsonFileWriter,
+    OtlpHttpWriter,
+    Tracer,
+    create_tracer,
+    critical_path,
+    in_context,
+    parse_traceparent,
+    waterfall,
+)
+
+def make_tracer():
+    exported = []
+    return Tracer(exported.append), exported
+
+def test_spans_nest_across_thread_pools():
+    tracer, exported = make_tracer()
+
+    def call_tool():
+        with tracer.span("tool_call", CLIENT, tool_id="search_tool") as span:
+            return span
+
+    with tracer.span("http_request") as request:
+        with tracer.span("plan_run") as run:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                traced = pool.submit(in_context(call_tool)).result()
+                detached = pool.submit(call_tool).result()
+    assert run.parent_id == request.span_id
+    assert traced.trace_id == request.trace_id
+    assert traced.parent_id == run.span_id
+    # Without in_context the pool thread starts a trace of its own
+    assert detached.trace_id != request.trace_id
+    assert len(tracer.trace(request.trace_id)) == 3
+    assert len(exported) == 4
+
+def test_span_records_errors():
+    tracer, exported = make_tracer()
+    try:
+        with tracer.span("step", step="synthesize_research"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert exported[0].status == "error"
+    assert exported[0].error == "ValueError: boom"
+    assert exported[0].attributes == {"step": "synthesize_research"}
+
+def test_traceparent_continues_remote_trace():
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert parse_traceparent(header) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+    assert parse_traceparent("00-0000-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent(None) is None
+    tracer, _ = make_tracer()
+    span, token = tracer.start("http_request", remote_parent=parse_traceparent(header))
+    tracer.end(span, token)
+    assert span.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert span.parent_id == "00f067aa0ba902b7"
+    assert span.traceparent().startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+
+def test_waterfall_and_critical_path():
+    tracer, _ = make_tracer()
+    root, token = tracer.start("plan_run")
+    fast, fast_token = tracer.start("step", step="analyze_google_trends")
+    tracer.end(fast, fast_token)
+    slow, slow_token = tracer.start("step", step="synthesize_research")
+    llm, llm_token = tracer.start("llm_call", CLIENT)
+    tracer.end(llm, llm_token)
+    tracer.end(slow, slow_token)
+    tracer.end(root, token)
+    # Pin timings so the path does not depend on the clock
+    for span, (start, end) in zip((root, fast, slow, llm), ((0, 100), (0, 10), (10, 100), (20, 90))):
+        span.start_ns, span.end_ns = start * 10**6, end * 10**6
+    rows = waterfall(tracer.trace(root.trace_id))
+    assert [(row["name"], row["depth"]) for row in rows] == [("plan_run", 0), ("step", 1), ("step", 1), ("llm_call", 2)]
+    assert rows[2]["offset_ms"] == 10
+    path = critical_path(tracer.trace(root.trace_id))
+    assert [entry["name"] for entry in path] == ["plan_run", "step", "llm_call"]
+    assert path[1]["attributes"]["step"] == "synthesize_research"
+    assert path[1]["self_ms"] == 20
+
+def test_json_file_writer_round_trip(tmp_path):
+    writer = JsonFileWriter(str(tmp_path / "spans.jsonl"))
+    tracer = Tracer(lambda span: writer([span]), keep_traces=0, archive=writer)
+    with tracer.span("tool_call", CLIENT, tool_id="crawl_tool", args_bytes=120) as span:
+        pass
+    spans = tracer.trace(span.trace_id)
+    assert [(s.span_id, s.attributes["tool_id"]) for s in spans] == [(span.span_id, "crawl_tool")]
+
+def test_otlp_encoding():
+    tracer, exported = make_tracer()
+    with tracer.span("tool_call", CLIENT, tool_id="search_tool", attempt=2):
+        pass
+    encoded = OtlpHttpWriter("http://localhost:4318/v1/traces").encode(exported)
+    span = encoded["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["kind"] == 3
+    assert {"key": "attempt", "value": {"intValue": "2"}} in span["attributes"]
+    assert span["status"] == {"code": 1}
+
+def test_tracing_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("PORTIA_TRACE_EXPORTER", raising=False)
+    assert create_tracer() is None
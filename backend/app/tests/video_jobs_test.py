@@ -0,0 +1,25 @@
+import json
+from app.core.video_jobs import FAILED, PENDING, READY, VideoJobStore, parse_video_output
+
+MCP_RESULT = json.dumps({
+    "content": [{"type": "text", "text": "Your video is being generated: https://ai.invideo.io/workspace/abc/v30-copilot/7f3e9c21."}],
+    "isError": False,
+})
+
+def test_parse_mcp_video_output():
+    assert parse_video_output(MCP_RESULT) == {
+        "url": "https://ai.invideo.io/workspace/abc/v30-copilot/7f3e9c21",
+        "job_id": "7f3e9c21",
+        "status": READY,
+    }
+    assert parse_video_output(json.dumps({"content": [{"type": "text", "text": "Queued"}]}))["status"] == PENDING
+    assert parse_video_output({"content": [], "isError": True})["status"] == FAILED
+    assert parse_video_output("https://ai.invideo.io/v/123")["job_id"] == "123"
+
+def test_video_jobs_are_indexed_by_run_and_pipeline(tmp_path):
+    store = VideoJobStore(str(tmp_path / "video_jobs.db"))
+    store.record("prun-video", parse_video_output(MCP_RESULT), root_id="root-1", tool_id="portia:mcp:mcp.invideo.io:generate_video_from_script")
+    assert store.latest("prun-video")["job_id"] == "7f3e9c21"
+    # The master pipeline's finalization run finds the video of its video phase
+    assert store.latest("prun-finalization", root_id="root-1")["url"].endswith("/7f3e9c21")
+    assert store.find("prun-other") == []
@@ -1,18 +1,468 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
-from app.agents.research_plans import create_market_research_plan, create_content_gap_analysis_plan
-from app.agents.content_plans import create_content_planning_system, create_article_writing_system, create_fact_checking_system
-from app.agents.podcast_plans import create_podcast_production_system
-from app.agents.video_plans import create_video_production_system
-from app.agents.publishing_plans import create_notion_publisher
-import app
 import os
-import json
+import time
+from functools import partial
+from app import agents
 from app.core.portia_client import PortiaClient
+from app.core.artifact_index import FIELDS as ARTIFACT_FIELDS, get_artifact_index, start_reconciler
+from app.core.artifacts import artifact_ref, run_artifact_refs
+from app.core.coalesce import create_request_flights
+from app.core.idempotency import RUNNING as IDEMPOTENCY_RUNNING, create_idempotency_store, request_fingerprint
+from app.core.jobs import FAILED, CANCELLED, SUCCEEDED, create_job_manager
+from app.core.plan_registry import get_plan_registry
+from app.core.profiling import REQUESTS as PROFILE_REQUESTS
+from app.core.responses import FastJSONProvider, compress, compression_settings, dumps, parse_fields, project
+from app.core.run_state import RunState, bind_run, current_run
+from app.core.tracing import SERVER, critical_path, parse_traceparent, waterfall
 
 app = Flask(__name__)
-CORS(app) 
-client = PortiaClient()
+app.json = FastJSONProvider(app)
+CORS(app)
+COMPRESSION = compression_settings()
+# Shared plan objects; built before the fork under the production server
+plans = get_plan_registry()
+
+# Process-local services, created by init_worker(). Under the production server
+# (wsgi.py) that happens in each worker after the fork; otherwise at import.
+client = None
+jobs = None
+idempotency = None
+pipeline_flights = None
+artifact_index = None
+
+
+def init_worker(recover_jobs=True, cancel_poll_interval=0):
+    """Create this process's Portia client, job manager and stores."""
+    global client, jobs, idempotency, pipeline_flights, artifact_index
+    client = PortiaClient()
+    jobs = create_job_manager(recover=recover_jobs, cancel_poll_interval=cancel_poll_interval, metrics=client.metrics, tracer=client.tracer)
+    idempotency = create_idempotency_store()
+    # Identical in-flight inline requests share one run, whichever worker they reach
+    pipeline_flights = create_request_flights()
+    artifact_index = get_artifact_index()
+    start_reconciler(
+        artifact_index,
+        interval=float(os.getenv("PORTIA_RECONCILE_INTERVAL", "300")),
+        lock_path=os.path.join(os.path.dirname(artifact_index.db_path) or ".", "reconciler.lock"),
+    )
+
+
+if os.getenv("PORTIA_DEFER_INIT", "0").lower() not in ("1", "true", "yes", "on"):
+    init_worker()
+
+
+class RequestError(Exception):
+    """Invalid request payload, reported to the client as HTTP 400."""
+
+
+def require_fields(data, required_fields):
+    """Validate that the request carried a payload with all required fields."""
+    if not data:
+        raise RequestError("No data provided")
+    for field in required_fields:
+        if field not in data:
+            raise RequestError(f"Missing required field: {field}")
+
+
+def limit_arg(default=50, maximum=500):
+    """The ?limit= query parameter, clamped to 1..maximum."""
+    value = request.args.get("limit", default)
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        raise RequestError(f"Invalid limit: {value}")
+
+
+# --- Pipelines ---
+# Each pipeline has a prepare function (validation, raises RequestError) and a
+# run function that executes the plan and returns the JSON response body. The
+# run function is called inline for synchronous requests or on the job pool.
+# Output files are returned as references to the artifacts the run produced;
+# their content is served lazily by /api/runs/<run_id>/artifacts/<path>.
+
+def prepare_market_research(data):
+    require_fields(data, ["topic", "target_audience"])
+    return data
+
+def run_market_research(data):
+    plan = plans.get("market-research")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+    return {
+        "result": result,
+        "research_reports": run_artifact_refs(current_run(), "research_reports")
+    }
+
+def prepare_content_gap_analysis(data):
+    require_fields(data, [])
+    return data
+
+def run_content_gap_analysis(data):
+    plan = plans.get("content-gap-analysis")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+    return {"result": result}
+
+def prepare_content_planning(data):
+    data = data or {}
+
+    # Auto-load the most recent research summary: text summaries first, then JSON reports
+    research_summary = ""
+    for suffix in (".txt", ".json"):
+        latest = artifact_index.latest("research_reports", name_suffix=suffix)
+        if latest and latest["size"]:
+            try:
+                with open(latest["path"], 'r', encoding='utf-8') as f:
+                    research_summary = f.read()
+            except OSError:
+                continue
+            if research_summary.strip():
+                break
+
+    # Use auto-loaded research summary or provided one
+    if not research_summary and "research_summary" not in data:
+        raise RequestError("No research summary found in research_reports folder and none provided")
+
+    if research_summary:
+        data["research_summary"] = research_summary
+
+    require_fields(data, ["content_goals"])
+    return data
+
+def run_content_planning(data):
+    plan = plans.get("content-planning")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+    research_summary = str(data.get("research_summary", ""))
+    return {
+        "result": result,
+        "content_plans": run_artifact_refs(current_run(), "content_plans"),
+        "research_summary_used": research_summary[:200] + "..." if len(research_summary) > 200 else research_summary
+    }
+
+def prepare_article_writing(data):
+    require_fields(data, ["topic", "target_keywords"])
+    return data
+
+def run_article_writing(data):
+    plan = plans.get("article-writing")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+    return {
+        "result": result,
+        "content_drafts": run_artifact_refs(current_run(), "content_drafts")
+    }
+
+def prepare_fact_checking(data):
+    require_fields(data, ["content_to_verify"])
+    return data
+
+def run_fact_checking(data):
+    plan = plans.get("fact-checking")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+    return {
+        "result": result,
+        "fact_check_reports": run_artifact_refs(current_run(), "fact_check_reports")
+    }
+
+def prepare_podcast_production(data):
+    require_fields(data, ["episode_topic", "source_content"])
+    return data
+
+def run_podcast_production(data):
+    plan = plans.get("podcast-production")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+    return {
+        "result": result,
+        "podcast_episodes": run_artifact_refs(current_run(), "podcast_episodes")
+    }
+
+def prepare_video_production(data):
+    require_fields(data, ["video_topic", "target_platform"])
+    return data
+
+def run_video_production(data):
+    plan = plans.get("video-production")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+
+    state = current_run()
+    video_job = client.video_jobs.latest(state.run_id) if state is not None and state.run_id else None
+
+    return {
+        "result": result,
+        "video_link": video_job["url"] if video_job else None,
+        "video_job": video_job,
+        "video_production_files": run_artifact_refs(current_run(), "video_production")
+    }
+
+def prepare_publishing(data):
+    require_fields(data, ["content_package"])
+    return data
+
+def run_publishing(data):
+    plan = plans.get("publishing")
+    result = client.run_plan2(plan, plan_run_inputs=data)
+    return {"result": result}
+
+def prepare_master_pipeline(data):
+    require_fields(data, ["project_name", "primary_topic", "target_audience"])
+    return data
+
+def run_master_pipeline(data):
+    # Phases run as parallel branches and join before the approval gate
+    phases = client.run_phases(agents.create_master_phases(), data)
+    plan = plans.get("master-finalization")
+    finalize_started = time.perf_counter()
+    result = client.run_plan2(plan, plan_run_inputs=agents.master_finalization_inputs(data, phases.outputs))
+    timing = phases.summary()
+    state = str(result.get("state") or "").lower()
+    timing["phases"]["finalization"] = {
+        # Phases report "succeeded"; any other plan run state (failed, need_clarification, ...) is passed on
+        "status": "succeeded" if state == "complete" else state or "unknown",
+        "run_id": result.get("id"),
+        "started_at": round(phases.wall_time, 3),
+        "duration": round(time.perf_counter() - finalize_started, 3),
+    }
+    timing["wall_time"] = round(phases.wall_time + timing["phases"]["finalization"]["duration"], 3)
+    return {"result": result, "timing": timing}
+
+PIPELINES = {
+    "market-research": (prepare_market_research, run_market_research),
+    "content-gap-analysis": (prepare_content_gap_analysis, run_content_gap_analysis),
+    "content-planning": (prepare_content_planning, run_content_planning),
+    "article-writing": (prepare_article_writing, run_article_writing),
+    "fact-checking": (prepare_fact_checking, run_fact_checking),
+    "podcast-production": (prepare_podcast_production, run_podcast_production),
+    "video-production": (prepare_video_production, run_video_production),
+    "publishing": (prepare_publishing, run_publishing),
+    "master-pipeline": (prepare_master_pipeline, run_master_pipeline),
+}
+
+
+def execute_pipeline(name, inputs):
+    """Run a pipeline and tag the response with the plan run id."""
+    _, run = PIPELINES[name]
+    state = current_run()
+    if state is not None and client.checkpoints is not None:
+        # Lets POST /api/runs/<run_id>/resume re-run the whole pipeline
+        client.checkpoints.start_pipeline(state.root_id, name, inputs)
+    body = run(inputs)
+    if state is not None and state.run_id:
+        body.setdefault("run_id", state.run_id)
+    if state is not None and state.step_diff is not None:
+        body.setdefault("step_diff", state.step_diff)
+    return body
+
+
+def job_response(job):
+    """Job record plus the URLs a client needs to follow it."""
+    job_id = job["job_id"]
+    return {
+        **job,
+        "status_url": f"/api/jobs/{job_id}",
+        "result_url": f"/api/jobs/{job_id}/result",
+        "cancel_url": f"/api/jobs/{job_id}/cancel",
+        "events_url": f"/api/jobs/{job_id}/events",
+    }
+
+
+def run_options():
+    """Per-request RunState options taken from headers / query args."""
+    bypass = "bypass" in (request.headers.get("X-LLM-Cache", ""), request.args.get("llm_cache", ""))
+    lineage = (request.headers.get("X-Lineage") or request.args.get("lineage") or "").strip() or None
+    return {"llm_cache_bypass": bypass, "lineage": lineage, "profile": profile_requested()}
+
+
+def profile_requested():
+    """Whether the request asks to be profiled (X-Profile: 1, with X-Profile-Token when one is configured)."""
+    if client is None or client.profiler is None:
+        return False
+    if request.headers.get("X-Profile", "").lower() not in ("1", "true", "yes", "on"):
+        return False
+    return client.profiler.authorized(request.headers.get("X-Profile-Token"))
+
+
+def submit_job(name, inputs, fn=None, dedupe_key=None, **options):
+    """Queue a job (202); with dedupe_key, attach to an identical unfinished job instead."""
+    fn = fn or partial(execute_pipeline, name)
+    options = {**run_options(), **options}
+    if dedupe_key is not None:
+        job, coalesced = jobs.submit_once(dedupe_key, name, inputs, fn, **options)
+    else:
+        job, coalesced = jobs.submit(name, inputs, fn, **options), False
+    response = jsonify(job_response(job))
+    response.headers["Location"] = f"/api/jobs/{job['job_id']}"
+    if coalesced:
+        response.headers["X-Coalesced"] = "true"
+    return response, 202
+
+
+def run_inline(name, inputs, fingerprint):
+    """Run a pipeline within the request; identical concurrent requests share one run.
+
+    Returns (body, shared).
+    """
+    def run():
+        with bind_run(RunState(**run_options())):
+            return execute_pipeline(name, inputs)
+
+    return pipeline_flights.do(fingerprint, run)
+
+
+def result_response(body, status=200):
+    """JSON response for a pipeline result, projected with ?fields=a.b,c."""
+    fields = parse_fields(request.args.get("fields"))
+    if fields and isinstance(body, dict):
+        body = project(body, fields)
+    return jsonify(body), status
+
+
+def replay_idempotent(record, fingerprint):
+    """Response for a request whose Idempotency-Key was seen before."""
+    if record["fingerprint"] != fingerprint:
+        return jsonify({"error": "Idempotency-Key was already used for a different request"}), 422
+    if record["status"] == IDEMPOTENCY_RUNNING:
+        try:
+            joined, body = pipeline_flights.join(fingerprint)
+        except Exception as e:
+            # The first request has failed and released the key; report its error the same way
+            return jsonify({"error": str(e)}), 500
+        if not joined:
+            response = jsonify({"error": "A request with this Idempotency-Key is still in progress"})
+            response.headers["Retry-After"] = "5"
+            return response, 409
+        response, status = result_response(body)
+        response.headers["X-Coalesced"] = "true"
+        return response, status
+    if record["job_id"]:
+        job = jobs.get(record["job_id"])
+        response = jsonify(job_response(job) if job else record["response"])
+        response.headers["Location"] = f"/api/jobs/{record['job_id']}"
+        status = record["status_code"]
+    else:
+        response, status = result_response(record["response"], record["status_code"])
+    response.headers["Idempotent-Replayed"] = "true"
+    return response, status
+
+
+def event_stream_response(log, after=0, headers=None):
+    """Stream a job's progress events as SSE, or as NDJSON with ?format=ndjson."""
+    ndjson = request.args.get("format") == "ndjson"
+
+    def generate():
+        for event in log.iter_events(after=after):
+            if event is None:
+                yield "\n" if ndjson else ": keep-alive\n\n"
+            elif ndjson:
+                yield dumps(event).decode("utf-8") + "\n"
+            else:
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {dumps(event).decode('utf-8')}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson" if ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})},
+    )
+
+
+def handle_pipeline_request(name, async_mode=None):
+    """Validate the request and run the pipeline inline, or as a job with ?async=true.
+
+    Identical in-flight requests are coalesced onto one run, and requests carrying an
+    Idempotency-Key header get the stored response of the first request with that key.
+    """
+    prepare, _ = PIPELINES[name]
+    data = request.get_json(silent=True)
+    try:
+        inputs = prepare(data)
+    except RequestError as e:
+        return jsonify({"error": str(e)}), 400
+    if async_mode is None:
+        async_mode = request.args.get("async", "").lower() in ("1", "true", "yes")
+    fingerprint = request_fingerprint(name, data, async_mode=async_mode, **run_options())
+    key = request.headers.get("Idempotency-Key")
+    if key:
+        record = idempotency.begin(key, fingerprint)
+        if record is not None:
+            return replay_idempotent(record, fingerprint)
+    try:
+        if async_mode:
+            response, status = submit_job(name, inputs, dedupe_key=fingerprint)
+        else:
+            body, shared = run_inline(name, inputs, fingerprint)
+    except Exception as e:
+        if key:
+            idempotency.release(key)
+        return jsonify({"error": str(e)}), 500
+    if async_mode:
+        if key:
+            body = response.get_json()
+            idempotency.complete(key, status, body, job_id=body.get("job_id"))
+        return response, status
+    if key:
+        idempotency.complete(key, 200, body)
+    response, status = result_response(body)
+    if shared:
+        response.headers["X-Coalesced"] = "true"
+    return response, status
+
+
+@app.before_request
+def start_request_span():
+    # Pipeline requests and the jobs they submit are traced under this span
+    if client is not None and client.tracer is not None:
+        g.trace_span = client.tracer.start(
+            "http_request",
+            SERVER,
+            remote_parent=parse_traceparent(request.headers.get("traceparent")),
+            method=request.method,
+            route=request.url_rule.rule if request.url_rule else request.path,
+            request_bytes=request.content_length,
+        )
+
+
+@app.before_request
+def start_request_profile():
+    if client is None or client.profiler is None or request.path.startswith("/api/admin/"):
+        return
+    if profile_requested() or client.profiler.take(PROFILE_REQUESTS):
+        session = client.profiler.start("request", f"{request.method}-{request.path}")
+        if session is not None:
+            g.profile_session = session
+
+
+@app.after_request
+def tag_request_profile(response):
+    if "profile_session" in g:
+        response.headers["X-Profile-Id"] = g.profile_session.name
+    return response
+
+
+@app.teardown_request
+def stop_request_profile(error=None):
+    if "profile_session" in g:
+        client.profiler.stop(g.pop("profile_session"))
+
+
+@app.after_request
+def tag_request_span(response):
+    if "trace_span" in g:
+        span = g.trace_span[0]
+        span.set(status_code=response.status_code, response_bytes=response.content_length)
+        response.headers["X-Trace-Id"] = span.trace_id
+        response.headers["traceparent"] = span.traceparent()
+    return response
+
+
+@app.teardown_request
+def end_request_span(error=None):
+    if "trace_span" in g:
+        client.tracer.end(*g.pop("trace_span"), error=error)
+
+
+@app.after_request
+def compress_response(response):
+    if COMPRESSION is not None:
+        compress(response, request.headers.get("Accept-Encoding", ""), **COMPRESSION)
+    return response
+
 
 @app.route("/", methods=["GET"])
 def health_check():
@@ -20,437 +470,294 @@ def health_check():
 
 @app.route("/api/market-research", methods=["POST"])
 def market_research():
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Validate required fields
-        required_fields = ["topic", "target_audience"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = create_market_research_plan()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        
-        # Get research reports folder contents
-        research_reports = {}
-        research_folder = "research_reports"
-        if os.path.exists(research_folder):
-            for filename in os.listdir(research_folder):
-                file_path = os.path.join(research_folder, filename)
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if filename.endswith('.json'):
-                                if content.strip():
-                                    try:
-                                        research_reports[filename] = json.loads(content)
-                                    except json.JSONDecodeError as json_err:
-                                        research_reports[filename] = {
-                                            "error": f"Invalid JSON format: {str(json_err)}",
-                                            "raw_content": content[:500] + "..." if len(content) > 500 else content
-                                        }
-                                else:
-                                    research_reports[filename] = {"error": "Empty JSON file"}
-                            else:
-                                research_reports[filename] = content
-                    except Exception as e:
-                        research_reports[filename] = f"Error reading file: {str(e)}"
-        
-        return jsonify({
-            "result": result,
-            "research_reports": research_reports
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return handle_pipeline_request("market-research")
 
 @app.route("/api/content-gap-analysis", methods=["POST"])
 def content_gap_analysis():
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        plan = create_content_gap_analysis_plan()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        return jsonify({"result": result})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return handle_pipeline_request("content-gap-analysis")
 
 @app.route("/api/content-planning", methods=["POST"])
 def content_planning():
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Auto-load research summary from research_reports folder
-        research_summary = ""
-        research_folder = "research_reports"
-        if os.path.exists(research_folder):
-            # Look for text files first, then JSON files
-            for filename in os.listdir(research_folder):
-                if filename.endswith('.txt'):
-                    file_path = os.path.join(research_folder, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            research_summary = f.read()
-                            break
-                    except Exception as e:
-                        continue
-            
-            # If no text file found, try JSON files
-            if not research_summary:
-                for filename in os.listdir(research_folder):
-                    if filename.endswith('.json'):
-                        file_path = os.path.join(research_folder, filename)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                if content.strip():
-                                    research_summary = content
-                                    break
-                        except Exception as e:
-                            continue
-        
-        # Use auto-loaded research summary or provided one
-        if not research_summary and "research_summary" not in data:
-            return jsonify({"error": "No research summary found in research_reports folder and none provided"}), 400
-        
-        if research_summary:
-            data["research_summary"] = research_summary
-        
-        # Validate required fields
-        required_fields = ["content_goals"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = create_content_planning_system()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        
-        # Get content plans folder contents
-        content_plans = {}
-        content_folder = "content_plans"
-        if os.path.exists(content_folder):
-            for filename in os.listdir(content_folder):
-                file_path = os.path.join(content_folder, filename)
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if filename.endswith('.json'):
-                                if content.strip():
-                                    try:
-                                        content_plans[filename] = json.loads(content)
-                                    except json.JSONDecodeError as json_err:
-                                        content_plans[filename] = {
-                                            "error": f"Invalid JSON format: {str(json_err)}",
-                                            "raw_content": content[:500] + "..." if len(content) > 500 else content
-                                        }
-                                else:
-                                    content_plans[filename] = {"error": "Empty JSON file"}
-                            else:
-                                content_plans[filename] = content
-                    except Exception as e:
-                        content_plans[filename] = f"Error reading file: {str(e)}"
-        
-        return jsonify({
-            "result": result,
-            "content_plans": content_plans,
-            "research_summary_used": research_summary[:200] + "..." if len(research_summary) > 200 else research_summary
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return handle_pipeline_request("content-planning")
 
 @app.route("/api/article-writing", methods=["POST"])
 def article_writing():
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Validate required fields based on test
-        required_fields = ["topic", "target_keywords"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = create_article_writing_system()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        
-        # Get content drafts folder contents
-        content_drafts = {}
-        drafts_folder = "content_drafts"
-        if os.path.exists(drafts_folder):
-            for filename in os.listdir(drafts_folder):
-                file_path = os.path.join(drafts_folder, filename)
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if filename.endswith('.json'):
-                                if content.strip():
-                                    try:
-                                        content_drafts[filename] = json.loads(content)
-                                    except json.JSONDecodeError as json_err:
-                                        content_drafts[filename] = {
-                                            "error": f"Invalid JSON format: {str(json_err)}",
-                                            "raw_content": content[:500] + "..." if len(content) > 500 else content
-                                        }
-                                else:
-                                    content_drafts[filename] = {"error": "Empty JSON file"}
-                            else:
-                                content_drafts[filename] = content
-                    except Exception as e:
-                        content_drafts[filename] = f"Error reading file: {str(e)}"
-        
-        return jsonify({
-            "result": result,
-            "content_drafts": content_drafts
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return handle_pipeline_request("article-writing")
 
 @app.route("/api/fact-checking", methods=["POST"])
 def fact_checking():
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Validate required fields based on test
-        required_fields = ["content_to_verify"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = create_fact_checking_system()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        
-        # Get fact check reports folder contents
-        fact_check_reports = {}
-        reports_folder = "fact_check_reports"
-        if os.path.exists(reports_folder):
-            for filename in os.listdir(reports_folder):
-                file_path = os.path.join(reports_folder, filename)
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if filename.endswith('.json'):
-                                if content.strip():
-                                    try:
-                                        fact_check_reports[filename] = json.loads(content)
-                                    except json.JSONDecodeError as json_err:
-                                        fact_check_reports[filename] = {
-                                            "error": f"Invalid JSON format: {str(json_err)}",
-                                            "raw_content": content[:500] + "..." if len(content) > 500 else content
-                                        }
-                                else:
-                                    fact_check_reports[filename] = {"error": "Empty JSON file"}
-                            else:
-                                fact_check_reports[filename] = content
-                    except Exception as e:
-                        fact_check_reports[filename] = f"Error reading file: {str(e)}"
-        
-        return jsonify({
-            "result": result,
-            "fact_check_reports": fact_check_reports
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return handle_pipeline_request("fact-checking")
 
 @app.route("/api/podcast-production", methods=["POST"])
 def podcast_production():
+    return handle_pipeline_request("podcast-production")
+
+@app.route("/api/video-production", methods=["POST"])
+def video_production():
+    return handle_pipeline_request("video-production")
+
+@app.route("/api/publishing", methods=["POST"])
+def publishing():
+    return handle_pipeline_request("publishing")
+
+@app.route("/api/master-pipeline", methods=["POST"])
+def master_pipeline():
+    return handle_pipeline_request("master-pipeline")
+
+# --- Jobs ---
+
+@app.route("/api/jobs/<pipeline>", methods=["POST"])
+def submit_pipeline_job(pipeline):
+    if pipeline not in PIPELINES:
+        return jsonify({"error": f"Unknown pipeline: {pipeline}"}), 404
+    return handle_pipeline_request(pipeline, async_mode=True)
+
+@app.route("/api/stream/<pipeline>", methods=["POST"])
+def stream_pipeline(pipeline):
+    """Run a pipeline as a job and stream its step events as they happen."""
+    if pipeline not in PIPELINES:
+        return jsonify({"error": f"Unknown pipeline: {pipeline}"}), 404
+    prepare, _ = PIPELINES[pipeline]
+    data = request.get_json(silent=True)
     try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Validate required fields based on test
-        required_fields = ["episode_topic", "source_content"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = create_podcast_production_system()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        
-        # Get podcast episodes folder contents
-        podcast_episodes = {}
-        episodes_folder = "podcast_episodes"
-        if os.path.exists(episodes_folder):
-            for filename in os.listdir(episodes_folder):
-                file_path = os.path.join(episodes_folder, filename)
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if filename.endswith('.json'):
-                                if content.strip():
-                                    try:
-                                        podcast_episodes[filename] = json.loads(content)
-                                    except json.JSONDecodeError as json_err:
-                                        podcast_episodes[filename] = {
-                                            "error": f"Invalid JSON format: {str(json_err)}",
-                                            "raw_content": content[:500] + "..." if len(content) > 500 else content
-                                        }
-                                else:
-                                    podcast_episodes[filename] = {"error": "Empty JSON file"}
-                            else:
-                                podcast_episodes[filename] = content
-                    except Exception as e:
-                        podcast_episodes[filename] = f"Error reading file: {str(e)}"
-        
-        return jsonify({
-            "result": result,
-            "podcast_episodes": podcast_episodes
-        })
+        inputs = prepare(data)
+    except RequestError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        # Streams attach to an identical job that is already running
+        fingerprint = request_fingerprint(pipeline, data, async_mode=True, **run_options())
+        job, _ = jobs.submit_once(fingerprint, pipeline, inputs, partial(execute_pipeline, pipeline), **run_options())
+        return event_stream_response(jobs.event_log(job["job_id"]), headers={"X-Job-Id": job["job_id"]})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/video-production", methods=["POST"])
-def video_production():
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    # Served by any worker: jobs run by another one are streamed from the job store
+    log = jobs.event_log(job_id)
+    if log is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    after = request.headers.get("Last-Event-ID") or request.args.get("after") or 0
+    try:
+        after = int(after)
+    except ValueError:
+        return jsonify({"error": f"Invalid event id: {after}"}), 400
+    return event_stream_response(log, after=after)
+
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
     try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Validate required fields based on test
-        required_fields = ["video_topic", "target_platform"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = create_video_production_system()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        
-        # Extract video link from result
-        video_link = None
+        return jsonify({"jobs": jobs.list(limit=limit_arg(), status=request.args.get("status"))})
+    except RequestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job_response(job))
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    job = jobs.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if job["status"] == SUCCEEDED:
+        return result_response(job["result"])
+    if job["status"] in (FAILED, CANCELLED):
+        return jsonify({"error": job["error"] or f"Job {job['status']}", "status": job["status"]}), 409
+    job.pop("result", None)
+    return jsonify(job_response(job)), 202
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job_response(job))
+
+# --- Run artifacts ---
+
+@app.route("/api/runs/<run_id>/artifacts", methods=["GET"])
+def get_run_manifest(run_id):
+    manifest = client.manifests.load(run_id)
+    if manifest is None:
+        return jsonify({"error": f"Unknown run: {run_id}"}), 404
+    return jsonify({
+        **manifest,
+        "artifacts": [artifact_ref(run_id, entry) for entry in manifest["artifacts"]]
+    })
+
+@app.route("/api/runs/<run_id>/artifacts/<path:artifact_path>", methods=["GET"])
+def get_run_artifact(run_id, artifact_path):
+    # Only files recorded in the run's manifest can be served
+    entry = client.manifests.find_artifact(run_id, artifact_path)
+    if entry is None or not os.path.isfile(entry["path"]):
+        return jsonify({"error": f"Artifact not found: {artifact_path}"}), 404
+    return send_file(os.path.abspath(entry["path"]), download_name=entry["name"])
+
+@app.route("/api/runs/<run_id>/resume", methods=["POST"])
+def resume_run(run_id):
+    """Resume a failed run from its first incomplete step (?async=true to run it as a job)."""
+    if client.checkpoints is None:
+        return jsonify({"error": "Checkpoints are disabled"}), 404
+    record = client.checkpoints.get_run(run_id)
+    if record is None:
+        return jsonify({"error": f"No checkpoint for run: {run_id}"}), 404
+    pipeline = client.checkpoints.get_pipeline(record["root_id"])
+    if pipeline is not None:
+        # Re-run the whole API pipeline; every plan run replays its earlier attempt
+        name, inputs, options = pipeline["pipeline"], pipeline["inputs"], {"replay_root": record["root_id"]}
+        fn = partial(execute_pipeline, name)
+    else:
         try:
-            # Parse the result to find video URL
-            if isinstance(result, dict):
-                # Look for video URL in various possible locations
-                for key, value in result.items():
-                    if "step_" in str(key) and "output" in str(key):
-                        if isinstance(value, dict) and "value" in value:
-                            step_value = value["value"]
-                            if isinstance(step_value, str):
-                                # Parse JSON string if needed
-                                try:
-                                    import json as json_lib
-                                    parsed_value = json_lib.loads(step_value)
-                                    if isinstance(parsed_value, dict) and "content" in parsed_value:
-                                        for content_item in parsed_value["content"]:
-                                            if content_item.get("type") == "text":
-                                                text = content_item.get("text", "")
-                                                if "ai.invideo.io" in text:
-                                                    video_link = text
-                                                    break
-                                except:
-                                    # If not JSON, check if it's a direct URL
-                                    if "ai.invideo.io" in step_value:
-                                        video_link = step_value
-                            elif "ai.invideo.io" in str(step_value):
-                                video_link = str(step_value)
-                        elif isinstance(value, str) and "ai.invideo.io" in value:
-                            video_link = value
-                
-                # Also check direct result content
-                if not video_link and "content" in result:
-                    content = result["content"]
-                    if isinstance(content, list):
-                        for item in content:
-                            if isinstance(item, dict) and item.get("type") == "text":
-                                text = item.get("text", "")
-                                if "ai.invideo.io" in text:
-                                    video_link = text
-                                    break
-            
-            # Fallback: search in string representation
-            if not video_link:
-                result_str = str(result)
-                import re
-                url_pattern = r'https://ai\.invideo\.io/[^\s"\']*'
-                matches = re.findall(url_pattern, result_str)
-                if matches:
-                    video_link = matches[0]
-        except Exception as e:
-            print(f"Error extracting video link: {e}")
-        
-        # Get video production folder contents
-        video_production_files = {}
-        video_folder = "video_production"
-        if os.path.exists(video_folder):
-            for filename in os.listdir(video_folder):
-                file_path = os.path.join(video_folder, filename)
-                if os.path.isfile(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if filename.endswith('.json'):
-                                if content.strip():
-                                    try:
-                                        video_production_files[filename] = json.loads(content)
-                                    except json.JSONDecodeError as json_err:
-                                        video_production_files[filename] = {
-                                            "error": f"Invalid JSON format: {str(json_err)}",
-                                            "raw_content": content[:500] + "..." if len(content) > 500 else content
-                                        }
-                                else:
-                                    video_production_files[filename] = {"error": "Empty JSON file"}
-                            else:
-                                video_production_files[filename] = content
-                    except Exception as e:
-                        video_production_files[filename] = f"Error reading file: {str(e)}"
-        
-        return jsonify({
-            "result": result,
-            "video_link": video_link,
-            "video_production_files": video_production_files
-        })
+            client.plans.by_label(record["plan"])
+        except KeyError:
+            return jsonify({
+                "error": f"Run {run_id} cannot be resumed: plan {record['plan']!r} is no longer registered "
+                         "(it was renamed or removed since the run was checkpointed)",
+            }), 409
+        name, inputs, options = "resume", {"run_id": run_id}, {}
+        fn = lambda _: {"result": client.resume(run_id)}
+    try:
+        if request.args.get("async", "").lower() in ("1", "true", "yes"):
+            return submit_job(name, inputs, fn, **options)
+        with bind_run(RunState(**run_options(), **options)) as state:
+            body = fn(inputs)
+            body.setdefault("run_id", state.run_id)
+            return result_response({**body, "resumed_from": run_id})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/publishing", methods=["POST"])
-def publishing():
+@app.route("/api/runs/<run_id>/checkpoint", methods=["GET"])
+def get_run_checkpoint(run_id):
+    if client.checkpoints is None:
+        return jsonify({"error": "Checkpoints are disabled"}), 404
+    record = client.checkpoints.get_run(run_id)
+    if record is None:
+        return jsonify({"error": f"No checkpoint for run: {run_id}"}), 404
+    return jsonify(record)
+
+@app.route("/api/video/<run_id>", methods=["GET"])
+def get_video(run_id):
+    """Video jobs started by a plan run, or by any phase of the pipeline it belongs to."""
+    root_id = None
+    if client.checkpoints is not None:
+        record = client.checkpoints.get_run(run_id)
+        root_id = record["root_id"] if record else None
+    video_jobs = client.video_jobs.find(run_id, root_id=root_id)
+    if not video_jobs:
+        return jsonify({"error": f"No video job for run: {run_id}"}), 404
+    return jsonify({"run_id": run_id, "video": video_jobs[0], "video_jobs": video_jobs})
+
+# --- Artifact index ---
+
+@app.route("/api/artifacts", methods=["GET"])
+def list_artifacts():
+    """Browse indexed artifacts with filters, cursor pagination and ?fields= projection."""
+    fields = request.args.get("fields")
+    try:
+        limit = limit_arg()
+    except RequestError as e:
+        return jsonify({"error": str(e)}), 400
     try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Validate required fields based on test
-        required_fields = ["content_package"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = create_notion_publisher()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        return jsonify({"result": result})
+        page = artifact_index.query(
+            kind=request.args.get("kind"),
+            topic=request.args.get("topic"),
+            run_id=request.args.get("run_id"),
+            name_suffix=request.args.get("suffix"),
+            cursor=request.args.get("cursor"),
+            limit=limit,
+            fields=fields.split(",") if fields else None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e), "fields": list(ARTIFACT_FIELDS)}), 400
+    return jsonify(page)
+
+@app.route("/api/artifacts/file/<path:artifact_path>", methods=["GET"])
+def get_artifact_file(artifact_path):
+    # Only indexed files can be served
+    entry = artifact_index.get(artifact_path)
+    if entry is None or not os.path.isfile(entry["path"]):
+        return jsonify({"error": f"Artifact not found: {artifact_path}"}), 404
+    return send_file(os.path.abspath(entry["path"]), download_name=entry["name"])
+
+@app.route("/api/artifacts/reconcile", methods=["POST"])
+def reconcile_artifacts():
+    try:
+        return jsonify(artifact_index.reconcile())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/master-pipeline", methods=["POST"])
-def master_pipeline():
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(client.cache_stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    if client.metrics is None:
+        return jsonify({"error": "Metrics are disabled (PORTIA_METRICS=0 or prometheus_client not installed)"}), 404
+    body, content_type = client.metrics.exposition()
+    return Response(body, content_type=content_type)
+
+@app.route("/api/traces/<trace_id>", methods=["GET"])
+def get_trace(trace_id):
+    """Waterfall and critical path of a recent trace (the X-Trace-Id of a response)."""
+    if client.tracer is None:
+        return jsonify({"error": "Tracing is disabled (set PORTIA_TRACE_EXPORTER)"}), 404
+    spans = client.tracer.trace(trace_id)
+    if not spans:
+        return jsonify({"error": f"No trace: {trace_id}"}), 404
+    return jsonify({"trace_id": trace_id, "spans": waterfall(spans), "critical_path": critical_path(spans)})
+
+# --- Profiling ---
+
+def profiler_or_error():
+    """(profiler, None), or (None, error response) when profiling is off or the token is wrong."""
+    if client.profiler is None:
+        return None, (jsonify({"error": "Profiling is disabled (set PORTIA_PROFILING=1)"}), 404)
+    if not client.profiler.authorized(request.headers.get("X-Profile-Token")):
+        return None, (jsonify({"error": "Invalid X-Profile-Token"}), 403)
+    return client.profiler, None
+
+@app.route("/api/admin/profile", methods=["POST"])
+def arm_profiling():
+    """Profile the next {"requests": n} API requests and {"plan_runs": m} plan runs."""
+    profiler, error = profiler_or_error()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    try:
+        armed = profiler.arm(requests=int(data.get("requests", 0)), plan_runs=int(data.get("plan_runs", 0)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "requests and plan_runs must be integers"}), 400
+    return jsonify({"armed": armed})
+
+@app.route("/api/admin/profiles", methods=["GET"])
+def list_profiles():
+    profiler, error = profiler_or_error()
+    if error:
+        return error
+    return jsonify(profiler.recent())
+
+@app.route("/api/admin/profiles/<name>", methods=["GET"])
+def get_profile_file(name):
+    profiler, error = profiler_or_error()
+    if error:
+        return error
+    return send_from_directory(os.path.abspath(profiler.directory), name, as_attachment=True)
+
+@app.route("/api/prompts/stats", methods=["GET"])
+def prompt_stats():
+    return jsonify({"steps": client.prompt_stats()})
+
+@app.route("/api/plans", methods=["GET"])
+def list_plans():
     try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Validate required fields based on master plan inputs
-        required_fields = ["project_name", "primary_topic", "target_audience"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        plan = app.create_master_content_production_system()
-        result = client.run_plan2(plan, plan_run_inputs=data)
-        return jsonify({"result": result})
+        return jsonify({"plans": plans.describe()})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -463,4 +770,4 @@ def list_tools():
         return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
+    app.run(debug=True, host="0.0.0.0", port=5000)
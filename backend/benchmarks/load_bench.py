@@ -0,0 +1,400 @@
+"""Latency, throughput and resource use of the API endpoints under concurrent load.
+
+Starts ``gunicorn -c gunicorn.conf.py wsgi:app`` against the offline backend
+(PORTIA_SIMULATE=1, or cassette replays with ``--cassettes``), then drives
+each endpoint with closed-loop clients at every concurrency level. Each
+client sends its next request as soon as the previous one returns. One row is
+printed per endpoint and level, and the results are written as JSON tagged
+with the git commit:
+
+    cd backend && python benchmarks/load_bench.py --concurrency 1 4 16 --duration 20
+    cd backend && python benchmarks/load_bench.py --endpoints health market-research --latency-scale 0
+    cd backend && python benchmarks/load_bench.py --cassettes cassettes --cassette-latency zero
+    cd backend && python benchmarks/load_bench.py --compare results/base.json results/head.json
+
+Rows report p50/p95/p99 latency and throughput from the client side. They
+also report the server's resident memory, open file descriptors and CPU time,
+sampled from /proc over the master and its workers (so Linux only). Pipeline
+payloads are the "AI in Healthcare" scenarios from app/agents/scenarios.py.
+Each request gets a numbered topic by default, so identical concurrent
+requests are not coalesced and checkpoints cannot reuse step outputs.
+``--identical`` sends the scenario unchanged; that is also the default with
+``--cassettes``, which are recorded per input. Server state (jobs,
+checkpoints, caches, reports) goes to a temporary directory.
+
+``--compare BASE HEAD`` prints the change of every metric between two result
+files. It exits with status 1 when a latency or CPU metric grew, or
+throughput fell, by more than ``--threshold`` percent.
+"""
+
+import argparse
+import copy
+import http.client
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from app.agents.scenarios import SCENARIOS  # noqa: E402
+
+# name -> (method, path, payload)
+ENDPOINTS = {
+    "health": ("GET", "/", None),
+    "tools": ("GET", "/api/tools", None),
+    "plans": ("GET", "/api/plans", None),
+    **{
+        name: ("POST", f"/api/{name}", payload)
+        for name, payload in SCENARIOS.items()
+        if name != "podcast-audio-production"
+    },
+}
+DEFAULT_ENDPOINTS = ["health", "tools", "market-research", "fact-checking", "article-writing", "master-pipeline"]
+# Lower is better for these; higher for throughput
+COSTS = ("p50_ms", "p95_ms", "p99_ms", "cpu_s_per_request")
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+# --- Server resources (/proc) ---
+
+def _process_tree(pid: int) -> list:
+    """pid and its direct children (the gunicorn workers)."""
+    pids = [pid]
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            stat = Path(f"/proc/{entry}/stat").read_text()
+        except OSError:
+            continue
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            pids.append(int(entry))
+    return pids
+
+
+def usage(pid: int) -> dict:
+    """Resident memory, open file descriptors and CPU seconds of the server's processes."""
+    rss = fds = cpu = 0
+    for child in _process_tree(pid):
+        try:
+            rss += int(Path(f"/proc/{child}/statm").read_text().split()[1]) * PAGE_SIZE
+            fds += len(os.listdir(f"/proc/{child}/fd"))
+            fields = Path(f"/proc/{child}/stat").read_text().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        except (OSError, IndexError, ValueError):
+            continue
+    return {"rss": rss, "fds": fds, "cpu": cpu}
+
+
+class ResourceSampler(threading.Thread):
+    """Samples the server's usage every `interval` seconds until stopped."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = [usage(pid)]
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.samples.append(usage(self.pid))
+
+    def stop(self) -> dict:
+        self._done.set()
+        self.join()
+        self.samples.append(usage(self.pid))
+        first, last = self.samples[0], self.samples[-1]
+        return {
+            "rss_mb": {
+                "start": round(first["rss"] / 2**20, 1),
+                "peak": round(max(s["rss"] for s in self.samples) / 2**20, 1),
+                "end": round(last["rss"] / 2**20, 1),
+            },
+            "fds": {"start": first["fds"], "peak": max(s["fds"] for s in self.samples), "end": last["fds"]},
+            "cpu_s": round(last["cpu"] - first["cpu"], 3),
+        }
+
+
+# --- Load generation ---
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of values (0 < q <= 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(-(-len(ordered) * q // 100)) - 1))]
+
+
+def payload_for(name: str, number: int, vary: bool):
+    """The endpoint's payload; with vary, its first text field is numbered so every request is distinct."""
+    payload = copy.deepcopy(ENDPOINTS[name][2])
+    if vary and isinstance(payload, dict):
+        for key, value in payload.items():
+            if isinstance(value, str):
+                payload[key] = f"{value} #{number}"
+                break
+    return payload
+
+
+class LoadClient(threading.Thread):
+    """Closed-loop client: one keep-alive connection, one request in flight, until deadline or limit."""
+
+    def __init__(self, host, port, name, deadline, counter, vary, timeout, limit=None):
+        super().__init__(daemon=True)
+        self.host, self.port, self.name = host, port, name
+        self.deadline, self.counter, self.vary, self.timeout, self.limit = deadline, counter, vary, timeout, limit
+        self.latencies, self.statuses, self.coalesced = [], {}, 0
+
+    def run(self) -> None:
+        method, path, _ = ENDPOINTS[self.name]
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {"Content-Type": "application/json"}
+        while time.time() < self.deadline and (self.limit is None or len(self.latencies) < self.limit):
+            payload = payload_for(self.name, next(self.counter), self.vary)
+            body = json.dumps(payload) if payload is not None else None
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = str(response.status)
+                self.coalesced += response.getheader("X-Coalesced") == "true"
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        conn.close()
+
+
+def drive(server: subprocess.Popen, name: str, concurrency: int, args) -> dict:
+    counter = itertools.count()
+    # Warm the endpoint (plan build, lazy tool sources) outside the timed window
+    LoadClient(args.host, args.port, name, float("inf"), counter, not args.identical, args.timeout, limit=1).run()
+    sampler = ResourceSampler(server.pid)
+    sampler.start()
+    deadline = time.time() + args.duration
+    clients = [
+        LoadClient(args.host, args.port, name, deadline, counter, not args.identical, args.timeout)
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+    resources = sampler.stop()
+    latencies = [latency for client in clients for latency in client.latencies]
+    statuses = {}
+    for client in clients:
+        for status, count in client.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    method, path, _ = ENDPOINTS[name]
+    return {
+        "endpoint": name,
+        "method": method,
+        "path": path,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(latencies) - ok,
+        "statuses": statuses,
+        "coalesced": sum(client.coalesced for client in clients),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies, default=0.0), 1),
+        **resources,
+        "cpu_percent": round(100 * resources["cpu_s"] / elapsed, 1) if elapsed else 0.0,
+        "cpu_s_per_request": round(resources["cpu_s"] / len(latencies), 4) if latencies else 0.0,
+    }
+
+
+# --- Server ---
+
+def _wait_ready(host: str, port: int, server: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server on {host}:{port} did not start within {timeout}s")
+
+
+def server_env(args, tmp: str) -> dict:
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [str(BACKEND), os.getenv("PYTHONPATH")])),
+        WEB_CONCURRENCY=str(args.workers),
+        PORTIA_WEB_THREADS=str(args.threads or max(args.concurrency)),
+        PORTIA_BIND=f"{args.host}:{args.port}",
+        PORTIA_ACCESS_LOG="/dev/null",
+        PORTIA_WORKER_TIMEOUT=str(int(args.timeout)),
+        PORTIA_TOOL_SNAPSHOT_PATH=os.path.join(tmp, "tool_metadata.json"),
+        PORTIA_SIM_SEED=str(args.seed),
+    )
+    if args.cassettes:
+        env.update(
+            PORTIA_CASSETTE_MODE="replay",
+            PORTIA_CASSETTE_DIR=str(Path(args.cassettes).resolve()),
+            PORTIA_CASSETTE_LATENCY=args.cassette_latency,
+        )
+        env.pop("PORTIA_SIMULATE", None)
+    else:
+        env.update(PORTIA_SIMULATE="1", PORTIA_SIM_LATENCY_SCALE=str(args.latency_scale))
+    return env
+
+
+def git_commit() -> dict:
+    def git(*argv):
+        result = subprocess.run(["git", *argv], cwd=BACKEND, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run(args) -> dict:
+    rows = []
+    print(
+        f"{'endpoint':<22} {'conc':>4} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'rss MB':>7} {'fds':>5} {'cpu %':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        # Reports, caches and databases land in tmp: the server runs there with the backend on PYTHONPATH
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", str(BACKEND / "gunicorn.conf.py"), "wsgi:app"],
+            cwd=tmp, env=server_env(args, tmp),
+        )
+        try:
+            _wait_ready(args.host, args.port, server)
+            for name in args.endpoints:
+                for concurrency in args.concurrency:
+                    row = drive(server, name, concurrency, args)
+                    rows.append(row)
+                    print(
+                        f"{name:<22} {concurrency:>4} {row['requests']:>6} {row['errors']:>4} {row['throughput_rps']:>8} "
+                        f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['rss_mb']['peak']:>7} "
+                        f"{row['fds']['peak']:>5} {row['cpu_percent']:>6}"
+                    )
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+    return {
+        **git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cores": os.cpu_count(),
+        "config": {
+            "backend": "cassettes" if args.cassettes else "simulator",
+            "latency_scale": None if args.cassettes else args.latency_scale,
+            "cassette_latency": args.cassette_latency if args.cassettes else None,
+            "seed": args.seed,
+            "workers": args.workers,
+            "threads": args.threads or max(args.concurrency),
+            "duration": args.duration,
+            "identical": args.identical,
+        },
+        "results": rows,
+    }
+
+
+# --- Comparison ---
+
+def compare(base: dict, head: dict, threshold: float) -> list:
+    """Per (endpoint, concurrency) change of every metric; `regression` marks changes past threshold percent."""
+    before = {(row["endpoint"], row["concurrency"]): row for row in base["results"]}
+    changes = []
+    for row in head["results"]:
+        old = before.get((row["endpoint"], row["concurrency"]))
+        if old is None:
+            continue
+        metrics = {metric: (old[metric], row[metric]) for metric in (*COSTS, "throughput_rps")}
+        metrics["rss_peak_mb"] = (old["rss_mb"]["peak"], row["rss_mb"]["peak"])
+        metrics["fds_peak"] = (old["fds"]["peak"], row["fds"]["peak"])
+        for metric, (was, now) in metrics.items():
+            change = 100 * (now - was) / was if was else 0.0
+            worse = -change if metric == "throughput_rps" else change
+            changes.append({
+                "endpoint": row["endpoint"],
+                "concurrency": row["concurrency"],
+                "metric": metric,
+                "base": was,
+                "head": now,
+                "change_percent": round(change, 1),
+                "regression": metric in (*COSTS, "throughput_rps") and worse > threshold,
+            })
+    return changes
+
+
+def print_comparison(base: dict, head: dict, changes: list) -> None:
+    print(f"base {str(base.get('commit'))[:10]}  head {str(head.get('commit'))[:10]}")
+    print(f"{'endpoint':<22} {'conc':>4} {'metric':<18} {'base':>10} {'head':>10} {'change':>8}")
+    for change in changes:
+        flag = "  REGRESSION" if change["regression"] else ""
+        print(
+            f"{change['endpoint']:<22} {change['concurrency']:>4} {change['metric']:<18} {change['base']:>10} "
+            f"{change['head']:>10} {change['change_percent']:>7}%{flag}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS, choices=sorted(ENDPOINTS), metavar="NAME")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per endpoint and concurrency level")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=0, help="request threads per worker (default: max concurrency)")
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="simulated service latency factor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cassettes", help="replay cassettes from this directory instead of simulating")
+    parser.add_argument("--cassette-latency", default="original", help='"original", "zero" or a factor')
+    parser.add_argument("--identical", action="store_true", help="send every request with the same payload")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request timeout in seconds")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    if args.compare:
+        base, head = (json.loads(Path(path).read_text()) for path in args.compare)
+        changes = compare(base, head, args.threshold)
+        print_comparison(base, head, changes)
+        return 1 if any(change["regression"] for change in changes) else 0
+
+    args.identical = args.identical or bool(args.cassettes)
+    results = run(args)
+    out = Path(args.out) if args.out else (
+        BACKEND / "benchmarks" / "results"
+        / f"{(results['commit'] or 'nocommit')[:10]}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"results: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Requests/second of the production server as the worker count grows.
+
+Starts ``gunicorn -c gunicorn.conf.py wsgi:app`` once per worker count, drives
+it with keep-alive clients spread over several processes (so the load
+generator is not limited by its own GIL) and prints one row per count:
+
+    cd backend && python benchmarks/serve_bench.py --workers 1 2 4 --path /api/tools
+
+The default path is served entirely by the worker (no LLM or tool calls), so
+the numbers measure how request handling scales with processes. Job and
+artifact databases go to a temporary directory.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def _client(host: str, port: int, path: str, deadline: float, counts: list, index: int) -> None:
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                done += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.close()
+    counts[index] = (done, errors)
+
+
+def _load_process(args) -> tuple:
+    host, port, path, deadline, connections = args
+    counts = [(0, 0)] * connections
+    threads = [
+        threading.Thread(target=_client, args=(host, port, path, deadline, counts, i)) for i in range(connections)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(c[0] for c in counts), sum(c[1] for c in counts)
+
+
+def _wait_ready(host: str, port: int, timeout: float = 120) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server on {host}:{port} did not start within {timeout}s")
+
+
+def measure(workers: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            WEB_CONCURRENCY=str(workers),
+            PORTIA_WEB_THREADS=str(args.threads),
+            PORTIA_BIND=f"{args.host}:{args.port}",
+            PORTIA_ACCESS_LOG="/dev/null",
+            PORTIA_JOB_DB=os.path.join(tmp, "jobs.db"),
+            PORTIA_IDEMPOTENCY_DB=os.path.join(tmp, "idempotency.db"),
+            PORTIA_ARTIFACT_INDEX_DB=os.path.join(tmp, "index.db"),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"], cwd=BACKEND, env=env
+        )
+        try:
+            _wait_ready(args.host, args.port)
+            # Warm every worker before timing
+            warm_deadline = time.time() + args.warmup
+            with multiprocessing.Pool(args.clients) as pool:
+                pool.map(_load_process, [(args.host, args.port, args.path, warm_deadline, args.connections)] * args.clients)
+                deadline = time.time() + args.duration
+                started = time.perf_counter()
+                results = pool.map(
+                    _load_process, [(args.host, args.port, args.path, deadline, args.connections)] * args.clients
+                )
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+    done = sum(r[0] for r in results)
+    return {
+        "workers": workers,
+        "requests": done,
+        "errors": sum(r[1] for r in results),
+        "seconds": round(elapsed, 2),
+        "rps": round(done / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cores = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, max(1, cores // 2), cores}))
+    parser.add_argument("--threads", type=int, default=8, help="request threads per worker")
+    parser.add_argument("--path", default="/api/tools")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--clients", type=int, default=max(2, cores), help="load-generating processes")
+    parser.add_argument("--connections", type=int, default=8, help="keep-alive connections per client process")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'workers':>8} {'requests':>10} {'errors':>7} {'req/s':>10} {'speedup':>8}")
+    for workers in args.workers:
+        row = measure(workers, args)
+        row["speedup"] = round(row["rps"] / rows[0]["rps"], 2) if rows and rows[0]["rps"] else 1.0
+        rows.append(row)
+        print(f"{row['workers']:>8} {row['requests']:>10} {row['errors']:>7} {row['rps']:>10} {row['speedup']:>8}")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"path": args.path, "cores": cores, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
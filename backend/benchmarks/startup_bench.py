@@ -0,0 +1,112 @@
+"""Import time and time-to-first-request of the API server.
+
+Each sample starts a fresh interpreter that imports ``app_api`` (building the
+Portia client) and then serves ``GET /`` and ``GET /api/tools`` through
+Flask's test client, timing every stage:
+
+    cd backend && python benchmarks/startup_bench.py --runs 5
+    cd backend && python benchmarks/startup_bench.py --cold   # no tool snapshot
+
+``--cold`` points the tool metadata snapshot at an empty file for every run,
+so the tool listing has to build every registry source; warm runs reuse the
+snapshot written by the first one. ``--importtime`` also prints the slowest
+modules reported by ``python -X importtime``.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app_api
+imported = time.perf_counter()
+client = app_api.app.test_client()
+first = client.get("/")
+first_request = time.perf_counter()
+tools = client.get("/api/tools")
+tools_listed = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "first_request_s": first_request - started,
+    "tools_s": tools_listed - first_request,
+    "status": [first.status_code, tools.status_code],
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def sample(env) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def slowest_imports(env, limit: int) -> list:
+    """(cumulative seconds, module) of the slowest imports of app_api."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app_api"], cwd=BACKEND, env=env, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="ignore the tool metadata snapshot")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="show the N slowest imports")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            PORTIA_RECONCILE_INTERVAL="0",
+            PORTIA_JOB_DB=os.path.join(tmp, "jobs.db"),
+            PORTIA_IDEMPOTENCY_DB=os.path.join(tmp, "idempotency.db"),
+            PORTIA_ARTIFACT_INDEX_DB=os.path.join(tmp, "index.db"),
+            PORTIA_TOOL_SNAPSHOT_PATH=os.path.join(tmp, "tool_metadata.json"),
+        )
+        samples = []
+        for _ in range(args.runs):
+            if args.cold:
+                Path(env["PORTIA_TOOL_SNAPSHOT_PATH"]).unlink(missing_ok=True)
+            samples.append(sample(env))
+        slowest = slowest_imports(env, args.importtime) if args.importtime else []
+
+    summary = {
+        key: {
+            "median": round(statistics.median(s[key] for s in samples), 3),
+            "min": round(min(s[key] for s in samples), 3),
+        }
+        for key in ("import_s", "first_request_s", "tools_s")
+    }
+    print(f"{'stage':<18} {'median':>8} {'min':>8}")
+    for key, row in summary.items():
+        print(f"{key:<18} {row['median']:>8} {row['min']:>8}")
+    print(f"modules loaded: {samples[-1]['modules']}")
+    for seconds, name in slowest:
+        print(f"{seconds:>8.3f}s  {name}")
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps({"cold": args.cold, "summary": summary, "samples": samples, "slowest_imports": slowest}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Gunicorn settings for the production API server.
+
+    cd backend && gunicorn -c gunicorn.conf.py wsgi:app
+
+Defaults: one worker process per core, each with PORTIA_WEB_THREADS request
+threads. Plan runs mostly wait on LLM and tool calls, so threads are cheap
+concurrency within a worker; workers add CPU parallelism (JSON, parsing,
+Flask itself) past the GIL and cost a Portia client each. See the
+"Production Serving" section of the README for sizing.
+"""
+
+import glob
+import multiprocessing
+import os
+
+bind = os.getenv("PORTIA_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("PORTIA_WEB_THREADS", "8"))
+preload_app = True
+# gthread workers heartbeat from their main thread, so long synchronous plan
+# runs do not trip the timeout; it only catches wedged workers.
+timeout = int(os.getenv("PORTIA_WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("PORTIA_GRACEFUL_TIMEOUT", "60"))
+keepalive = 5
+accesslog = os.getenv("PORTIA_ACCESS_LOG", "-")
+
+
+def on_starting(server):
+    # Once per server, before any worker exists: jobs left queued or running
+    # by the previous server are failed here rather than by each worker.
+    from app.core.jobs import JobStore
+
+    store = JobStore(os.getenv("PORTIA_JOB_DB", "jobs/jobs.db"))
+    recovered = store.recover_interrupted()
+    store.close()
+    if recovered:
+        server.log.info("Marked %d interrupted jobs as failed", recovered)
+    # Workers write Prometheus metrics to PROMETHEUS_MULTIPROC_DIR; files left by
+    # a previous server would be added to this one's.
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+
+
+def post_fork(server, worker):
+    import app_api
+
+    app_api.init_worker(
+        recover_jobs=False,
+        cancel_poll_interval=float(os.getenv("PORTIA_CANCEL_POLL_INTERVAL", "1")),
+    )
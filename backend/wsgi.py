@@ -0,0 +1,38 @@
+"""Production WSGI entry point.
+
+    cd backend && gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py enables ``preload_app``, so this module is imported once in
+the master: Flask, the Portia SDK, every plan (see plan_registry) and every
+tool registry source are built before the workers fork and are shared with
+them copy-on-write.
+Everything that owns threads, sockets or SQLite connections (the Portia
+client, job manager, stores) is created per worker by ``app_api.init_worker``
+from the ``post_fork`` hook.
+"""
+
+import gc
+import os
+
+os.environ.setdefault("PORTIA_DEFER_INIT", "1")
+
+import app_api  # noqa: E402
+from app.core.portia_client import base_tool_registry  # noqa: E402
+
+app = app_api.app
+
+
+def preload():
+    """Build what the workers can share before they fork."""
+    app_api.plans.build_all()
+    base_tool_registry().load_all()
+    # Move everything loaded so far out of the collector's reach, so its
+    # reference bookkeeping does not dirty the shared pages in each worker.
+    gc.collect()
+    gc.freeze()
+
+
+if os.environ["PORTIA_DEFER_INIT"].lower() in ("1", "true", "yes", "on"):
+    preload()
+else:
+    app_api.init_worker()
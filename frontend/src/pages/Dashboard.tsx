@@ -198,7 +198,12 @@ const Dashboard = () => {
     }
   };
 
-  const downloadReport = (filename: string, content: any) => {
+  const downloadReport = async (filename: string, content: any) => {
+    // The API returns artifact references; fetch the file content on demand
+    if (content && typeof content === 'object' && content.url) {
+      const response = await fetch(`http://localhost:5000${content.url}`);
+      content = await response.text();
+    }
     const dataStr = typeof content === 'string' ? content : JSON.stringify(content, null, 2);
     const dataBlob = new Blob([dataStr], { type: 'application/json' });
     const url = URL.createObjectURL(dataBlob);